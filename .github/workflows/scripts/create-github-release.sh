@@ -38,5 +38,6 @@ gh release create "$VERSION" \
   .genreleases/spec-kit-template-auggie-ps-"$VERSION".zip \
   .genreleases/spec-kit-template-roo-sh-"$VERSION".zip \
   .genreleases/spec-kit-template-roo-ps-"$VERSION".zip \
+  .genreleases/SHA256SUMS \
   --title "Spec Kit Templates - $VERSION_NO_V" \
   --notes-file release_notes.md
\ No newline at end of file
@@ -8,6 +8,7 @@ set -euo pipefail
 #   Optionally set AGENTS and/or SCRIPTS env vars to limit what gets built.
 #     AGENTS  : space or comma separated subset of: claude gemini copilot cursor qwen opencode windsurf codex (default: all)
 #     SCRIPTS : space or comma separated subset of: sh ps (default: both)
+#     COMPACT : set to 1 to strip comments, redundant whitespace and boilerplate from agent commands
 #   Examples:
 #     AGENTS=claude SCRIPTS=sh $0 v0.2.0
 #     AGENTS="copilot,gemini" $0 v0.2.0
@@ -71,6 +72,14 @@ generate_commands() {
     
     # Apply other substitutions
     body=$(printf '%s\n' "$body" | sed "s/{ARGS}/$arg_format/g" | sed "s/__AGENT__/$agent/g" | rewrite_paths)
+
+    if [[ ${COMPACT:-0} == 1 ]]; then
+      if [[ $ext == toml ]]; then
+        body=$(printf '%s\n' "$body" | python3 src/specify_cli/commands.py compact --toml)
+      else
+        body=$(printf '%s\n' "$body" | python3 src/specify_cli/commands.py compact)
+      fi
+    fi
     
     case $ext in
       toml)
@@ -226,3 +235,14 @@ done
 
 echo "Archives in $GENRELEASES_DIR:"
 ls -1 "$GENRELEASES_DIR"/spec-kit-template-*-"${NEW_VERSION}".zip
+
+# Checksums published alongside the archives; specify init verifies downloads against them
+(
+  cd "$GENRELEASES_DIR"
+  if command -v sha256sum >/dev/null 2>&1; then
+    sha256sum spec-kit-template-*-"${NEW_VERSION}".zip > SHA256SUMS
+  else
+    shasum -a 256 spec-kit-template-*-"${NEW_VERSION}".zip > SHA256SUMS
+  fi
+)
+echo "Checksums: $GENRELEASES_DIR/SHA256SUMS"
@@ -0,0 +1,33 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+# record-snapshot-release.sh
+# Record which release the bundled template snapshot (templates/, scripts/, memory/) matches
+# and commit it, so wheels built from the repository (including git installs) know their release.
+# The file holds "<tag> <fingerprint>"; specify only trusts the tag while the fingerprint matches.
+# Usage: record-snapshot-release.sh <version>
+
+if [[ $# -ne 1 ]]; then
+  echo "Usage: $0 <version>" >&2
+  exit 1
+fi
+
+VERSION="$1"
+RELEASE_FILE="src/specify_cli/SNAPSHOT_RELEASE"
+
+# Must match snapshot.source_fingerprint: sha256 of the sorted `sha256sum` lines of every file
+FINGERPRINT=$(find templates scripts memory -type f -print0 | LC_ALL=C sort -z | xargs -0 sha256sum | sha256sum | cut -d' ' -f1)
+printf '%s %s\n' "$VERSION" "$FINGERPRINT" > "$RELEASE_FILE"
+echo "Recorded snapshot release $VERSION ($FINGERPRINT) in $RELEASE_FILE"
+
+if git diff --quiet -- "$RELEASE_FILE" && git ls-files --error-unmatch "$RELEASE_FILE" >/dev/null 2>&1; then
+  echo "$RELEASE_FILE is already up to date"
+  exit 0
+fi
+
+git config user.name "github-actions[bot]"
+git config user.email "41898282+github-actions[bot]@users.noreply.github.com"
+git add "$RELEASE_FILE"
+git commit -m "Record snapshot release $VERSION"
+git pull --rebase origin "${GITHUB_REF_NAME:-main}"
+git push origin "HEAD:${GITHUB_REF_NAME:-main}"
@@ -0,0 +1,113 @@
+"""
+テンプレートのプロビジョニング経路のベンチマーク。
+
+- download_and_extract_template: ローカルのミラーサーバーからの取得と展開（キャッシュなし/ストア経由）
+- --hereマージ: N個のファイルを空のディレクトリ・同一内容のツリーにマージ
+- ensure_executable_scripts: N個のスクリプトを持つツリー
+"""
+
+import itertools
+import os
+import shutil
+import zipfile
+
+import httpx
+import pytest
+
+from conftest import bench_scales
+from specify_cli import download_and_extract_template, ensure_executable_scripts
+from specify_cli.extract import merge_zip
+from specify_cli.store import TemplateStore
+
+_counter = itertools.count()
+
+
+def _fresh(base):
+    return base / f"p{next(_counter)}"
+
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    # ダウンロードしたzipはカレントディレクトリに置かれる
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("SPECIFY_CACHE_DIR", str(tmp_path / "cache"))
+    return tmp_path
+
+
+@pytest.mark.parametrize("cached", [False, True], ids=["no-cache", "store"])
+def test_download_and_extract(benchmark, workdir, mirror_url, cached):
+    client = httpx.Client()
+    store = TemplateStore() if cached else None
+
+    def setup():
+        return (_fresh(workdir), "claude", "sh"), {
+            "verbose": False, "client": client, "template_source": mirror_url, "store": store,
+        }
+
+    benchmark.pedantic(download_and_extract_template, setup=setup, rounds=20, warmup_rounds=1)
+
+
+@pytest.mark.parametrize("files", bench_scales())
+def test_here_merge_into_empty(benchmark, tmp_path, synthetic_zip, files):
+    path = synthetic_zip(files)
+
+    def setup():
+        return (_fresh(tmp_path),), {}
+
+    def run(dest):
+        dest.mkdir()
+        with zipfile.ZipFile(path) as zf:
+            merge_zip(zf, dest)
+
+    benchmark.pedantic(run, setup=setup, rounds=3)
+
+
+@pytest.mark.parametrize("files", bench_scales())
+def test_here_merge_identical(benchmark, tmp_path, synthetic_zip, files):
+    """既存ツリーがテンプレートと同一の場合（全ファイルがサイズ+CRC32でスキップされる）。"""
+    path = synthetic_zip(files)
+    dest = tmp_path / "project"
+    dest.mkdir()
+    with zipfile.ZipFile(path) as zf:
+        merge_zip(zf, dest)
+
+    def run():
+        with zipfile.ZipFile(path) as zf:
+            return merge_zip(zf, dest)
+
+    plan = benchmark.pedantic(run, rounds=3)
+    assert all(action == "skip" for action, _ in plan)
+
+
+@pytest.mark.parametrize("mode", ["hardlink", "copy"])
+@pytest.mark.parametrize("files", bench_scales())
+def test_store_materialize(benchmark, tmp_path, synthetic_zip, files, mode):
+    path = synthetic_zip(files)
+    store = TemplateStore(tmp_path / "store")
+    size = path.stat().st_size
+    manifest = store.ensure(path, path.name, size)
+
+    def setup():
+        dest = _fresh(tmp_path)
+        dest.mkdir()
+        return (path.name, size, manifest, dest), {"mode": mode}
+
+    benchmark.pedantic(store.materialize, setup=setup, rounds=3)
+
+
+@pytest.mark.parametrize("files", bench_scales())
+def test_ensure_executable_scripts(benchmark, tmp_path, files):
+    project = tmp_path / "project"
+    scripts = project / ".specify" / "scripts"
+    for i in range(files):
+        script = scripts / f"d{i // 100:04d}" / f"s{i:06d}.sh"
+        script.parent.mkdir(parents=True, exist_ok=True)
+        script.write_text("#!/usr/bin/env bash\necho ok\n", encoding="utf-8")
+
+    def setup():
+        # 毎回実行ビットを落として、更新が必要な状態から計測する
+        for script in scripts.rglob("*.sh"):
+            os.chmod(script, 0o644)
+
+    benchmark.pedantic(ensure_executable_scripts, args=(project,), setup=setup, rounds=3)
+    shutil.rmtree(project)
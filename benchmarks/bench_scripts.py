@@ -0,0 +1,96 @@
+"""
+スラッシュコマンドが呼び出すbashスクリプトのホットパスのベンチマーク。
+
+数百のspecs/NNN-*ディレクトリを持つ非gitプロジェクト（conftest.spec_repo）で計測する。
+"""
+
+import os
+import shutil
+import subprocess
+
+import pytest
+
+from conftest import FEATURE_COUNT
+
+pytestmark = pytest.mark.skipif(shutil.which("bash") is None, reason="bash is required")
+
+PLAN_LINES = 20000
+AGENT_FILE_LINES = 5000
+
+
+def _run(cmd, cwd, env=None):
+    result = subprocess.run(cmd, cwd=cwd, env=env, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    return result.stdout
+
+
+def _env(**extra):
+    env = {k: v for k, v in os.environ.items() if k != "SPECIFY_FEATURE"}
+    env.update(extra)
+    return env
+
+
+def test_get_current_branch(benchmark, spec_repo):
+    """SPECIFY_FEATUREもgitもない場合、specs/を走査して最新の機能を求める。"""
+    script = 'source .specify/scripts/bash/common.sh && get_current_branch'
+    out = benchmark(_run, ["bash", "-c", script], spec_repo, _env())
+    assert out.strip() == f"{FEATURE_COUNT:03d}-feature-{FEATURE_COUNT}"
+
+
+def test_create_new_feature(benchmark, spec_repo):
+    specs = spec_repo / "specs"
+    created = f"{FEATURE_COUNT + 1:03d}-"
+
+    def setup():
+        for path in specs.glob(f"{created}*"):
+            shutil.rmtree(path)
+
+    benchmark.pedantic(
+        _run,
+        args=(["bash", ".specify/scripts/bash/create-new-feature.sh", "--json", "benchmark feature"], spec_repo, _env()),
+        setup=setup,
+        rounds=20,
+    )
+    setup()
+
+
+@pytest.fixture
+def large_plan(spec_repo):
+    feature = f"{FEATURE_COUNT:03d}-feature-{FEATURE_COUNT}"
+    plan = spec_repo / "specs" / feature / "plan.md"
+    header = [
+        "# Implementation Plan",
+        "",
+        "**Language/Version**: Python 3.11",
+        "**Primary Dependencies**: FastAPI",
+        "**Storage**: PostgreSQL",
+        "**Project Type**: web",
+        "",
+    ]
+    body = [f"- step {i}: lorem ipsum dolor sit amet" for i in range(PLAN_LINES)]
+    plan.write_text("\n".join(header + body) + "\n", encoding="utf-8")
+
+    agent_file = spec_repo / "CLAUDE.md"
+    lines = ["# bench Development Guidelines", "", "## Active Technologies", "- Go 1.22 (000-base)", "",
+             "## Recent Changes", "- 000-base: Added Go 1.22", "", "## Notes"]
+    lines += [f"- manual note {i}" for i in range(AGENT_FILE_LINES)]
+    original = "\n".join(lines) + "\n"
+    agent_file.write_text(original, encoding="utf-8")
+    yield feature, agent_file, original
+    plan.unlink()
+    agent_file.unlink()
+
+
+def test_update_agent_context(benchmark, spec_repo, large_plan):
+    feature, agent_file, original = large_plan
+
+    def setup():
+        agent_file.write_text(original, encoding="utf-8")
+
+    benchmark.pedantic(
+        _run,
+        args=(["bash", ".specify/scripts/bash/update-agent-context.sh", "claude"], spec_repo, _env(SPECIFY_FEATURE=feature)),
+        setup=setup,
+        rounds=10,
+    )
+    assert "Python 3.11" in agent_file.read_text(encoding="utf-8")
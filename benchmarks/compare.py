@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+ベンチマーク結果のベースライン管理。
+
+pytest-benchmarkの--benchmark-jsonの出力を、ベンチマーク名ごとの統計だけを持つ
+小さなJSONベースラインに変換し、ベースラインとの比較で回帰を検出する。
+
+    python benchmarks/compare.py save results.json benchmarks/baselines/linux-py311.json
+    python benchmarks/compare.py check results.json benchmarks/baselines/linux-py311.json --threshold 0.25
+
+checkはいずれかのベンチマークの中央値がしきい値を超えて悪化した場合に終了コード1を返す。
+"""
+
+import argparse
+import json
+import platform
+import sys
+from pathlib import Path
+
+STATS = ("min", "median", "mean", "stddev", "rounds")
+
+
+def load_results(path: Path) -> dict:
+    data = json.loads(path.read_text(encoding="utf-8"))
+    if "benchmarks" in data and isinstance(data["benchmarks"], list):
+        return {b["fullname"]: {k: b["stats"][k] for k in STATS} for b in data["benchmarks"]}
+    return data["benchmarks"]
+
+
+def save(results: Path, baseline: Path) -> int:
+    data = json.loads(results.read_text(encoding="utf-8"))
+    machine = data.get("machine_info", {})
+    out = {
+        "machine": {
+            "python": machine.get("python_version", platform.python_version()),
+            "system": machine.get("system", platform.system()),
+            "machine": machine.get("machine", platform.machine()),
+            "cpu": (machine.get("cpu") or {}).get("brand_raw", ""),
+        },
+        "benchmarks": load_results(results),
+    }
+    baseline.parent.mkdir(parents=True, exist_ok=True)
+    baseline.write_text(json.dumps(out, indent=2, sort_keys=True) + "\n", encoding="utf-8")
+    print(f"{len(out['benchmarks'])} benchmarks -> {baseline}")
+    return 0
+
+
+def check(results: Path, baseline: Path, threshold: float) -> int:
+    current = load_results(results)
+    base = load_results(baseline)
+    regressions = 0
+    width = max((len(name) for name in current), default=0)
+    for name in sorted(current):
+        now = current[name]["median"]
+        if name not in base:
+            print(f"{name:<{width}}  {now * 1000:10.3f} ms  (new)")
+            continue
+        before = base[name]["median"]
+        change = (now - before) / before if before else 0.0
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressions += 1
+        print(f"{name:<{width}}  {now * 1000:10.3f} ms  {change:+7.1%}{flag}")
+    for name in sorted(set(base) - set(current)):
+        print(f"{name:<{width}}  (missing)")
+    return 1 if regressions else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    sub = parser.add_subparsers(dest="command", required=True)
+    p_save = sub.add_parser("save", help="結果をベースラインとして保存")
+    p_save.add_argument("results", type=Path)
+    p_save.add_argument("baseline", type=Path)
+    p_check = sub.add_parser("check", help="ベースラインと比較")
+    p_check.add_argument("results", type=Path)
+    p_check.add_argument("baseline", type=Path)
+    p_check.add_argument("--threshold", type=float, default=0.25, help="許容する中央値の悪化率 (既定: 0.25)")
+    args = parser.parse_args(argv)
+    if args.command == "save":
+        return save(args.results, args.baseline)
+    return check(args.results, args.baseline, args.threshold)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
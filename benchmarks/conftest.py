@@ -0,0 +1,125 @@
+"""
+ベンチマーク共通のフィクスチャ。
+
+- template_zip / mirror_url: リポジトリのtemplates・scripts・memoryから組み立てた
+  テンプレートzipと、それを配信するローカルのミラーサーバー（specify mirror serveと同じ実装）
+- synthetic_zip: N個のファイルを持つ合成テンプレート（--hereマージ用）
+- spec_repo: 数百のspecs/NNN-*ディレクトリと大きなplan.md/CLAUDE.mdを持つ非gitプロジェクト
+
+ファイル数はSPECIFY_BENCH_SCALE（カンマ区切り、既定 10000）で指定する。
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import sys
+import threading
+import zipfile
+from pathlib import Path
+
+import pytest
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT / "src"))
+
+from specify_cli import TEMPLATE_REPO_NAME, TEMPLATE_REPO_OWNER  # noqa: E402
+from specify_cli.integrity import CHECKSUMS_ASSET  # noqa: E402
+from specify_cli.mirror import asset_path, make_server  # noqa: E402
+
+BENCH_TAG = "v0.0.0-bench"
+TEMPLATE_NAME = f"spec-kit-template-claude-sh-{BENCH_TAG}.zip"
+FEATURE_COUNT = int(os.environ.get("SPECIFY_BENCH_FEATURES", "300"))
+
+
+def bench_scales() -> list[int]:
+    return [int(n) for n in os.environ.get("SPECIFY_BENCH_SCALE", "10000").split(",") if n.strip()]
+
+
+def _template_members() -> dict[str, Path]:
+    """リリースパッケージ（claude/sh）と同じ配置のファイル一覧。"""
+    members = {}
+    for path in (REPO_ROOT / "memory").rglob("*"):
+        if path.is_file():
+            members[f".specify/memory/{path.relative_to(REPO_ROOT / 'memory').as_posix()}"] = path
+    for path in (REPO_ROOT / "scripts" / "bash").glob("*.sh"):
+        members[f".specify/scripts/bash/{path.name}"] = path
+    for path in (REPO_ROOT / "templates").glob("*.md"):
+        members[f".specify/templates/{path.name}"] = path
+    for path in (REPO_ROOT / "templates" / "commands").glob("*.md"):
+        members[f".claude/commands/{path.name}"] = path
+    return members
+
+
+@pytest.fixture(scope="session")
+def template_zip(tmp_path_factory) -> Path:
+    path = tmp_path_factory.mktemp("release") / TEMPLATE_NAME
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, src in sorted(_template_members().items()):
+            info = zipfile.ZipInfo(name)
+            info.external_attr = (0o755 if name.endswith(".sh") else 0o644) << 16
+            info.compress_type = zipfile.ZIP_DEFLATED
+            zf.writestr(info, src.read_bytes())
+    return path
+
+
+@pytest.fixture(scope="session")
+def mirror_url(tmp_path_factory, template_zip) -> str:
+    """テンプレートのリリースを配信するローカルのGitHub互換サーバー。"""
+    root = tmp_path_factory.mktemp("mirror")
+    target = asset_path(root, TEMPLATE_REPO_OWNER, TEMPLATE_REPO_NAME, BENCH_TAG, TEMPLATE_NAME)
+    target.parent.mkdir(parents=True)
+    shutil.copyfile(template_zip, target)
+    digest = hashlib.sha256(target.read_bytes()).hexdigest()
+    sums = target.with_name(CHECKSUMS_ASSET)
+    sums.write_text(f"{digest}  {TEMPLATE_NAME}\n", encoding="utf-8")
+    release = {
+        "tag_name": BENCH_TAG,
+        "assets": [
+            {"name": TEMPLATE_NAME, "size": target.stat().st_size, "browser_download_url": ""},
+            {"name": CHECKSUMS_ASSET, "size": sums.stat().st_size, "browser_download_url": ""},
+        ],
+    }
+    releases = root / "repos" / TEMPLATE_REPO_OWNER / TEMPLATE_REPO_NAME / "releases"
+    releases.mkdir(parents=True)
+    (releases / "latest.json").write_text(json.dumps(release), encoding="utf-8")
+
+    server = make_server(root, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def build_synthetic_zip(path: Path, files: int) -> Path:
+    """files個の小さなファイルを100ファイルずつのディレクトリに分けて格納したzip。"""
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as zf:
+        for i in range(files):
+            zf.writestr(f"pkg/d{i // 100:04d}/f{i:06d}.md", f"# file {i}\n\n" + "lorem ipsum " * 20)
+    return path
+
+
+@pytest.fixture(scope="session")
+def synthetic_zip(tmp_path_factory):
+    cache: dict[int, Path] = {}
+
+    def get(files: int) -> Path:
+        if files not in cache:
+            cache[files] = build_synthetic_zip(tmp_path_factory.mktemp(f"synthetic-{files}") / "template.zip", files)
+        return cache[files]
+    return get
+
+
+@pytest.fixture(scope="session")
+def spec_repo(tmp_path_factory) -> Path:
+    """scriptsとtemplatesを配置し、FEATURE_COUNT個の機能ディレクトリを持つ非gitプロジェクト。"""
+    root = tmp_path_factory.mktemp("spec-repo")
+    shutil.copytree(REPO_ROOT / "scripts" / "bash", root / ".specify" / "scripts" / "bash")
+    shutil.copytree(REPO_ROOT / "templates", root / ".specify" / "templates", ignore=shutil.ignore_patterns("commands"))
+    shutil.copytree(REPO_ROOT / "memory", root / ".specify" / "memory")
+    for i in range(1, FEATURE_COUNT + 1):
+        feature = root / "specs" / f"{i:03d}-feature-{i}"
+        feature.mkdir(parents=True)
+        (feature / "spec.md").write_text(f"# Feature {i}\n", encoding="utf-8")
+    return root
@@ -78,6 +78,29 @@ done
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 source "$SCRIPT_DIR/common.sh"
 
+# specify serveが起動している場合はウォームな状態から応答を得る（JSONモードのみ）。
+# gitをforkしないよう、作業ディレクトリとSPECIFY_FEATUREだけを渡してサーバーにリポジトリと
+# 機能を解決させる。サーバーのリポジトリ外からの問い合わせであればローカルの処理にフォールバックする
+if $JSON_MODE && [[ -n "${SPECIFY_SOCKET:-}" ]]; then
+    feature_json=null
+    [[ -n "${SPECIFY_FEATURE:-}" ]] && feature_json=$(json_string "$SPECIFY_FEATURE")
+    request=$(printf '{"query":"prerequisites","format":"raw","args":{"cwd":%s,"feature":%s,"require_tasks":%s,"include_tasks":%s,"paths_only":%s,"artifacts":false}}' \
+        "$(json_string "$PWD")" "$feature_json" "$REQUIRE_TASKS" "$INCLUDE_TASKS" "$PATHS_ONLY")
+    server_rc=0
+    server_output=$(query_specify_server "$request") || server_rc=$?
+    if [[ $server_rc -eq 0 ]]; then
+        echo "$server_output"
+        exit 0
+    elif [[ $server_rc -eq 1 ]]; then
+        exit 1
+    fi
+fi
+
+# specifyがPATHにあればPython実装 (specify prereqs) に委譲する（SPECIFY_NATIVE_PREREQS=0で無効）
+if [[ "${SPECIFY_NATIVE_PREREQS:-}" != "0" ]] && command -v specify >/dev/null 2>&1; then
+    exec specify prereqs "$@"
+fi
+
 # 機能パスを取得してブランチをバリデート
 eval $(get_feature_paths)
 check_feature_branch "$CURRENT_BRANCH" "$HAS_GIT" || exit 1
@@ -86,8 +109,9 @@ check_feature_branch "$CURRENT_BRANCH" "$HAS_GIT" || exit 1
 if $PATHS_ONLY; then
     if $JSON_MODE; then
         # 最小限のJSONパスペイロード（バリデーションは行わない）
-        printf '{"REPO_ROOT":"%s","BRANCH":"%s","FEATURE_DIR":"%s","FEATURE_SPEC":"%s","IMPL_PLAN":"%s","TASKS":"%s"}\n' \
-            "$REPO_ROOT" "$CURRENT_BRANCH" "$FEATURE_DIR" "$FEATURE_SPEC" "$IMPL_PLAN" "$TASKS"
+        printf '{"REPO_ROOT":%s,"BRANCH":%s,"FEATURE_DIR":%s,"FEATURE_SPEC":%s,"IMPL_PLAN":%s,"TASKS":%s}\n' \
+            "$(json_string "$REPO_ROOT")" "$(json_string "$CURRENT_BRANCH")" "$(json_string "$FEATURE_DIR")" \
+            "$(json_string "$FEATURE_SPEC")" "$(json_string "$IMPL_PLAN")" "$(json_string "$TASKS")"
     else
         echo "REPO_ROOT: $REPO_ROOT"
         echo "BRANCH: $CURRENT_BRANCH"
@@ -148,7 +172,7 @@ if $JSON_MODE; then
         json_docs="[${json_docs%,}]"
     fi
     
-    printf '{"FEATURE_DIR":"%s","AVAILABLE_DOCS":%s}\n' "$FEATURE_DIR" "$json_docs"
+    printf '{"FEATURE_DIR":%s,"AVAILABLE_DOCS":%s}\n' "$(json_string "$FEATURE_DIR")" "$json_docs"
 else
     # テキスト出力
     echo "FEATURE_DIR:$FEATURE_DIR"
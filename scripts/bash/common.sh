@@ -26,14 +26,15 @@ get_current_branch() {
         return
     fi
     
-    # 非gitリポジトリの場合、最新の機能ディレクトリを見つける
+    # 非gitリポジトリの場合、全specsルートから最新の機能ディレクトリを見つける
     local repo_root=$(get_repo_root)
-    local specs_dir="$repo_root/specs"
+    local latest_feature=""
+    local highest=0
+    local _name rel
     
-    if [[ -d "$specs_dir" ]]; then
-        local latest_feature=""
-        local highest=0
-        
+    while IFS=$'\t' read -r _name rel; do
+        local specs_dir="$repo_root/$rel"
+        [[ -d "$specs_dir" ]] || continue
         for dir in "$specs_dir"/*; do
             if [[ -d "$dir" ]]; then
                 local dirname=$(basename "$dir")
@@ -47,16 +48,87 @@ get_current_branch() {
                 fi
             fi
         done
-        
-        if [[ -n "$latest_feature" ]]; then
-            echo "$latest_feature"
-            return
-        fi
+    done < <(get_specs_roots "$repo_root")
+    
+    if [[ -n "$latest_feature" ]]; then
+        echo "$latest_feature"
+        return
     fi
     
     echo "main"  # 最終フォールバック
 }
 
+# .specify/config（文字列値のみのTOMLサブセット）を「セクション<TAB>キー<TAB>値」の行で出力
+read_specify_config() {
+    local config="$1/.specify/config"
+    [[ -f "$config" ]] || return 0
+    local section="" line key value
+    while IFS= read -r line || [[ -n "$line" ]]; do
+        line="${line%$'\r'}"
+        line="${line#"${line%%[![:space:]]*}"}"
+        line="${line%"${line##*[![:space:]]}"}"
+        [[ -z "$line" || "$line" == \#* ]] && continue
+        if [[ "$line" =~ ^\[([A-Za-z0-9_.-]+)\]$ ]]; then
+            section="${BASH_REMATCH[1]}"
+            continue
+        fi
+        [[ "$line" =~ ^([A-Za-z0-9_-]+)[[:space:]]*=[[:space:]]*(.*)$ ]] || continue
+        key="${BASH_REMATCH[1]}"
+        value="${BASH_REMATCH[2]}"
+        if [[ "$value" =~ ^\"([^\"]*)\" ]] || [[ "$value" =~ ^\'([^\']*)\' ]]; then
+            value="${BASH_REMATCH[1]}"
+        else
+            value="${value%%#*}"
+            value="${value%"${value##*[![:space:]]}"}"
+        fi
+        printf '%s\t%s\t%s\n' "$section" "$key" "$value"
+    done < "$config"
+}
+
+# specsルートを「名前<TAB>リポジトリルートからの相対パス」の行で出力（未設定なら default<TAB>specs）
+get_specs_roots() {
+    local roots
+    roots=$(read_specify_config "$1" | awk -F'\t' '$1 == "specs.roots" { gsub(/^\/+|\/+$/, "", $3); if ($3 != "") print $2 "\t" $3 }')
+    if [[ -n "$roots" ]]; then
+        echo "$roots"
+    else
+        printf 'default\tspecs\n'
+    fi
+}
+
+# 新しい機能を作るspecsルートの相対パス: 名前の指定、SPECIFY_SPECS_ROOT、カレントディレクトリを
+# 含むパッケージ（specsルートの親が最も深く一致するもの）、[specs] default、最初のルートの順
+select_specs_root() {
+    local repo_root="$1" name="${2:-${SPECIFY_SPECS_ROOT:-}}" cwd="${3:-}"
+    local roots root_name rel best="" best_len=0 first="" default_name
+    roots=$(get_specs_roots "$repo_root")
+    if [[ -n "$name" ]]; then
+        rel=$(printf '%s\n' "$roots" | awk -F'\t' -v n="$name" '$1 == n { print $2; exit }')
+        if [[ -z "$rel" ]]; then
+            echo "ERROR: specs root '$name' is not declared in .specify/config (choices: $(printf '%s\n' "$roots" | cut -f1 | paste -sd, -))" >&2
+            return 1
+        fi
+        echo "$rel"
+        return
+    fi
+    while IFS=$'\t' read -r root_name rel; do
+        [[ -z "$first" ]] && first="$rel"
+        [[ -n "$cwd" && "$rel" == */* ]] || continue
+        local package="$repo_root/${rel%/*}"
+        if [[ ( "$cwd" == "$package" || "$cwd" == "$package"/* ) && ${#package} -gt $best_len ]]; then
+            best="$rel"
+            best_len=${#package}
+        fi
+    done <<< "$roots"
+    if [[ -n "$best" ]]; then
+        echo "$best"
+        return
+    fi
+    default_name=$(read_specify_config "$repo_root" | awk -F'\t' '$1 == "specs" && $2 == "default" { print $3; exit }')
+    rel=$(printf '%s\n' "$roots" | awk -F'\t' -v n="$default_name" 'n != "" && $1 == n { print $2; exit }')
+    echo "${rel:-$first}"
+}
+
 # gitが利用可能かチェック
 has_git() {
     git rev-parse --show-toplevel >/dev/null 2>&1
@@ -81,7 +153,32 @@ check_feature_branch() {
     return 0
 }
 
-get_feature_dir() { echo "$1/specs/$2"; }
+# 機能ディレクトリ: 単一ルートならそのルート、複数ルートならグローバルインデックス
+# (.specify/features.tsv)、既存ディレクトリのあるルート、既定のルートの順（他の機能は走査しない）
+get_feature_dir() {
+    local repo_root="$1" feature="$2"
+    local roots=() _name rel
+    while IFS=$'\t' read -r _name rel; do roots+=("$rel"); done < <(get_specs_roots "$repo_root")
+    if [[ ${#roots[@]} -eq 1 ]]; then
+        echo "$repo_root/${roots[0]}/$feature"
+        return
+    fi
+    local index="$repo_root/.specify/features.tsv"
+    if [[ -f "$index" ]]; then
+        rel=$(awk -F'\t' -v f="$feature" '$1 == f { sub(/\r$/, "", $2); print $2; exit }' "$index")
+        if [[ -n "$rel" ]]; then
+            echo "$repo_root/$rel/$feature"
+            return
+        fi
+    fi
+    for rel in "${roots[@]}"; do
+        if [[ -d "$repo_root/$rel/$feature" ]]; then
+            echo "$repo_root/$rel/$feature"
+            return
+        fi
+    done
+    echo "$repo_root/$(select_specs_root "$repo_root")/$feature"
+}
 
 get_feature_paths() {
     local repo_root=$(get_repo_root)
@@ -111,3 +208,45 @@ EOF
 
 check_file() { [[ -f "$1" ]] && echo "  ✓ $2" || echo "  ✗ $2"; }
 check_dir() { [[ -d "$1" && -n $(ls -A "$1" 2>/dev/null) ]] && echo "  ✓ $2" || echo "  ✗ $2"; }
+
+# 文字列をJSONの文字列リテラル（引用符付き）として出力する。
+# 引用符・バックスラッシュ・制御文字をエスケープする（制御文字は\uXXXX）
+json_string() {
+    local LC_ALL=C
+    local s="$1" out="" c i
+    s=${s//\\/\\\\}
+    s=${s//\"/\\\"}
+    s=${s//$'\n'/\\n}
+    s=${s//$'\r'/\\r}
+    s=${s//$'\t'/\\t}
+    if [[ "$s" =~ [$'\x01'-$'\x1f'] ]]; then
+        for ((i = 0; i < ${#s}; i++)); do
+            c=${s:i:1}
+            if [[ "$c" == [$'\x01'-$'\x1f'] ]]; then
+                printf -v c '\\u%04x' "'$c"
+            fi
+            out+=$c
+        done
+        s=$out
+    fi
+    printf '"%s"' "$s"
+}
+
+# specify serveが起動していればUNIXソケット経由で問い合わせる（SPECIFY_SOCKETとsocatが必要）
+# 成功時は結果のJSONを出力して0、クエリ失敗時はエラーを標準エラーに出力して1、
+# サーバーが利用できない場合（サーバーのリポジトリルートが異なる場合を含む）は2を返す
+# （呼び出し側は通常の処理にフォールバックする）
+query_specify_server() {
+    local request="$1"
+    [[ -n "${SPECIFY_SOCKET:-}" && -S "$SPECIFY_SOCKET" ]] || return 2
+    command -v socat >/dev/null 2>&1 || return 2
+    local response
+    response=$(printf '%s\n' "$request" | socat -t 5 - "UNIX-CONNECT:$SPECIFY_SOCKET" 2>/dev/null) || return 2
+    [[ -n "$response" ]] || return 2
+    [[ "$response" == UNAVAILABLE* ]] && return 2
+    if [[ "$response" == ERROR* ]]; then
+        echo "$response" >&2
+        return 1
+    fi
+    echo "$response"
+}
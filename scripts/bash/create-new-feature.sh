@@ -3,18 +3,22 @@
 set -e
 
 JSON_MODE=false
+SPECS_ROOT_NAME=""
 ARGS=()
-for arg in "$@"; do
-    case "$arg" in
+while [ $# -gt 0 ]; do
+    case "$1" in
         --json) JSON_MODE=true ;;
-        --help|-h) echo "Usage: $0 [--json] <feature_description>"; exit 0 ;;
-        *) ARGS+=("$arg") ;;
+        --root) SPECS_ROOT_NAME="${2:-}"; shift ;;
+        --root=*) SPECS_ROOT_NAME="${1#--root=}" ;;
+        --help|-h) echo "Usage: $0 [--json] [--root <specs-root>] <feature_description>"; exit 0 ;;
+        *) ARGS+=("$1") ;;
     esac
+    shift
 done
 
 FEATURE_DESCRIPTION="${ARGS[*]}"
 if [ -z "$FEATURE_DESCRIPTION" ]; then
-    echo "Usage: $0 [--json] <feature_description>" >&2
+    echo "Usage: $0 [--json] [--root <specs-root>] <feature_description>" >&2
     exit 1
 fi
 
@@ -35,6 +39,7 @@ find_repo_root() {
 # --no-gitで初期化されたリポジトリでもワークフローが機能するように
 # リポジトリマーカーを検索することにフォールバック。
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
+source "$SCRIPT_DIR/common.sh"
 
 if git rev-parse --show-toplevel >/dev/null 2>&1; then
     REPO_ROOT=$(git rev-parse --show-toplevel)
@@ -48,33 +53,102 @@ else
     HAS_GIT=false
 fi
 
+# 作成先のspecsルート（.specify/configで複数宣言されている場合はカレントディレクトリも考慮する）
+SPECS_REL=$(select_specs_root "$REPO_ROOT" "$SPECS_ROOT_NAME" "$PWD") || exit 1
+MULTI_ROOT=false
+[ "$(get_specs_roots "$REPO_ROOT" | wc -l)" -gt 1 ] && MULTI_ROOT=true
+
 cd "$REPO_ROOT"
 
-SPECS_DIR="$REPO_ROOT/specs"
+SPECS_DIR="$REPO_ROOT/$SPECS_REL"
 mkdir -p "$SPECS_DIR"
 
-HIGHEST=0
-if [ -d "$SPECS_DIR" ]; then
-    for dir in "$SPECS_DIR"/*; do
-        [ -d "$dir" ] || continue
-        dirname=$(basename "$dir")
-        number=$(echo "$dirname" | grep -o '^[0-9]\+' || echo "0")
-        number=$((10#$number))
+# `specify feature new --worktree`で作成した専用ワークツリー（.gitがファイル）で、
+# 機能ブランチがチェックアウト済みなら新しいブランチを作らずその機能を使う
+CURRENT_BRANCH=""
+if [ "$HAS_GIT" = true ] && [ -f "$REPO_ROOT/.git" ]; then
+    CURRENT_BRANCH=$(git rev-parse --abbrev-ref HEAD 2>/dev/null || true)
+fi
+
+if [[ "$CURRENT_BRANCH" =~ ^([0-9]{3})- ]] && [ -d "$(get_feature_dir "$REPO_ROOT" "$CURRENT_BRANCH")" ]; then
+    BRANCH_NAME="$CURRENT_BRANCH"
+    FEATURE_NUM="${BASH_REMATCH[1]}"
+    SPECS_DIR="$(dirname "$(get_feature_dir "$REPO_ROOT" "$CURRENT_BRANCH")")"
+    SPECS_REL="${SPECS_DIR#$REPO_ROOT/}"
+else
+    # 番号は全ワークツリーのspecsルートとローカルの機能ブランチを通して決める
+    # （別のワークツリーで作成中の未マージの機能と衝突しないように）。
+    # 複数ルートの場合は各ワークツリーのグローバルインデックスと作成先のルートだけを見て、
+    # 割り当てからインデックスへの追記までをメインのワークツリーのロックで直列化する
+    WORKTREES=("$REPO_ROOT")
+    if [ "$HAS_GIT" = true ]; then
+        while IFS= read -r line; do
+            case "$line" in
+                "worktree "*) [ "${line#worktree }" = "$REPO_ROOT" ] || WORKTREES+=("${line#worktree }") ;;
+            esac
+        done < <(git worktree list --porcelain 2>/dev/null)
+    fi
+    if [ "$MULTI_ROOT" = true ] && command -v flock >/dev/null 2>&1; then
+        LOCK_ROOT=$(git worktree list --porcelain 2>/dev/null | sed -n '1s/^worktree //p')
+        LOCK_FILE="${LOCK_ROOT:-$REPO_ROOT}/.specify/features.tsv.lock"
+        mkdir -p "$(dirname "$LOCK_FILE")"
+        exec 9>>"$LOCK_FILE"
+        flock 9
+    fi
+    INDEX_FILE="$REPO_ROOT/.specify/features.tsv"
+    if [ "$MULTI_ROOT" = true ] && [ ! -f "$INDEX_FILE" ]; then
+        # 初回は全ルートを1回だけ走査してインデックスを作る（既存の機能と番号が衝突しないように）
+        {
+            printf '# feature\tspecs root (specify feature newが追記。`specify feature reindex`で再生成)\n'
+            while IFS=$'\t' read -r _name rel; do
+                for dir in "$REPO_ROOT/$rel"/*; do
+                    if [[ -d "$dir" && "$(basename "$dir")" =~ ^[0-9]{3}- ]]; then
+                        printf '%s\t%s\n' "$(basename "$dir")" "$rel"
+                    fi
+                done
+            done < <(get_specs_roots "$REPO_ROOT")
+        } > "$INDEX_FILE"
+    fi
+
+    HIGHEST=0
+    NAMES=()
+    if [ "$HAS_GIT" = true ]; then
+        while IFS= read -r branch; do
+            [[ "$branch" =~ ^[0-9]{3}- ]] && NAMES+=("$branch")
+        done < <(git for-each-ref --format='%(refname:short)' refs/heads 2>/dev/null)
+    fi
+    for wt in "${WORKTREES[@]}"; do
+        for dir in "$wt/$SPECS_REL"/*; do
+            [ -d "$dir" ] && NAMES+=("$(basename "$dir")")
+        done
+        if [ "$MULTI_ROOT" = true ] && [ -f "$wt/.specify/features.tsv" ]; then
+            while IFS=$'\t' read -r name _rel; do
+                NAMES+=("$name")
+            done < <(grep -E '^[0-9]{3}-' "$wt/.specify/features.tsv")
+        fi
+    done
+    for name in "${NAMES[@]}"; do
+        [[ "$name" =~ ^([0-9]+) ]] || continue
+        number=$((10#${BASH_REMATCH[1]}))
         if [ "$number" -gt "$HIGHEST" ]; then HIGHEST=$number; fi
     done
-fi
 
-NEXT=$((HIGHEST + 1))
-FEATURE_NUM=$(printf "%03d" "$NEXT")
+    NEXT=$((HIGHEST + 1))
+    FEATURE_NUM=$(printf "%03d" "$NEXT")
 
-BRANCH_NAME=$(echo "$FEATURE_DESCRIPTION" | tr '[:upper:]' '[:lower:]' | sed 's/[^a-z0-9]/-/g' | sed 's/-\+/-/g' | sed 's/^-//' | sed 's/-$//')
-WORDS=$(echo "$BRANCH_NAME" | tr '-' '\n' | grep -v '^$' | head -3 | tr '\n' '-' | sed 's/-$//')
-BRANCH_NAME="${FEATURE_NUM}-${WORDS}"
+    BRANCH_NAME=$(echo "$FEATURE_DESCRIPTION" | tr '[:upper:]' '[:lower:]' | sed 's/[^a-z0-9]/-/g' | sed 's/-\+/-/g' | sed 's/^-//' | sed 's/-$//')
+    WORDS=$(echo "$BRANCH_NAME" | tr '-' '\n' | grep -v '^$' | head -3 | tr '\n' '-' | sed 's/-$//')
+    BRANCH_NAME="${FEATURE_NUM}-${WORDS}"
 
-if [ "$HAS_GIT" = true ]; then
-    git checkout -b "$BRANCH_NAME"
-else
-    >&2 echo "[specify] 警告: Gitリポジトリが検出されません; $BRANCH_NAMEのブランチ作成をスキップしました"
+    if [ "$HAS_GIT" = true ]; then
+        git checkout -b "$BRANCH_NAME"
+    else
+        >&2 echo "[specify] 警告: Gitリポジトリが検出されません; $BRANCH_NAMEのブランチ作成をスキップしました"
+    fi
+
+    if [ "$MULTI_ROOT" = true ]; then
+        printf '%s\t%s\n' "$BRANCH_NAME" "$SPECS_REL" >> "$INDEX_FILE"
+    fi
 fi
 
 FEATURE_DIR="$SPECS_DIR/$BRANCH_NAME"
@@ -82,16 +156,19 @@ mkdir -p "$FEATURE_DIR"
 
 TEMPLATE="$REPO_ROOT/.specify/templates/spec-template.md"
 SPEC_FILE="$FEATURE_DIR/spec.md"
-if [ -f "$TEMPLATE" ]; then cp "$TEMPLATE" "$SPEC_FILE"; else touch "$SPEC_FILE"; fi
+if [ ! -f "$SPEC_FILE" ]; then
+    if [ -f "$TEMPLATE" ]; then cp "$TEMPLATE" "$SPEC_FILE"; else touch "$SPEC_FILE"; fi
+fi
 
 # 現在のセッション用にSPECIFY_FEATURE環境変数を設定
 export SPECIFY_FEATURE="$BRANCH_NAME"
 
 if $JSON_MODE; then
-    printf '{"BRANCH_NAME":"%s","SPEC_FILE":"%s","FEATURE_NUM":"%s"}\n' "$BRANCH_NAME" "$SPEC_FILE" "$FEATURE_NUM"
+    printf '{"BRANCH_NAME":"%s","SPEC_FILE":"%s","FEATURE_NUM":"%s","SPECS_ROOT":"%s"}\n' "$BRANCH_NAME" "$SPEC_FILE" "$FEATURE_NUM" "$SPECS_REL"
 else
     echo "BRANCH_NAME: $BRANCH_NAME"
     echo "SPEC_FILE: $SPEC_FILE"
     echo "FEATURE_NUM: $FEATURE_NUM"
+    echo "SPECS_ROOT: $SPECS_REL"
     echo "SPECIFY_FEATURE environment variable set to: $BRANCH_NAME"
 fi
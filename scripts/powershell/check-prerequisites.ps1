@@ -53,6 +53,17 @@ EXAMPLES:
     exit 0
 }
 
+# specifyがPATHにあればPython実装 (specify prereqs) に委譲する（SPECIFY_NATIVE_PREREQS=0で無効）
+if ($env:SPECIFY_NATIVE_PREREQS -ne '0' -and (Get-Command specify -ErrorAction SilentlyContinue)) {
+    $nativeArgs = @()
+    if ($Json) { $nativeArgs += '--json' }
+    if ($RequireTasks) { $nativeArgs += '--require-tasks' }
+    if ($IncludeTasks) { $nativeArgs += '--include-tasks' }
+    if ($PathsOnly) { $nativeArgs += '--paths-only' }
+    & specify prereqs @nativeArgs
+    exit $LASTEXITCODE
+}
+
 # 共通関数を読み込み
 . "$PSScriptRoot/common.ps1"
 
@@ -31,14 +31,14 @@ function Get-CurrentBranch {
         # Gitコマンドが失敗
     }
     
-    # git以外のリポジトリの場合、最新のフィーチャーディレクトリを探す
+    # git以外のリポジトリの場合、全specsルートから最新のフィーチャーディレクトリを探す
     $repoRoot = Get-RepoRoot
-    $specsDir = Join-Path $repoRoot "specs"
+    $latestFeature = ""
+    $highest = 0
     
-    if (Test-Path $specsDir) {
-        $latestFeature = ""
-        $highest = 0
-        
+    foreach ($root in (Get-SpecsRoots -RepoRoot $repoRoot)) {
+        $specsDir = Join-Path $repoRoot $root.Path
+        if (-not (Test-Path $specsDir)) { continue }
         Get-ChildItem -Path $specsDir -Directory | ForEach-Object {
             if ($_.Name -match '^(\d{3})-') {
                 $num = [int]$matches[1]
@@ -48,16 +48,90 @@ function Get-CurrentBranch {
                 }
             }
         }
-        
-        if ($latestFeature) {
-            return $latestFeature
-        }
+    }
+    
+    if ($latestFeature) {
+        return $latestFeature
     }
     
     # 最終的なフォールバック
     return "main"
 }
 
+# .specify/config（文字列値のみのTOMLサブセット）を @{ セクション = @{ キー = 値 } } として読む
+function Read-SpecifyConfig {
+    param([string]$RepoRoot)
+    $sections = @{ '' = [ordered]@{} }
+    $config = Join-Path $RepoRoot '.specify/config'
+    if (-not (Test-Path $config -PathType Leaf)) { return $sections }
+    $section = ''
+    foreach ($raw in Get-Content -LiteralPath $config -Encoding utf8) {
+        $line = $raw.Trim()
+        if (-not $line -or $line.StartsWith('#')) { continue }
+        if ($line -match '^\[([A-Za-z0-9_.-]+)\]$') {
+            $section = $matches[1]
+            if (-not $sections.ContainsKey($section)) { $sections[$section] = [ordered]@{} }
+            continue
+        }
+        if ($line -match '^([A-Za-z0-9_-]+)\s*=\s*(?:"([^"]*)"|''([^'']*)''|([^#]*?))\s*(?:#.*)?$') {
+            $value = @($matches[2], $matches[3], $matches[4]) | Where-Object { $null -ne $_ } | Select-Object -First 1
+            $sections[$section][$matches[1]] = $value
+        }
+    }
+    return $sections
+}
+
+# specsルート（Name, Path）の一覧。未設定なら default = specs
+function Get-SpecsRoots {
+    param([string]$RepoRoot, $Config = $null)
+    if ($null -eq $Config) { $Config = Read-SpecifyConfig -RepoRoot $RepoRoot }
+    $roots = @()
+    if ($Config.ContainsKey('specs.roots')) {
+        foreach ($key in $Config['specs.roots'].Keys) {
+            $path = ([string]$Config['specs.roots'][$key]).Trim('/')
+            if ($path) { $roots += [PSCustomObject]@{ Name = $key; Path = $path } }
+        }
+    }
+    if ($roots.Count -eq 0) { $roots = @([PSCustomObject]@{ Name = 'default'; Path = 'specs' }) }
+    return $roots
+}
+
+# 新しい機能を作るspecsルートの相対パス: 名前の指定、SPECIFY_SPECS_ROOT、カレントディレクトリを
+# 含むパッケージ（specsルートの親が最も深く一致するもの）、[specs] default、最初のルートの順
+function Select-SpecsRoot {
+    param([string]$RepoRoot, [string]$Name = '', [string]$Cwd = '')
+    $config = Read-SpecifyConfig -RepoRoot $RepoRoot
+    $roots = @(Get-SpecsRoots -RepoRoot $RepoRoot -Config $config)
+    if (-not $Name) { $Name = $env:SPECIFY_SPECS_ROOT }
+    if ($Name) {
+        $match = $roots | Where-Object { $_.Name -eq $Name } | Select-Object -First 1
+        if (-not $match) {
+            throw "specs root '$Name' is not declared in .specify/config (choices: $(($roots | ForEach-Object { $_.Name }) -join ','))"
+        }
+        return $match.Path
+    }
+    if ($Cwd) {
+        $best = $null
+        $bestLen = 0
+        foreach ($root in $roots) {
+            if (-not $root.Path.Contains('/')) { continue }
+            $package = [System.IO.Path]::GetFullPath((Join-Path $RepoRoot ($root.Path.Substring(0, $root.Path.LastIndexOf('/')))))
+            $cwdFull = [System.IO.Path]::GetFullPath($Cwd)
+            $inside = ($cwdFull -eq $package) -or $cwdFull.StartsWith($package + [System.IO.Path]::DirectorySeparatorChar)
+            if ($inside -and $package.Length -gt $bestLen) {
+                $best = $root.Path
+                $bestLen = $package.Length
+            }
+        }
+        if ($best) { return $best }
+    }
+    if ($config.ContainsKey('specs') -and $config['specs'].Contains('default')) {
+        $default = $roots | Where-Object { $_.Name -eq $config['specs']['default'] } | Select-Object -First 1
+        if ($default) { return $default.Path }
+    }
+    return $roots[0].Path
+}
+
 function Test-HasGit {
     try {
         git rev-parse --show-toplevel 2>$null | Out-Null
@@ -87,9 +161,28 @@ function Test-FeatureBranch {
     return $true
 }
 
+# 機能ディレクトリ: 単一ルートならそのルート、複数ルートならグローバルインデックス
+# (.specify/features.tsv)、既存ディレクトリのあるルート、既定のルートの順（他の機能は走査しない）
 function Get-FeatureDir {
     param([string]$RepoRoot, [string]$Branch)
-    Join-Path $RepoRoot "specs/$Branch"
+    $roots = @(Get-SpecsRoots -RepoRoot $RepoRoot)
+    if ($roots.Count -eq 1) {
+        return (Join-Path $RepoRoot "$($roots[0].Path)/$Branch")
+    }
+    $index = Join-Path $RepoRoot '.specify/features.tsv'
+    if (Test-Path $index -PathType Leaf) {
+        foreach ($line in Get-Content -LiteralPath $index -Encoding utf8) {
+            $parts = $line.Split("`t")
+            if ($parts.Count -ge 2 -and $parts[0] -eq $Branch) {
+                return (Join-Path $RepoRoot "$($parts[1].Trim())/$Branch")
+            }
+        }
+    }
+    foreach ($root in $roots) {
+        $candidate = Join-Path $RepoRoot "$($root.Path)/$Branch"
+        if (Test-Path $candidate -PathType Container) { return $candidate }
+    }
+    return (Join-Path $RepoRoot "$(Select-SpecsRoot -RepoRoot $RepoRoot)/$Branch")
 }
 
 function Get-FeaturePathsEnv {
@@ -3,17 +3,20 @@
 [CmdletBinding()]
 param(
     [switch]$Json,
+    [string]$Root = '',
     [Parameter(ValueFromRemainingArguments = $true)]
     [string[]]$FeatureDescription
 )
 $ErrorActionPreference = 'Stop'
 
 if (-not $FeatureDescription -or $FeatureDescription.Count -eq 0) {
-    Write-Error "Usage: ./create-new-feature.ps1 [-Json] <feature description>"
+    Write-Error "Usage: ./create-new-feature.ps1 [-Json] [-Root <specs-root>] <feature description>"
     exit 1
 }
 $featureDesc = ($FeatureDescription -join ' ').Trim()
 
+. "$PSScriptRoot/common.ps1"
+
 # リポジトリルートを解決。利用可能な場合はgit情報を優先するが、
 # --no-gitで初期化されたリポジトリでもワークフローが機能するよう
 # リポジトリマーカーの検索にフォールバック。
@@ -55,35 +58,113 @@ try {
     $hasGit = $false
 }
 
+# 作成先のspecsルート（.specify/configで複数宣言されている場合はカレントディレクトリも考慮する）
+try {
+    $specsRel = Select-SpecsRoot -RepoRoot $repoRoot -Name $Root -Cwd (Get-Location).Path
+} catch {
+    Write-Error "ERROR: $_"
+    exit 1
+}
+$multiRoot = @(Get-SpecsRoots -RepoRoot $repoRoot).Count -gt 1
+
 Set-Location $repoRoot
 
-$specsDir = Join-Path $repoRoot 'specs'
+$specsDir = Join-Path $repoRoot $specsRel
 New-Item -ItemType Directory -Path $specsDir -Force | Out-Null
 
-$highest = 0
-if (Test-Path $specsDir) {
-    Get-ChildItem -Path $specsDir -Directory | ForEach-Object {
-        if ($_.Name -match '^(\d{3})') {
+# `specify feature new --worktree`で作成した専用ワークツリー（.gitがファイル）で、
+# 機能ブランチがチェックアウト済みなら新しいブランチを作らずその機能を使う
+$currentBranch = ''
+if ($hasGit -and (Test-Path (Join-Path $repoRoot '.git') -PathType Leaf)) {
+    $currentBranch = git rev-parse --abbrev-ref HEAD 2>$null
+}
+
+$lock = $null
+if ($currentBranch -match '^(\d{3})-' -and (Test-Path (Get-FeatureDir -RepoRoot $repoRoot -Branch $currentBranch) -PathType Container)) {
+    $branchName = $currentBranch
+    $featureNum = $matches[1]
+    $specsDir = Split-Path (Get-FeatureDir -RepoRoot $repoRoot -Branch $currentBranch) -Parent
+    $specsRel = [System.IO.Path]::GetRelativePath($repoRoot, $specsDir).Replace('\', '/')
+} else {
+    # 番号は全ワークツリーのspecsルートとローカルの機能ブランチを通して決める
+    # （別のワークツリーで作成中の未マージの機能と衝突しないように）。
+    # 複数ルートの場合は各ワークツリーのグローバルインデックスと作成先のルートだけを見て、
+    # 割り当てからインデックスへの追記までをメインのワークツリーのロックで直列化する
+    $worktrees = @($repoRoot)
+    if ($hasGit) {
+        git worktree list --porcelain 2>$null | ForEach-Object {
+            if ($_ -match '^worktree (.+)$') { $worktrees += $matches[1] }
+        }
+    }
+    $indexFile = Join-Path $repoRoot '.specify/features.tsv'
+    $indexHeader = "# feature`tspecs root (specify feature newが追記。``specify feature reindex``で再生成)"
+    if ($multiRoot) {
+        $lockRoot = if ($worktrees.Count -gt 1) { $worktrees[1] } else { $repoRoot }
+        $lockPath = Join-Path $lockRoot '.specify/features.tsv.lock'
+        New-Item -ItemType Directory -Path (Split-Path $lockPath -Parent) -Force | Out-Null
+        while (-not $lock) {
+            try {
+                $lock = [System.IO.File]::Open($lockPath, 'OpenOrCreate', 'ReadWrite', 'None')
+            } catch [System.IO.IOException] {
+                Start-Sleep -Milliseconds 100
+            }
+        }
+        if (-not (Test-Path $indexFile -PathType Leaf)) {
+            # 初回は全ルートを1回だけ走査してインデックスを作る（既存の機能と番号が衝突しないように）
+            $lines = @($indexHeader)
+            foreach ($root in (Get-SpecsRoots -RepoRoot $repoRoot)) {
+                $dir = Join-Path $repoRoot $root.Path
+                if (Test-Path $dir) {
+                    $lines += Get-ChildItem -Path $dir -Directory | Where-Object { $_.Name -match '^\d{3}-' } | ForEach-Object { "$($_.Name)`t$($root.Path)" }
+                }
+            }
+            Set-Content -LiteralPath $indexFile -Value $lines -Encoding utf8
+        }
+    }
+
+    $names = @()
+    if ($hasGit) {
+        $names += git for-each-ref --format='%(refname:short)' refs/heads 2>$null | Where-Object { $_ -match '^\d{3}-' }
+    }
+    foreach ($wt in ($worktrees | Select-Object -Unique)) {
+        $dir = Join-Path $wt $specsRel
+        if (Test-Path $dir) {
+            $names += Get-ChildItem -Path $dir -Directory | ForEach-Object { $_.Name }
+        }
+        $wtIndex = Join-Path $wt '.specify/features.tsv'
+        if ($multiRoot -and (Test-Path $wtIndex -PathType Leaf)) {
+            $names += Get-Content -LiteralPath $wtIndex -Encoding utf8 | Where-Object { $_ -match '^\d{3}-' } | ForEach-Object { $_.Split("`t")[0] }
+        }
+    }
+
+    $highest = 0
+    foreach ($name in $names) {
+        if ($name -match '^(\d{3})') {
             $num = [int]$matches[1]
             if ($num -gt $highest) { $highest = $num }
         }
     }
-}
-$next = $highest + 1
-$featureNum = ('{0:000}' -f $next)
-
-$branchName = $featureDesc.ToLower() -replace '[^a-z0-9]', '-' -replace '-{2,}', '-' -replace '^-', '' -replace '-$', ''
-$words = ($branchName -split '-') | Where-Object { $_ } | Select-Object -First 3
-$branchName = "$featureNum-$([string]::Join('-', $words))"
-
-if ($hasGit) {
-    try {
-        git checkout -b $branchName | Out-Null
-    } catch {
-        Write-Warning "gitブランチの作成に失敗しました: $branchName"
+    $next = $highest + 1
+    $featureNum = ('{0:000}' -f $next)
+
+    $branchName = $featureDesc.ToLower() -replace '[^a-z0-9]', '-' -replace '-{2,}', '-' -replace '^-', '' -replace '-$', ''
+    $words = ($branchName -split '-') | Where-Object { $_ } | Select-Object -First 3
+    $branchName = "$featureNum-$([string]::Join('-', $words))"
+
+    if ($hasGit) {
+        try {
+            git checkout -b $branchName | Out-Null
+        } catch {
+            Write-Warning "gitブランチの作成に失敗しました: $branchName"
+        }
+    } else {
+        Write-Warning "[specify] 警告: Gitリポジトリが検出されませんでした。$branchNameのブランチ作成をスキップしました"
+    }
+
+    if ($multiRoot) {
+        Add-Content -LiteralPath $indexFile -Value "$branchName`t$specsRel" -Encoding utf8
+        $lock.Dispose()
     }
-} else {
-    Write-Warning "[specify] 警告: Gitリポジトリが検出されませんでした。$branchNameのブランチ作成をスキップしました"
 }
 
 $featureDir = Join-Path $specsDir $branchName
@@ -91,10 +172,12 @@ New-Item -ItemType Directory -Path $featureDir -Force | Out-Null
 
 $template = Join-Path $repoRoot '.specify/templates/spec-template.md'
 $specFile = Join-Path $featureDir 'spec.md'
-if (Test-Path $template) { 
-    Copy-Item $template $specFile -Force 
-} else { 
-    New-Item -ItemType File -Path $specFile | Out-Null 
+if (-not (Test-Path $specFile)) {
+    if (Test-Path $template) {
+        Copy-Item $template $specFile -Force
+    } else {
+        New-Item -ItemType File -Path $specFile | Out-Null
+    }
 }
 
 # 現在のセッション用にSPECIFY_FEATURE環境変数を設定
@@ -106,6 +189,7 @@ if ($Json) {
         SPEC_FILE = $specFile
         FEATURE_NUM = $featureNum
         HAS_GIT = $hasGit
+        SPECS_ROOT = $specsRel
     }
     $obj | ConvertTo-Json -Compress
 } else {
@@ -113,5 +197,6 @@ if ($Json) {
     Write-Output "SPEC_FILE: $specFile"
     Write-Output "FEATURE_NUM: $featureNum"
     Write-Output "HAS_GIT: $hasGit"
+    Write-Output "SPECS_ROOT: $specsRel"
     Write-Output "SPECIFY_FEATURE environment variable set to: $branchName"
 }
@@ -25,13 +25,17 @@ Usage:
 """
 
 import os
+import signal
 import subprocess
 import sys
-import zipfile
 import tempfile
 import shutil
 import shlex
 import json
+import socket
+import threading
+from collections import Counter
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from typing import Optional, Tuple
 
@@ -52,6 +56,55 @@ import readchar
 import ssl
 import truststore
 
+from . import profiling
+from .artifacts import ArtifactCache, find_project_root, plan_field
+from .features import (
+    FeatureError,
+    PrerequisiteError,
+    check_prerequisites,
+    create_feature,
+    feature_paths,
+    get_current_feature,
+    get_repo_root,
+    has_git,
+    is_multi_root,
+    list_all_features,
+    rebuild_roots_index,
+)
+from .watch import Watcher, make_backend, read_stats
+from .clarify import scan_spec as scan_clarify_spec
+from .commands import AGENT_COMMANDS, BUDGETS_FILENAME, check_budgets, compact_agent_commands, installed_stats, load_budgets, template_stats
+from .gates import CONSTITUTION_RELPATH, GateError, evaluate as evaluate_gates, load_gates
+from .search import DB_RELPATH as SEARCH_DB_RELPATH, SearchError, SearchIndex
+from .client import QueryError, ServerUnavailable, default_socket_path, query as query_server
+from .server import serve as run_query_server, socket_in_use
+from .store import LINK_MODES, TemplateStore
+from .snapshot import (
+    cached_latest_release,
+    materialize as materialize_snapshot,
+    newer_release,
+    record_latest_release,
+    render_tree as render_snapshot_tree,
+    snapshot_release,
+    snapshot_root,
+    update_check_due,
+    update_check_enabled,
+)
+from .fleet import (
+    DRIFT as FLEET_DRIFT,
+    ERROR as FLEET_ERROR,
+    NOT_INITIALIZED as FLEET_NOT_INITIALIZED,
+    OK as FLEET_OK,
+    UNKNOWN as FLEET_UNKNOWN,
+    fleet_status as run_fleet_status,
+    load_release_manifests,
+    read_repo_list,
+)
+from .integrity import CHECKSUMS_ASSET, IntegrityError, StreamVerifier, find_asset, parse_checksums, verify_file
+from .transport import RateLimitBudget, RateLimitExceeded, Transport
+from .extract import CREATE, OVERWRITE, SKIP, extract_zip, merge_zip, open_archive, summarize_plan
+from .mirror import GITHUB_API, is_mirror_dir, load_release, local_asset, make_server as make_mirror_server, release_api_url, sync_release
+
 ssl_context = truststore.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
 client = httpx.Client(verify=ssl_context)
 
@@ -65,6 +118,11 @@ def _github_auth_headers(cli_token: str | None = None) -> dict:
     return {"Authorization": f"Bearer {token}"} if token else {}
 
 # 定数
+TEMPLATE_REPO_OWNER = "mosugi"
+TEMPLATE_REPO_NAME = "spec-kit-ja"
+# チェックサム不一致・途中切断時のダウンロード試行回数
+DOWNLOAD_ATTEMPTS = 3
+
 AI_CHOICES = {
     "copilot": "GitHub Copilot",
     "claude": "Claude Code",
@@ -131,10 +189,12 @@ class StepTracker:
                 s["status"] = status
                 if detail:
                     s["detail"] = detail
+                profiling.step(self.title, key, s["label"], status)
                 self._maybe_refresh()
                 return
         # If not present, add it
         self.steps.append({"key": key, "label": key, "status": status, "detail": detail})
+        profiling.step(self.title, key, key, status)
         self._maybe_refresh()
 
     def _maybe_refresh(self):
@@ -304,6 +364,19 @@ class BannerGroup(TyperGroup):
         show_banner()
         super().format_help(ctx, formatter)
 
+    def parse_args(self, ctx, args):
+        # 値なしの --profile は --profile=cprofile として扱う
+        # (clickの省略可能な値はサブコマンド名を値として取り込んでしまうため)
+        args = list(args)
+        i = 0
+        while i < len(args) and args[i].startswith("-"):
+            if args[i] == "--profile" and (i + 1 >= len(args) or args[i + 1] not in profiling.PROFILE_MODES):
+                args[i] = "--profile=cprofile"
+            elif args[i] in ("--profile", "--profile-output"):
+                i += 1  # 値を読み飛ばす
+            i += 1
+        return super().parse_args(ctx, args)
+
 
 app = typer.Typer(
     name="specify",
@@ -331,8 +404,23 @@ def show_banner():
 
 
 @app.callback()
-def callback(ctx: typer.Context):
+def callback(
+    ctx: typer.Context,
+    profile: str = typer.Option(None, "--profile", metavar="[cprofile|trace]", help="コマンドをプロファイル: cprofile (既定, .prof) または trace (Chromeトレース形式の.json)"),
+    profile_output: Path = typer.Option(None, "--profile-output", help="プロファイルの出力先 (既定: キャッシュディレクトリのprofiles/)"),
+):
     """サブコマンドが指定されていない場合にバナーを表示。"""
+    if profile:
+        if profile not in profiling.PROFILE_MODES:
+            console.print(f"[red]エラー:[/red] 無効なプロファイルモード '{profile}'。以下から選択: {', '.join(profiling.PROFILE_MODES)}")
+            raise typer.Exit(1)
+        profiling.start(profile, ctx.invoked_subcommand or "specify")
+
+        def finish():
+            path = profiling.stop(profile_output)
+            if path:
+                console.print(f"[dim]プロファイルを保存しました: {path} (specify profile show {shlex.quote(str(path))})[/dim]")
+        ctx.call_on_close(finish)
     # サブコマンドとヘルプフラグがない場合のみバナーを表示
     # (ヘルプはBannerGroupによって処理される)
     if ctx.invoked_subcommand is None and "--help" not in sys.argv and "-h" not in sys.argv:
@@ -345,10 +433,10 @@ def run_command(cmd: list[str], check_return: bool = True, capture: bool = False
     """シェルコマンドを実行し、オプションで出力をキャプチャ。"""
     try:
         if capture:
-            result = subprocess.run(cmd, check=check_return, capture_output=True, text=True, shell=shell)
+            result = profiling.run(cmd, check=check_return, capture_output=True, text=True, shell=shell)
             return result.stdout.strip()
         else:
-            subprocess.run(cmd, check=check_return, shell=shell)
+            profiling.run(cmd, check=check_return, shell=shell)
             return None
     except subprocess.CalledProcessError as e:
         if check_return:
@@ -398,7 +486,7 @@ def is_git_repo(path: Path = None) -> bool:
 
     try:
         # gitコマンドを使用してワークツリー内にあるかチェック
-        subprocess.run(
+        profiling.run(
             ["git", "rev-parse", "--is-inside-work-tree"],
             check=True,
             capture_output=True,
@@ -418,9 +506,9 @@ def init_git_repo(project_path: Path, quiet: bool = False) -> bool:
         os.chdir(project_path)
         if not quiet:
             console.print("[cyan]gitリポジトリを初期化中...[/cyan]")
-        subprocess.run(["git", "init"], check=True, capture_output=True)
-        subprocess.run(["git", "add", "."], check=True, capture_output=True)
-        subprocess.run(["git", "commit", "-m", "Specifyテンプレートからの初期コミット"], check=True, capture_output=True)
+        profiling.run(["git", "init"], check=True, capture_output=True)
+        profiling.run(["git", "add", "."], check=True, capture_output=True)
+        profiling.run(["git", "commit", "-m", "Specifyテンプレートからの初期コミット"], check=True, capture_output=True)
         if not quiet:
             console.print("[green]✓[/green] gitリポジトリが初期化されました")
         return True
@@ -433,39 +521,8 @@ def init_git_repo(project_path: Path, quiet: bool = False) -> bool:
         os.chdir(original_cwd)
 
 
-def download_template_from_github(ai_assistant: str, download_dir: Path, *, script_type: str = "sh", verbose: bool = True, show_progress: bool = True, client: httpx.Client = None, debug: bool = False, github_token: str = None) -> Tuple[Path, dict]:
-    repo_owner = "mosugi"
-    repo_name = "spec-kit-ja"
-    if client is None:
-        client = httpx.Client(verify=ssl_context)
-    
-    if verbose:
-        console.print(f"[cyan]{repo_owner}/{repo_name}から最新リリース情報を取得中...[/cyan]")
-    api_url = f"https://api.github.com/repos/{repo_owner}/{repo_name}/releases/latest"
-    
-    try:
-        response = client.get(
-            api_url,
-            timeout=30,
-            follow_redirects=True,
-            headers=_github_auth_headers(github_token),
-        )
-        status = response.status_code
-        if status != 200:
-            msg = f"GitHub APIが{status}を返しました: {api_url}"
-            if debug:
-                msg += f"\nResponse headers: {response.headers}\nBody (truncated 500): {response.text[:500]}"
-            raise RuntimeError(msg)
-        try:
-            release_data = response.json()
-        except ValueError as je:
-            raise RuntimeError(f"リリースJSONのパースに失敗: {je}\nRaw (truncated 400): {response.text[:400]}")
-    except Exception as e:
-        console.print(f"[red]リリース情報の取得エラー[/red]")
-        console.print(Panel(str(e), title="取得エラー", border_style="red"))
-        raise typer.Exit(1)
-    
-    # 指定されたAIアシスタント用のテンプレートアセットを検索
+def _select_template_asset(release_data: dict, ai_assistant: str, script_type: str) -> dict:
+    """リリースから指定されたAIアシスタント/スクリプトタイプのテンプレートアセットを選択。"""
     assets = release_data.get("assets", [])
     pattern = f"spec-kit-template-{ai_assistant}-{script_type}"
     matching_assets = [
@@ -480,6 +537,131 @@ def download_template_from_github(ai_assistant: str, download_dir: Path, *, scri
         asset_names = [a.get('name', '?') for a in assets]
         console.print(Panel("\n".join(asset_names) or "(アセットなし)", title="利用可能なアセット", border_style="yellow"))
         raise typer.Exit(1)
+    return asset
+
+
+def _template_from_local_source(source: Path, ai_assistant: str, download_dir: Path, *, script_type: str, verbose: bool, store: TemplateStore | None = None) -> Tuple[Path | None, dict]:
+    """ローカルのミラーディレクトリまたはzipファイルからテンプレートを取得（ネットワーク不要）。"""
+    release_data = asset = None
+    if source.is_file() and source.suffix == ".zip":
+        release = "local"
+        src_zip = source
+    elif source.is_dir() and is_mirror_dir(source):
+        try:
+            release_data = load_release(source, TEMPLATE_REPO_OWNER, TEMPLATE_REPO_NAME)
+        except (FileNotFoundError, ValueError) as e:
+            console.print(Panel(str(e), title="取得エラー", border_style="red"))
+            raise typer.Exit(1)
+        asset = _select_template_asset(release_data, ai_assistant, script_type)
+        release = release_data["tag_name"]
+        src_zip = local_asset(source, TEMPLATE_REPO_OWNER, TEMPLATE_REPO_NAME, release_data, asset)
+    else:
+        console.print(Panel(f"テンプレートソースとして使用できません: {source}\n(ミラーディレクトリ、.zipファイル、またはURLを指定してください)", title="取得エラー", border_style="red"))
+        raise typer.Exit(1)
+
+    if not src_zip.is_file():
+        console.print(Panel(f"ミラーにアセットがありません: {src_zip}", title="取得エラー", border_style="red"))
+        raise typer.Exit(1)
+    verifier = None
+    if release_data is not None:
+        try:
+            verifier = _verify_mirror_asset(source, release_data, asset, src_zip)
+        except (OSError, IntegrityError) as e:
+            console.print(Panel(str(e), title="取得エラー", border_style="red"))
+            raise typer.Exit(1)
+    if verbose:
+        console.print(f"[cyan]ローカルソースからテンプレートを使用:[/cyan] {src_zip}")
+        if verifier is not None and verifier.expected_sha256:
+            console.print(f"[cyan]SHA-256を検証しました:[/cyan] {verifier.sha256}")
+    metadata = {
+        "filename": src_zip.name,
+        "size": src_zip.stat().st_size,
+        "release": release,
+        "asset_url": str(src_zip),
+    }
+    if verifier is not None:
+        metadata.update(sha256=verifier.sha256, verified=verifier.expected_sha256 is not None)
+    if store is not None and store.has(metadata["filename"], metadata["size"]):
+        return None, dict(metadata, cached=True)
+    # 展開後に削除されるため、ソースそのものではなくコピーを渡す
+    zip_path = download_dir / src_zip.name
+    shutil.copyfile(src_zip, zip_path)
+    return zip_path, metadata
+
+
+def _verify_mirror_asset(root: Path, release_data: dict, asset: dict, path: Path) -> StreamVerifier:
+    """ミラー内のアセットをリリースのサイズとミラーのSHA256SUMSで照合する（SHA256SUMSがなければサイズのみ）。"""
+    expected_sha256 = None
+    checksums_asset = find_asset(release_data, CHECKSUMS_ASSET)
+    if checksums_asset is not None:
+        sums_path = local_asset(root, TEMPLATE_REPO_OWNER, TEMPLATE_REPO_NAME, release_data, checksums_asset)
+        sums = parse_checksums(sums_path.read_text(encoding="utf-8"))
+        if asset["name"] not in sums:
+            raise IntegrityError(f"{CHECKSUMS_ASSET}に{asset['name']}のエントリがありません")
+        expected_sha256 = sums[asset["name"]]
+    return verify_file(path, asset.get("size"), expected_sha256)
+
+
+def _resolve_template_source(template_source: str | None) -> str | None:
+    return template_source or os.getenv("SPECIFY_TEMPLATE_SOURCE") or None
+
+
+def _is_remote_source(source: str | None) -> bool:
+    return not source or source.startswith(("http://", "https://"))
+
+
+def _fetch_release_data(transport: Transport, source: str | None, *, github_token: str = None, debug: bool = False) -> dict:
+    """GitHub互換APIから最新リリースのメタデータを取得（失敗時は例外を送出）。"""
+    api_url = release_api_url(source or GITHUB_API, TEMPLATE_REPO_OWNER, TEMPLATE_REPO_NAME)
+    response = transport.get(
+        api_url,
+        timeout=30,
+        follow_redirects=True,
+        headers=_github_auth_headers(github_token),
+    )
+    status = response.status_code
+    if status != 200:
+        msg = f"GitHub APIが{status}を返しました: {api_url}"
+        if debug:
+            msg += f"\nResponse headers: {response.headers}\nBody (truncated 500): {response.text[:500]}"
+        raise RuntimeError(msg)
+    try:
+        return response.json()
+    except ValueError as je:
+        raise RuntimeError(f"リリースJSONのパースに失敗: {je}\nRaw (truncated 400): {response.text[:400]}")
+
+
+def download_template_from_github(ai_assistant: str, download_dir: Path, *, script_type: str = "sh", verbose: bool = True, show_progress: bool = True, client: httpx.Client = None, debug: bool = False, github_token: str = None, template_source: str = None, store: TemplateStore | None = None, release_data: dict | None = None) -> Tuple[Path | None, dict]:
+    """リリースを取得してテンプレートのzipをダウンロード。
+
+    storeに同じアセットの展開済みツリーがある場合はダウンロードせず、(None, metadata)を返す
+    (metadata["cached"]がTrue)。release_dataを渡した場合（initの先行取得）はAPI呼び出しを省略する。
+    """
+    repo_owner = TEMPLATE_REPO_OWNER
+    repo_name = TEMPLATE_REPO_NAME
+    source = _resolve_template_source(template_source)
+    if not _is_remote_source(source):
+        return _template_from_local_source(Path(source).expanduser(), ai_assistant, download_dir, script_type=script_type, verbose=verbose, store=store)
+    if client is None:
+        client = httpx.Client(verify=ssl_context)
+    transport = _make_transport(client, verbose=verbose or debug)
+    prefetched = release_data is not None
+    
+    if release_data is None:
+        if verbose:
+            console.print(f"[cyan]{repo_owner}/{repo_name}から最新リリース情報を取得中...[/cyan]")
+        try:
+            release_data = _fetch_release_data(transport, source, github_token=github_token, debug=debug)
+        except Exception as e:
+            console.print(f"[red]リリース情報の取得エラー[/red]")
+            detail = str(e)
+            if isinstance(e, RateLimitExceeded) and not _github_token(github_token):
+                detail += "\nヒント: --github-token またはGH_TOKEN/GITHUB_TOKENを設定すると上限が引き上げられます"
+            console.print(Panel(detail, title="取得エラー", border_style="red"))
+            raise typer.Exit(1)
+    
+    # 指定されたAIアシスタント用のテンプレートアセットを検索
+    asset = _select_template_asset(release_data, ai_assistant, script_type)
 
     download_url = asset["browser_download_url"]
     filename = asset["name"]
@@ -490,64 +672,168 @@ def download_template_from_github(ai_assistant: str, download_dir: Path, *, scri
         console.print(f"[cyan]サイズ:[/cyan] {file_size:,} バイト")
         console.print(f"[cyan]リリース:[/cyan] {release_data['tag_name']}")
 
+    if store is not None and store.has(filename, file_size):
+        if verbose:
+            console.print("[cyan]キャッシュ済みの展開ツリーを使用します（ダウンロードをスキップ）[/cyan]")
+        return None, {
+            "filename": filename,
+            "size": file_size,
+            "release": release_data["tag_name"],
+            "asset_url": download_url,
+            "cached": True,
+            "prefetched": prefetched,
+        }
+
     zip_path = download_dir / filename
+    headers = _github_auth_headers(github_token)
     if verbose:
         console.print(f"[cyan]テンプレートをダウンロード中...[/cyan]")
-    
-    try:
-        with client.stream(
-            "GET",
-            download_url,
-            timeout=60,
-            follow_redirects=True,
-            headers=_github_auth_headers(github_token),
-        ) as response:
-            if response.status_code != 200:
-                body_sample = response.text[:400]
-                raise RuntimeError(f"Download failed with {response.status_code}\nHeaders: {response.headers}\nBody (truncated): {body_sample}")
-            total_size = int(response.headers.get('content-length', 0))
-            with open(zip_path, 'wb') as f:
-                if total_size == 0:
-                    for chunk in response.iter_bytes(chunk_size=8192):
-                        f.write(chunk)
-                else:
-                    if show_progress:
-                        with Progress(
-                            SpinnerColumn(),
-                            TextColumn("[progress.description]{task.description}"),
-                            TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
-                            console=console,
-                        ) as progress:
-                            task = progress.add_task("Downloading...", total=total_size)
-                            downloaded = 0
-                            for chunk in response.iter_bytes(chunk_size=8192):
-                                f.write(chunk)
-                                downloaded += len(chunk)
-                                progress.update(task, completed=downloaded)
-                    else:
-                        for chunk in response.iter_bytes(chunk_size=8192):
-                            f.write(chunk)
-    except Exception as e:
-        console.print(f"[red]テンプレートのダウンロードエラー[/red]")
-        detail = str(e)
-        if zip_path.exists():
-            zip_path.unlink()
-        console.print(Panel(detail, title="ダウンロードエラー", border_style="red"))
-        raise typer.Exit(1)
+
+    def expected_checksum(future: Future) -> str | None:
+        try:
+            return future.result()
+        except Exception as e:
+            if zip_path.exists():
+                zip_path.unlink()
+            console.print(f"[red]チェックサムの取得エラー[/red]")
+            console.print(Panel(str(e), title="ダウンロードエラー", border_style="red"))
+            raise typer.Exit(1)
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="specify-checksum") as pool:
+        # SHA256SUMSはアセットのダウンロードと並行して取得し、照合時にのみ待つ
+        checksum_future = pool.submit(_fetch_expected_checksum, transport, release_data, filename, headers=headers)
+        for attempt in range(1, DOWNLOAD_ATTEMPTS + 1):
+            try:
+                verifier = _download_asset(transport, download_url, zip_path, StreamVerifier(file_size),
+                                           headers=headers, show_progress=show_progress)
+            except Exception as e:
+                error = e
+            else:
+                expected_sha256 = verifier.expected_sha256 = expected_checksum(checksum_future)
+                try:
+                    verifier.verify(filename)
+                    break
+                except IntegrityError as e:
+                    error = e
+            if zip_path.exists():
+                zip_path.unlink()
+            if isinstance(error, (IntegrityError, httpx.TransportError)) and attempt < DOWNLOAD_ATTEMPTS:
+                if verbose or debug:
+                    console.print(f"[yellow]再試行します ({attempt}/{DOWNLOAD_ATTEMPTS}):[/yellow] {error}")
+                transport.sleep(transport.backoff(attempt))
+                continue
+            console.print(f"[red]テンプレートのダウンロードエラー[/red]")
+            console.print(Panel(str(error), title="ダウンロードエラー", border_style="red"))
+            raise typer.Exit(1)
     if verbose:
         console.print(f"Downloaded: {filename}")
+        if expected_sha256:
+            console.print(f"[cyan]SHA-256を検証しました:[/cyan] {verifier.sha256}")
     metadata = {
         "filename": filename,
         "size": file_size,
         "release": release_data["tag_name"],
-        "asset_url": download_url
+        "asset_url": download_url,
+        "sha256": verifier.sha256,
+        "verified": expected_sha256 is not None,
+        "attempts": attempt,
+        "retries": transport.retries,
+        "prefetched": prefetched,
     }
     return zip_path, metadata
 
 
-def download_and_extract_template(project_path: Path, ai_assistant: str, script_type: str, is_current_dir: bool = False, *, verbose: bool = True, tracker: StepTracker | None = None, client: httpx.Client = None, debug: bool = False, github_token: str = None) -> Path:
+def _make_transport(client: httpx.Client, *, verbose: bool) -> Transport:
+    """再試行・バックオフと、プロセス間で共有するGitHubクォータを備えたトランスポート。"""
+    def on_retry(reason: str, seconds: float) -> None:
+        if verbose:
+            console.print(f"[yellow]{reason}: {seconds:.1f}秒後に再試行します[/yellow]")
+    return Transport(client, budget=RateLimitBudget(), on_retry=on_retry)
+
+
+def _prefetch_release(client: httpx.Client, template_source: str | None, github_token: str | None) -> dict | None:
+    """initの先行取得。1回だけ試し、レート制限では待たない（失敗時は本処理で取得し直す）。"""
+    source = _resolve_template_source(template_source)
+    if not _is_remote_source(source):
+        return None
+    transport = Transport(client, budget=RateLimitBudget(), attempts=1, max_wait=0)
+    return _fetch_release_data(transport, source, github_token=github_token)
+
+
+def _background(fn, *args) -> Future:
+    """デーモンスレッドで実行し、結果をFutureで返す（プロセスの終了時に完了を待たない）。"""
+    future: Future = Future()
+
+    def run():
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=run, name="specify-update-check", daemon=True).start()
+    return future
+
+
+def _future_result(future: Future | None, default=None):
+    """先行実行した処理の結果（失敗・未実行ならdefault）。"""
+    if future is None:
+        return default
+    try:
+        return future.result()
+    except Exception:
+        return default
+
+
+def _fetch_expected_checksum(client: httpx.Client | Transport, release_data: dict, filename: str, *, headers: dict) -> str | None:
+    """リリースのSHA256SUMSからアセットの期待値を返す（SHA256SUMSがない古いリリースではNone）。"""
+    checksums_asset = find_asset(release_data, CHECKSUMS_ASSET)
+    if checksums_asset is None:
+        return None
+    response = client.get(checksums_asset["browser_download_url"], timeout=30, follow_redirects=True, headers=headers)
+    if response.status_code != 200:
+        raise RuntimeError(f"{CHECKSUMS_ASSET}のダウンロードが{response.status_code}で失敗しました")
+    sums = parse_checksums(response.text)
+    if filename not in sums:
+        raise IntegrityError(f"{CHECKSUMS_ASSET}に{filename}のエントリがありません")
+    return sums[filename]
+
+
+def _download_asset(client: httpx.Client | Transport, url: str, zip_path: Path, verifier: StreamVerifier, *, headers: dict, show_progress: bool) -> StreamVerifier:
+    """アセットをストリームで書き込み、同じループでsha256とサイズを計算する（再読み込みなし）。"""
+    with profiling.span(f"download {url.rsplit('/', 1)[-1]}", "http"), \
+            client.stream("GET", url, timeout=60, follow_redirects=True, headers=headers) as response:
+        if response.status_code != 200:
+            body_sample = response.read()[:400].decode("utf-8", "replace")
+            raise RuntimeError(f"Download failed with {response.status_code}\nHeaders: {response.headers}\nBody (truncated): {body_sample}")
+        total_size = int(response.headers.get('content-length', 0))
+        with open(zip_path, 'wb') as f:
+            if total_size and show_progress:
+                with Progress(
+                    SpinnerColumn(),
+                    TextColumn("[progress.description]{task.description}"),
+                    TextColumn("[progress.percentage]{task.percentage:>3.0f}%"),
+                    console=console,
+                ) as progress:
+                    task = progress.add_task("Downloading...", total=total_size)
+                    for chunk in response.iter_bytes(chunk_size=8192):
+                        f.write(chunk)
+                        verifier.update(chunk)
+                        progress.update(task, completed=verifier.size)
+            else:
+                for chunk in response.iter_bytes(chunk_size=8192):
+                    f.write(chunk)
+                    verifier.update(chunk)
+    return verifier
+
+
+def download_and_extract_template(project_path: Path, ai_assistant: str, script_type: str, is_current_dir: bool = False, *, verbose: bool = True, tracker: StepTracker | None = None, client: httpx.Client = None, debug: bool = False, github_token: str = None, template_source: str = None, store: TemplateStore | None = None, link_mode: str = "auto", dry_run: bool = False, plan: list | None = None, release_data: dict | None = None) -> Path:
     """Download the latest release and extract it to create a new project.
     Returns project_path. Uses tracker if provided (with keys: fetch, download, extract, cleanup)
+    With a store, the archive is extracted into the template cache once and the project is
+    populated from there via hardlinks/reflinks (see store.TemplateStore).
+    When merging into the current directory, files identical to the archive member (size + CRC32)
+    are left untouched. If plan is given, (action, relpath) entries are appended to it; with
+    dry_run nothing is written to project_path.
     """
     current_dir = Path.cwd()
     
@@ -563,12 +849,21 @@ def download_and_extract_template(project_path: Path, ai_assistant: str, script_
             show_progress=(tracker is None),
             client=client,
             debug=debug,
-            github_token=github_token
+            github_token=github_token,
+            template_source=template_source,
+            store=store,
+            release_data=release_data,
         )
         if tracker:
-            tracker.complete("fetch", f"リリース {meta['release']} ({meta['size']:,} バイト)")
+            tracker.complete("fetch", f"リリース {meta['release']} ({meta['size']:,} バイト)" + (" 先行取得" if meta.get("prefetched") else ""))
             tracker.add("download", "Download template")
-            tracker.complete("download", meta['filename'])
+            if meta.get("cached"):
+                tracker.skip("download", "キャッシュ済み")
+            else:
+                detail = meta['filename'] + (" (SHA-256検証済み)" if meta.get("verified") else "")
+                if meta.get("attempts", 1) > 1:
+                    detail += f" ({meta['attempts']}回目で成功)"
+                tracker.complete("download", detail)
     except Exception as e:
         if tracker:
             tracker.error("fetch", str(e))
@@ -576,6 +871,9 @@ def download_and_extract_template(project_path: Path, ai_assistant: str, script_
             if verbose:
                 console.print(f"[red]テンプレートのダウンロードエラー:[/red] {e}")
         raise
+
+    if store is not None:
+        return _materialize_from_store(project_path, zip_path, meta, is_current_dir, store=store, link_mode=link_mode, verbose=verbose, tracker=tracker, debug=debug, dry_run=dry_run, plan=plan)
     
     if tracker:
         tracker.add("extract", "Extract template")
@@ -585,67 +883,40 @@ def download_and_extract_template(project_path: Path, ai_assistant: str, script_
     
     try:
         # Create project directory only if not using current directory
-        if not is_current_dir:
+        if not is_current_dir and not dry_run:
             project_path.mkdir(parents=True)
         
-        with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-            # List all files in the ZIP for debugging
-            zip_contents = zip_ref.namelist()
+        # Entry count is checked from the end-of-central-directory record before the archive is opened
+        with open_archive(zip_path) as zip_ref:
+            entry_count = len(zip_ref.infolist())
             if tracker:
                 tracker.start("zip-list")
-                tracker.complete("zip-list", f"{len(zip_contents)}個のエントリ")
+                tracker.complete("zip-list", f"{entry_count}個のエントリ")
             elif verbose:
-                console.print(f"[cyan]ZIPに{len(zip_contents)}個のアイテムが含まれています[/cyan]")
+                console.print(f"[cyan]ZIPに{entry_count}個のアイテムが含まれています[/cyan]")
             
-            # For current directory, extract to a temp location first
-            if is_current_dir:
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    temp_path = Path(temp_dir)
-                    zip_ref.extractall(temp_path)
-                    
-                    # Check what was extracted
-                    extracted_items = list(temp_path.iterdir())
-                    if tracker:
-                        tracker.start("extracted-summary")
-                        tracker.complete("extracted-summary", f"一時 {len(extracted_items)}個のアイテム")
-                    elif verbose:
-                        console.print(f"[cyan]{len(extracted_items)}個のアイテムを一時場所に展開しました[/cyan]")
-                    
-                    # Handle GitHub-style ZIP with a single root directory
-                    source_dir = temp_path
-                    if len(extracted_items) == 1 and extracted_items[0].is_dir():
-                        source_dir = extracted_items[0]
-                        if tracker:
-                            tracker.add("flatten", "Flatten nested directory")
-                            tracker.complete("flatten")
-                        elif verbose:
-                            console.print(f"[cyan]ネストされたディレクトリ構造を発見[/cyan]")
-                    
-                    # Copy contents to current directory
-                    for item in source_dir.iterdir():
-                        dest_path = project_path / item.name
-                        if item.is_dir():
-                            if dest_path.exists():
-                                if verbose and not tracker:
-                                    console.print(f"[yellow]ディレクトリをマージ中:[/yellow] {item.name}")
-                                # Recursively copy directory contents
-                                for sub_item in item.rglob('*'):
-                                    if sub_item.is_file():
-                                        rel_path = sub_item.relative_to(item)
-                                        dest_file = dest_path / rel_path
-                                        dest_file.parent.mkdir(parents=True, exist_ok=True)
-                                        shutil.copy2(sub_item, dest_file)
-                            else:
-                                shutil.copytree(item, dest_path)
-                        else:
-                            if dest_path.exists() and verbose and not tracker:
-                                console.print(f"[yellow]ファイルを上書き:[/yellow] {item.name}")
-                            shutil.copy2(item, dest_path)
-                    if verbose and not tracker:
+            # For current directory, merge member by member, skipping identical files
+            if is_current_dir or dry_run:
+                merge_plan = merge_zip(zip_ref, project_path, dry_run=dry_run)
+                if plan is not None:
+                    plan.extend(merge_plan)
+                counts = summarize_plan(merge_plan)
+                summary = f"作成 {counts[CREATE]}, 上書き {counts[OVERWRITE]}, スキップ {counts[SKIP]}"
+                if tracker:
+                    tracker.start("extracted-summary")
+                    tracker.complete("extracted-summary", summary)
+                elif verbose:
+                    if not dry_run:
+                        for action, rel in merge_plan:
+                            if action == OVERWRITE:
+                                console.print(f"[yellow]ファイルを上書き:[/yellow] {rel}")
                         console.print(f"[cyan]テンプレートファイルを現在のディレクトリにマージしました[/cyan]")
+                    console.print(f"[cyan]{summary}[/cyan]")
             else:
-                # Extract directly to project directory (original behavior)
-                zip_ref.extractall(project_path)
+                # Stream members into the project directory with size/ratio limits;
+                # a GitHub-style single root directory is stripped while extracting
+                with profiling.span("extract", "zip", entries=entry_count):
+                    extract_zip(zip_ref, project_path)
                 
                 # Check what was extracted
                 extracted_items = list(project_path.iterdir())
@@ -656,23 +927,6 @@ def download_and_extract_template(project_path: Path, ai_assistant: str, script_
                     console.print(f"[cyan]{len(extracted_items)}個のアイテムを{project_path}に展開:[/cyan]")
                     for item in extracted_items:
                         console.print(f"  - {item.name} ({'dir' if item.is_dir() else 'file'})")
-                
-                # Handle GitHub-style ZIP with a single root directory
-                if len(extracted_items) == 1 and extracted_items[0].is_dir():
-                    # Move contents up one level
-                    nested_dir = extracted_items[0]
-                    temp_move_dir = project_path.parent / f"{project_path.name}_temp"
-                    # Move the nested directory contents to temp location
-                    shutil.move(str(nested_dir), str(temp_move_dir))
-                    # Remove the now-empty project directory
-                    project_path.rmdir()
-                    # Rename temp directory to project directory
-                    shutil.move(str(temp_move_dir), str(project_path))
-                    if tracker:
-                        tracker.add("flatten", "Flatten nested directory")
-                        tracker.complete("flatten")
-                    elif verbose:
-                        console.print(f"[cyan]ネストされたディレクトリ構造をフラット化しました[/cyan]")
                     
     except Exception as e:
         if tracker:
@@ -703,6 +957,115 @@ def download_and_extract_template(project_path: Path, ai_assistant: str, script_
     return project_path
 
 
+def _materialize_from_store(project_path: Path, zip_path: Path | None, meta: dict, is_current_dir: bool, *, store: TemplateStore, link_mode: str, verbose: bool, tracker: StepTracker | None, debug: bool, dry_run: bool = False, plan: list | None = None) -> Path:
+    """テンプレートストアの展開済みツリーからプロジェクトを配置。"""
+    if tracker:
+        tracker.add("extract", "Extract template")
+        tracker.start("extract", "キャッシュから" if meta.get("cached") else "")
+    elif verbose:
+        console.print("Extracting template...")
+    created = False
+    try:
+        if zip_path is not None:
+            manifest = store.ensure(zip_path, meta["filename"], meta["size"])
+        else:
+            manifest = store.load_manifest(meta["filename"], meta["size"])
+        if tracker:
+            tracker.start("zip-list")
+            tracker.complete("zip-list", f"{len(manifest['files'])}個のファイル")
+        if not is_current_dir and not dry_run:
+            project_path.mkdir(parents=True)
+            created = True
+        with profiling.span("materialize", "zip", mode=link_mode, files=len(manifest["files"])):
+            counts = store.materialize(meta["filename"], meta["size"], manifest, project_path, mode=link_mode,
+                                       overwrite=is_current_dir, dry_run=dry_run, plan=plan)
+        summary = ", ".join(f"{method} {n}" for method, n in counts.items() if n)
+        if tracker:
+            tracker.start("extracted-summary")
+            tracker.complete("extracted-summary", summary)
+        elif verbose:
+            console.print(f"[cyan]テンプレートを配置しました:[/cyan] {summary}")
+    except Exception as e:
+        if tracker:
+            tracker.error("extract", str(e))
+        elif verbose:
+            console.print(f"[red]テンプレートの展開エラー:[/red] {e}")
+            if debug:
+                console.print(Panel(str(e), title="展開エラー", border_style="red"))
+        if created and project_path.exists():
+            shutil.rmtree(project_path)
+        raise typer.Exit(1)
+    else:
+        if tracker:
+            tracker.complete("extract")
+    finally:
+        if tracker:
+            tracker.add("cleanup", "Remove temporary archive")
+        if zip_path is not None and zip_path.exists():
+            zip_path.unlink()
+            if tracker:
+                tracker.complete("cleanup")
+            elif verbose:
+                console.print(f"Cleaned up: {zip_path.name}")
+        elif tracker:
+            tracker.skip("cleanup", "アーカイブなし")
+    return project_path
+
+
+def render_template_from_snapshot(project_path: Path, ai_assistant: str, script_type: str, is_current_dir: bool = False, *, source: Path, tracker: StepTracker | None = None, dry_run: bool = False, plan: list | None = None) -> Path:
+    """CLIに同梱したテンプレートのスナップショットからプロジェクトを作成（ネットワーク不要）。
+
+    内容はsnapshot_release()のリリースのzipと同一。--hereでのマージではサイズ/CRC32が同一の
+    既存ファイルはそのまま残す。
+    """
+    release = snapshot_release() or "(開発版)"
+    if tracker:
+        tracker.complete("fetch", f"同梱スナップショット {release}")
+        tracker.skip("download", "同梱スナップショット")
+        tracker.add("extract", "Extract template")
+        tracker.start("extract", "同梱スナップショットから")
+    created = False
+    try:
+        with profiling.span("render snapshot", "snapshot", agent=ai_assistant, script=script_type):
+            files = render_snapshot_tree(source, ai_assistant, script_type)
+        if tracker:
+            tracker.start("zip-list")
+            tracker.complete("zip-list", f"{len(files)}個のファイル")
+        if not is_current_dir and not dry_run:
+            project_path.mkdir(parents=True)
+            created = True
+        counts = materialize_snapshot(files, project_path, overwrite=is_current_dir, dry_run=dry_run, plan=plan)
+        if tracker:
+            tracker.start("extracted-summary")
+            tracker.complete("extracted-summary", f"作成 {counts[CREATE]}, 上書き {counts[OVERWRITE]}, スキップ {counts[SKIP]}")
+    except Exception as e:
+        if tracker:
+            tracker.error("extract", str(e))
+        if created and project_path.exists():
+            shutil.rmtree(project_path)
+        raise typer.Exit(1)
+    if tracker:
+        tracker.complete("extract")
+        tracker.add("cleanup", "Remove temporary archive")
+        tracker.skip("cleanup", "アーカイブなし")
+    return project_path
+
+
+def _check_latest_release(client: httpx.Client, github_token: str | None) -> str | None:
+    """GitHubの最新リリースのタグを取得してキャッシュに記録する（1回だけ試し、レート制限では待たない）。
+
+    失敗した場合も確認時刻は記録し、オフライン環境で毎回問い合わせないようにする。
+    """
+    transport = Transport(client, budget=RateLimitBudget(), attempts=1, max_wait=0)
+    try:
+        latest = _fetch_release_data(transport, None, github_token=github_token).get("tag_name")
+    except Exception:
+        record_latest_release(None)
+        raise
+    record_latest_release(latest)
+    return latest
+
+
 def ensure_executable_scripts(project_path: Path, tracker: StepTracker | None = None) -> None:
     """Ensure POSIX .sh scripts under .specify/scripts (recursively) have execute bits (no-op on Windows)."""
     if os.name == "nt":
@@ -723,7 +1086,8 @@ def ensure_executable_scripts(project_path: Path, tracker: StepTracker | None =
             except Exception:
                 continue
             st = script.stat(); mode = st.st_mode
-            if mode & 0o111:
+            # ハードリンクはテンプレートストアと共有しているため、権限を変更しない
+            if mode & 0o111 or st.st_nlink > 1:
                 continue
             new_mode = mode
             if mode & 0o400: new_mode |= 0o100
@@ -747,6 +1111,21 @@ def ensure_executable_scripts(project_path: Path, tracker: StepTracker | None =
             for f in failures:
                 console.print(f"  - {f}")
 
+def _print_merge_plan(plan: list[tuple[str, str]]) -> None:
+    """init --dry-runの計画を表示。"""
+    styles = {CREATE: ("作成", "green"), OVERWRITE: ("上書き", "yellow"), SKIP: ("スキップ", "bright_black")}
+    table = Table(show_header=True, header_style="cyan", box=None, padding=(0, 2))
+    table.add_column("操作")
+    table.add_column("パス")
+    order = {CREATE: 0, OVERWRITE: 1, SKIP: 2}
+    for action, rel in sorted(plan, key=lambda item: (order[item[0]], item[1])):
+        label, style = styles[action]
+        table.add_row(f"[{style}]{label}[/{style}]", f"[{style}]{rel}[/{style}]")
+    counts = summarize_plan(plan)
+    console.print()
+    console.print(table)
+    console.print(f"\n[bold]ドライラン:[/bold] 作成 {counts[CREATE]}, 上書き {counts[OVERWRITE]}, スキップ {counts[SKIP]} (ファイルは書き込まれていません)")
+
 @app.command()
 def init(
     project_name: str = typer.Argument(None, help="新しいプロジェクトディレクトリ名 (--here使用時はオプション)"),
@@ -759,14 +1138,20 @@ def init(
     skip_tls: bool = typer.Option(False, "--skip-tls", help="SSL/TLS検証をスキップ(非推奨)"),
     debug: bool = typer.Option(False, "--debug", help="ネットワークと抽出失敗時の詳細な診断出力を表示"),
     github_token: str = typer.Option(None, "--github-token", help="APIリクエストで使用するGitHubトークン (またはGH_TOKENやGITHUB_TOKEN環境変数を設定)"),
+    template_source: str = typer.Option(None, "--template-source", help="テンプレートの取得元: GitHub互換ミラーのURL、ミラーディレクトリ、または.zipファイル (またはSPECIFY_TEMPLATE_SOURCE環境変数)"),
+    link_mode: str = typer.Option("auto", "--link-mode", help="キャッシュからの配置方式: auto (reflink→コピー), reflink, hardlink (同一ボリュームでメタデータのみ。ファイルは読み取り専用のため、テンプレートやスクリプトを編集するプロジェクトではcopyを使用), copy"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="展開済みテンプレートのキャッシュを使用しない"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="ファイルを書き込まず、作成/上書き/スキップの計画のみ表示"),
+    compact: bool = typer.Option(False, "--compact", help="エージェントのコマンドファイルをコンパクトにレンダリング (コメント・冗長な空白・定型文を除去)"),
+    latest: bool = typer.Option(False, "--latest", help="同梱のスナップショット（リリースと一致する場合に既定で使用）ではなく、GitHubの最新リリースからテンプレートを取得"),
 ):
     """
-    最新のテンプレートから新しいSpecifyプロジェクトを初期化。
+    同梱のテンプレート（または最新リリース）から新しいSpecifyプロジェクトを初期化。
 
     このコマンドは以下を実行します:
     1. 必要なツールがインストールされているか確認 (gitはオプション)
     2. AIアシスタントを選択 (Claude Code, Gemini CLI, GitHub Copilot, Cursor, Qwen Code, opencode, Codex CLI, Windsurf, Kilo Code, またはAuggie CLI)
-    3. GitHubから適切なテンプレートをダウンロード
+    3. CLIに同梱したテンプレートをレンダリング (--latestまたは--template-source指定時はダウンロード)
     4. テンプレートを新しいプロジェクトディレクトリまたは現在のディレクトリに展開
     5. 新しいgitリポジトリを初期化 (--no-gitでなく、既存のリポジトリがない場合)
     6. オプションでAIアシスタントコマンドをセットアップ
@@ -789,6 +1174,10 @@ def init(
         specify init --here --ai codex
         specify init --here
         specify init --here --force  # 現在のディレクトリが空でない場合の確認をスキップ
+        specify init --here --ai claude --dry-run  # 変更されるファイルを事前に確認
+        specify init my-project --ai claude --latest  # GitHubの最新リリースを使用
+        specify init my-project --ai claude --template-source http://mirror.local:8787
+        specify init my-project --ai claude --template-source /srv/specify-mirror
     """
     # Show banner first
     show_banner()
@@ -817,7 +1206,9 @@ def init(
         if existing_items:
             console.print(f"[yellow]警告:[/yellow] 現在のディレクトリは空ではありません ({len(existing_items)}個のアイテム)")
             console.print("[yellow]テンプレートファイルは既存の内容とマージされ、既存のファイルを上書きする可能性があります[/yellow]")
-            if force:
+            if dry_run:
+                console.print("[cyan]--dry-runが指定されました: ファイルは書き込まれません[/cyan]")
+            elif force:
                 console.print("[cyan]--forceが指定されました: 確認をスキップしてマージを実行します[/cyan]")
             else:
                 # Ask for confirmation
@@ -840,6 +1231,30 @@ def init(
             console.print(error_panel)
             raise typer.Exit(1)
     
+    # Start independent I/O early: the release metadata fetch overlaps the interactive
+    # selections below and the git probe overlaps the download. Results are collected
+    # inside the tracker; a failed prefetch simply falls back to the regular fetch.
+    verify = not skip_tls
+    local_ssl_context = ssl_context if verify else False
+    local_client = httpx.Client(verify=local_ssl_context)
+    # Without --latest or a template source, templates are rendered from the snapshot bundled
+    # with the CLI when it matches a recorded release; the latest release is then only looked up
+    # to suggest an upgrade. An unreleased snapshot (e.g. a git HEAD ahead of the last release)
+    # is never used implicitly: init downloads the latest release as before.
+    use_snapshot = not latest and not _resolve_template_source(template_source) and snapshot_release() is not None
+    snapshot_source = snapshot_root() if use_snapshot else None
+    pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="specify-init")
+    release_future = update_future = None
+    if snapshot_source is None:
+        release_future = pool.submit(_prefetch_release, local_client, template_source, github_token)
+    elif update_check_enabled() and update_check_due():
+        update_future = _background(_check_latest_release, local_client, github_token)
+    git_repo_future = None
+    if not no_git and not dry_run:
+        # 新規ディレクトリは展開後に作られるため、親がワークツリー内かを確認する
+        git_repo_future = pool.submit(is_git_repo, project_path if here else project_path.parent)
+    pool.shutdown(wait=False)
+
     # Create formatted setup info with column alignment
     current_dir = Path.cwd()
     
@@ -859,7 +1274,7 @@ def init(
     # Check git only if we might need it (not --no-git)
     # Only set to True if the user wants it and the tool is available
     should_init_git = False
-    if not no_git:
+    if not no_git and not dry_run:
         should_init_git = check_tool("git", "https://git-scm.com/downloads")
         if not should_init_git:
             console.print("[yellow]Gitが見つかりません - リポジトリの初期化をスキップします[/yellow]")
@@ -922,6 +1337,10 @@ def init(
             console.print(error_panel)
             raise typer.Exit(1)
     
+    if link_mode not in LINK_MODES:
+        console.print(f"[red]エラー:[/red] 無効なリンクモード '{link_mode}'。以下から選択: {', '.join(LINK_MODES)}")
+        raise typer.Exit(1)
+
     # Determine script type (explicit, interactive, or OS default)
     if script_type:
         if script_type not in SCRIPT_TYPE_CHOICES:
@@ -959,42 +1378,60 @@ def init(
         ("zip-list", "アーカイブの内容"),
         ("extracted-summary", "展開サマリー"),
         ("chmod", "スクリプトの実行可能化"),
+        ("compact", "コマンドのコンパクト化"),
         ("cleanup", "クリーンアップ"),
         ("git", "gitリポジトリの初期化"),
         ("final", "完了")
     ]:
         tracker.add(key, label)
 
+    merge_plan: list[tuple[str, str]] = []
+
     # Use transient so live tree is replaced by the final static render (avoids duplicate output)
     with Live(tracker.render(), console=console, refresh_per_second=8, transient=True) as live:
         tracker.attach_refresh(lambda: live.update(tracker.render()))
         try:
-            # Create a httpx client with verify based on skip_tls
-            verify = not skip_tls
-            local_ssl_context = ssl_context if verify else False
-            local_client = httpx.Client(verify=local_ssl_context)
-
-            download_and_extract_template(project_path, selected_ai, selected_script, here, verbose=False, tracker=tracker, client=local_client, debug=debug, github_token=github_token)
-
-            # Ensure scripts are executable (POSIX)
-            ensure_executable_scripts(project_path, tracker=tracker)
-
-            # Git step
-            if not no_git:
-                tracker.start("git")
-                if is_git_repo(project_path):
-                    tracker.complete("git", "既存のリポジトリを検出")
-                elif should_init_git:
-                    if init_git_repo(project_path, quiet=True):
-                        tracker.complete("git", "初期化完了")
+            if snapshot_source is not None:
+                render_template_from_snapshot(project_path, selected_ai, selected_script, here, source=snapshot_source, tracker=tracker, dry_run=dry_run, plan=merge_plan)
+            else:
+                release_data = _future_result(release_future)
+                download_and_extract_template(project_path, selected_ai, selected_script, here, verbose=False, tracker=tracker, client=local_client, debug=debug, github_token=github_token, template_source=template_source, store=None if no_cache else TemplateStore(), link_mode=link_mode, dry_run=dry_run, plan=merge_plan, release_data=release_data)
+
+            if dry_run:
+                tracker.skip("chmod", "--dry-run")
+                tracker.skip("compact", "--dry-run")
+                tracker.skip("git", "--dry-run")
+                tracker.complete("final", "ドライラン (変更なし)")
+            else:
+                # Ensure scripts are executable (POSIX)
+                ensure_executable_scripts(project_path, tracker=tracker)
+
+                if compact:
+                    tracker.start("compact")
+                    before, after = compact_agent_commands(project_path, selected_ai)
+                    tracker.complete("compact", f"{before:,} → {after:,} バイト")
+                else:
+                    tracker.skip("compact", "--compactなし")
+
+                # Git step
+                if not no_git:
+                    tracker.start("git")
+                    in_repo = _future_result(git_repo_future)
+                    if in_repo is None:
+                        in_repo = is_git_repo(project_path)
+                    if in_repo:
+                        tracker.complete("git", "既存のリポジトリを検出")
+                    elif should_init_git:
+                        if init_git_repo(project_path, quiet=True):
+                            tracker.complete("git", "初期化完了")
+                        else:
+                            tracker.error("git", "初期化失敗")
                     else:
-                        tracker.error("git", "初期化失敗")
+                        tracker.skip("git", "gitが利用不可")
                 else:
-                    tracker.skip("git", "gitが利用不可")
-            else:
-                tracker.skip("git", "--no-gitフラグ")
+                    tracker.skip("git", "--no-gitフラグ")
 
-            tracker.complete("final", "プロジェクト準備完了")
+                tracker.complete("final", "プロジェクト準備完了")
         except Exception as e:
             tracker.error("final", str(e))
             console.print(Panel(f"初期化に失敗しました: {e}", title="失敗", border_style="red"))
@@ -1007,7 +1444,7 @@ def init(
                 _label_width = max(len(k) for k, _ in _env_pairs)
                 env_lines = [f"{k.ljust(_label_width)} → [bright_black]{v}[/bright_black]" for k, v in _env_pairs]
                 console.print(Panel("\n".join(env_lines), title="デバッグ環境", border_style="magenta"))
-            if not here and project_path.exists():
+            if not here and not dry_run and project_path.exists():
                 shutil.rmtree(project_path)
             raise typer.Exit(1)
         finally:
@@ -1016,6 +1453,21 @@ def init(
 
     # Final static tree (ensures finished state visible after Live context ends)
     console.print(tracker.render())
+
+    # The update check never delays init: a result that is not ready yet is reported by the
+    # next init through the cached tag.
+    if snapshot_source is not None and update_check_enabled():
+        latest = _future_result(update_future) if update_future is not None and update_future.done() else None
+        newer = newer_release(latest or cached_latest_release()[0])
+    else:
+        newer = None
+    if newer:
+        console.print(f"[yellow]新しいテンプレートのリリース {newer} があります[/yellow] (同梱: {snapshot_release()})。"
+                      f"[cyan]specify init --latest[/cyan] で最新のリリースを使用できます")
+
+    if dry_run:
+        _print_merge_plan(merge_plan)
+        return
     console.print("\n[bold green]プロジェクトの準備が整いました。[/bold green]")
     
     # Agent folder security notice
@@ -1144,6 +1596,670 @@ def check():
         console.print("[dim]ヒント: 最適な体験のためにAIアシスタントをインストールしてください[/dim]")
 
 
+@app.command()
+def parse(
+    paths: list[Path] = typer.Argument(..., help="解析するMarkdown成果物 (spec.md, plan.md, tasks.mdなど)"),
+    field: str = typer.Option(None, "--field", help="指定したフィールドの値のみを出力 (例: \"Language/Version\")"),
+    no_cache: bool = typer.Option(False, "--no-cache", help="解析キャッシュを使用しない"),
+):
+    """成果物を構造化モデル (JSON) として出力。解析結果はファイルのバージョンごとにキャッシュされます。"""
+    caches: dict = {}
+    results = {}
+    for path in paths:
+        if not path.is_file():
+            console.print(f"[red]エラー:[/red] ファイルが見つかりません: {path}")
+            raise typer.Exit(1)
+        root = None if no_cache else find_project_root(path)
+        cache = caches.setdefault(root, ArtifactCache(root))
+        results[str(path)] = cache.get(path)
+    for cache in caches.values():
+        cache.save()
+
+    if field is not None:
+        for model in results.values():
+            typer.echo(plan_field(model, field))
+        return
+    payload = next(iter(results.values())) if len(results) == 1 else results
+    typer.echo(json.dumps(payload, ensure_ascii=False, indent=2))
+
+
+@app.command()
+def watch(
+    debounce: float = typer.Option(0.3, "--debounce", help="変更をまとめて処理するまでの待機秒数"),
+    poll: bool = typer.Option(False, "--poll", help="inotifyを使わずポーリングで監視"),
+    interval: float = typer.Option(1.0, "--interval", help="ポーリング間隔 (秒)"),
+    no_agent_context: bool = typer.Option(False, "--no-agent-context", help="plan.md変更時のエージェントコンテキスト更新を無効化"),
+    once: bool = typer.Option(False, "--once", help="派生ファイルを一度だけ再生成して終了"),
+    stats: bool = typer.Option(False, "--stats", help="実行中または直近のwatchのカウンターを表示して終了"),
+):
+    """specs/と.specify/の変更を監視し、機能インデックス・タスク進捗・エージェントコンテキストを最新に保つ。"""
+    root = get_repo_root()
+    if stats:
+        typer.echo(json.dumps(read_stats(root), ensure_ascii=False, indent=2))
+        return
+
+    watcher = Watcher(root, agent_context=not no_agent_context, log=lambda msg: console.print(f"[yellow]{msg}[/yellow]"))
+    watcher.full_refresh()
+    if once:
+        console.print(f"[green]✓[/green] 派生ファイルを再生成しました ({len(watcher.index['features'])}個の機能)")
+        return
+
+    backend = make_backend(root, poll=poll, interval=interval)
+    console.print(f"[cyan]監視中:[/cyan] {root} [dim]({backend.name}, Ctrl+Cで終了)[/dim]")
+
+    def report(summary: dict):
+        if summary.get("rescan"):
+            console.print("[yellow]イベントキューが溢れたため全体を再走査しました[/yellow]")
+            return
+        parts = []
+        if summary["features"]:
+            parts.append(f"インデックス: {', '.join(summary['features'])}")
+        if summary["progress"]:
+            parts.append(f"進捗: {', '.join(summary['progress'])}")
+        if summary["agent_context"]:
+            parts.append("エージェントコンテキスト")
+        if parts:
+            console.print(f"[green]更新[/green] {' / '.join(parts)}")
+
+    try:
+        watcher.run(backend, debounce=debounce, on_batch=report)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        backend.close()
+    s = watcher.stats
+    console.print(f"\n[cyan]処理イベント:[/cyan] {s['events']}  [cyan]バッチ:[/cyan] {s['batches']}  [cyan]処理時間:[/cyan] {s['seconds']:.3f}秒")
+
+
+@app.command()
+def prereqs(
+    json_output: bool = typer.Option(False, "--json", help="JSON形式で出力"),
+    require_tasks: bool = typer.Option(False, "--require-tasks", help="tasks.mdが存在することを要求（実装フェーズ用）"),
+    include_tasks: bool = typer.Option(False, "--include-tasks", help="AVAILABLE_DOCSリストにtasks.mdを含める"),
+    paths_only: bool = typer.Option(False, "--paths-only", help="パス変数のみ出力（バリデーション無し）"),
+):
+    """check-prerequisites.sh/.ps1と同じ契約で前提条件をチェック（成果物のサイズとmtimeも報告）。"""
+    root = get_repo_root()
+    feature = get_current_feature(root)
+    if not has_git(root):
+        typer.echo("[specify] 警告: Gitリポジトリが検出されません; ブランチ検証をスキップしました", err=True)
+    try:
+        result = check_prerequisites(
+            root, feature, require_tasks=require_tasks, include_tasks=include_tasks, paths_only=paths_only
+        )
+    except PrerequisiteError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(1)
+
+    if json_output:
+        typer.echo(json.dumps(result, ensure_ascii=False, separators=(",", ":")))
+    elif paths_only:
+        for key, value in result.items():
+            typer.echo(f"{key}: {value}")
+    else:
+        artifacts = result["ARTIFACTS"]
+        typer.echo(f"FEATURE_DIR:{result['FEATURE_DIR']}")
+        typer.echo("AVAILABLE_DOCS:")
+        names = ["research.md", "data-model.md", "contracts/", "quickstart.md"] + (["tasks.md"] if include_tasks else [])
+        for name in names:
+            mark = "✓" if name in result["AVAILABLE_DOCS"] else "✗"
+            info = artifacts.get(name.rstrip("/"))
+            detail = f" ({info['size']:,} bytes)" if info and info["type"] == "file" else ""
+            typer.echo(f"  {mark} {name}{detail}")
+
+
+@app.command()
+def serve(
+    socket_path: Path = typer.Option(None, "--socket", help="UNIXソケットのパス (既定: SPECIFY_SOCKETまたはリポジトリごとの一時パス)"),
+    poll: bool = typer.Option(False, "--poll", help="inotifyを使わずポーリングで監視"),
+):
+    """パス・前提条件・機能インデックス・タスクグラフの問い合わせにUNIXソケットで応答する常駐サーバーを起動。"""
+    if not hasattr(socket, "AF_UNIX"):
+        console.print("[red]エラー:[/red] このプラットフォームはUNIXドメインソケットをサポートしていません")
+        raise typer.Exit(1)
+    root = get_repo_root()
+    socket_path = socket_path or default_socket_path(root)
+    try:
+        in_use = socket_in_use(socket_path)
+    except OSError as e:
+        console.print(f"[red]エラー:[/red] ソケットのパスを使用できません: {socket_path} ({e})")
+        raise typer.Exit(1)
+    if in_use:
+        console.print(f"[red]エラー:[/red] 既にサーバーが起動しています: {socket_path}")
+        raise typer.Exit(1)
+
+    def ready(server):
+        console.print(f"[cyan]待機中:[/cyan] {socket_path} [dim]({root}, Ctrl+Cで終了)[/dim]")
+        console.print(f"[dim]スクリプトから利用するには: export SPECIFY_SOCKET={shlex.quote(str(socket_path))}[/dim]")
+
+    # SIGTERMでも後始末（ソケットファイルの削除）を行う
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        run_query_server(root, socket_path, poll=poll, on_ready=ready)
+    except KeyboardInterrupt:
+        pass
+
+
+@app.command()
+def query(
+    kind: str = typer.Argument(..., help="クエリ種別: paths, prerequisites, feature-index, task-graph, stats"),
+    feature: str = typer.Option(None, "--feature", help="対象の機能 (既定: 現在のブランチまたはSPECIFY_FEATURE)"),
+    require_tasks: bool = typer.Option(False, "--require-tasks", help="tasks.mdが存在することを要求"),
+    include_tasks: bool = typer.Option(False, "--include-tasks", help="AVAILABLE_DOCSにtasks.mdを含める"),
+    paths_only: bool = typer.Option(False, "--paths-only", help="パスのみを返す (バリデーション無し)"),
+    socket_path: Path = typer.Option(None, "--socket", help="UNIXソケットのパス"),
+):
+    """起動中の`specify serve`に問い合わせて結果をJSONで出力。"""
+    args = {"require_tasks": require_tasks, "include_tasks": include_tasks, "paths_only": paths_only}
+    if feature:
+        args["feature"] = feature
+    try:
+        root = get_repo_root()
+        result = query_server(kind, socket_path or default_socket_path(root), root=root, **args)
+    except ServerUnavailable as e:
+        console.print(f"[red]エラー:[/red] specify serveに接続できません ({e})")
+        raise typer.Exit(3)
+    except QueryError as e:
+        typer.echo(str(e), err=True)
+        raise typer.Exit(1)
+    typer.echo(json.dumps(result, ensure_ascii=False))
+
+
+@app.command(context_settings={"ignore_unknown_options": True})
+def search(
+    query: list[str] = typer.Argument(..., help="検索語 (列指定: req:, entity:, stack:, kind:, feature:, title:, heading:, body:。-語で除外)"),
+    limit: int = typer.Option(20, "--limit", help="表示する最大件数"),
+    json_output: bool = typer.Option(False, "--json", help="JSON形式で出力"),
+    rebuild: bool = typer.Option(False, "--rebuild", help="インデックスを作り直してから検索"),
+):
+    """specs/配下の全成果物を全文検索（.specify/cache/search.dbを変更分だけ更新して使用）。"""
+    root = get_repo_root()
+    try:
+        if rebuild:
+            (root / SEARCH_DB_RELPATH).unlink(missing_ok=True)
+        with SearchIndex(root) as index:
+            refreshed = index.refresh()
+            results = index.search(" ".join(query), limit=limit)
+            stats = index.stats()
+    except SearchError as e:
+        console.print(f"[red]エラー:[/red] {e}")
+        raise typer.Exit(1)
+
+    if json_output:
+        typer.echo(json.dumps({"results": results, "index": {**stats, **refreshed}}, ensure_ascii=False, indent=2))
+        return
+    if not results:
+        console.print(f"[yellow]一致する文書はありません[/yellow] [dim]({stats['documents']}文書を検索)[/dim]")
+        return
+    for result in results:
+        location = result["path"] if result["line"] is None else f"{result['path']}:{result['line']}"
+        console.print(f"[cyan]{result['feature']}[/cyan] [bright_black]{result['kind']}[/bright_black] {location}", highlight=False)
+        console.print(f"  {result['snippet']}", markup=False, highlight=False)
+    console.print(f"[dim]{len(results)}件 / {stats['documents']}文書[/dim]")
+
+
+@app.command("clarify-scan")
+def clarify_scan(
+    spec: Path = typer.Argument(None, help="走査するspec.md (既定: 現在の機能のspec.md)"),
+    feature: str = typer.Option(None, "--feature", help="対象の機能 (既定: 現在のブランチまたはSPECIFY_FEATURE)"),
+    limit: int = typer.Option(0, "--limit", help="出力する候補の最大数 (0は無制限)"),
+    min_score: int = typer.Option(0, "--min-score", help="このスコア未満の候補を除外"),
+):
+    """/clarifyの前処理: 未決定マーカー・曖昧な語・数値のない非機能要件・受け入れ基準の欠落をスコア順のJSONで出力。"""
+    if spec is None:
+        root = get_repo_root()
+        spec = Path(feature_paths(root, feature or get_current_feature(root))["FEATURE_SPEC"])
+    if not spec.is_file():
+        console.print(f"[red]エラー:[/red] 仕様ファイルが見つかりません: {spec} (先に /specify を実行してください)")
+        raise typer.Exit(1)
+    cache = ArtifactCache(find_project_root(spec))
+    result = scan_clarify_spec(spec, cache)
+    cache.save()
+    candidates = [c for c in result["candidates"] if c["score"] >= min_score]
+    result["candidates"] = candidates[:limit] if limit > 0 else candidates
+    typer.echo(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+feature_app = typer.Typer(name="feature", help="機能ブランチと機能ディレクトリ (specs/NNN-*) の管理", add_completion=False)
+app.add_typer(feature_app, name="feature")
+
+
+@feature_app.command("new")
+def feature_new(
+    description: list[str] = typer.Argument(..., help="機能の説明 (ブランチ名は先頭3語から作成)"),
+    worktree: bool = typer.Option(False, "--worktree", help="現在のチェックアウトを切り替えず、専用のgit worktreeに機能を作成"),
+    path: Path = typer.Option(None, "--path", help="ワークツリーの作成先 (既定: ../<リポジトリ名>.worktrees/<ブランチ>)"),
+    base: str = typer.Option(None, "--base", help="ワークツリーの起点とするコミットまたはブランチ (既定: 現在のHEAD)"),
+    specs_root: str = typer.Option(None, "--root", help=".specify/configの[specs.roots]で宣言したspecsルート名 (既定: SPECIFY_SPECS_ROOT、カレントディレクトリのパッケージ、[specs] default)"),
+    json_output: bool = typer.Option(False, "--json", help="JSON形式で出力"),
+):
+    """新しい機能のブランチとspec.mdを作成（create-new-feature.shと同じ命名・番号付け）。"""
+    if path is not None and not worktree:
+        console.print("[red]エラー:[/red] --pathは--worktreeと併用してください")
+        raise typer.Exit(1)
+    root = get_repo_root()
+    if not worktree and not has_git(root):
+        typer.echo("[specify] 警告: Gitリポジトリが検出されません; ブランチ作成をスキップしました", err=True)
+    try:
+        result = create_feature(root, " ".join(description), worktree=worktree, worktree_path=path, base=base,
+                                specs_root=specs_root, cwd=Path.cwd())
+    except FeatureError as e:
+        console.print(f"[red]エラー:[/red] {e}")
+        raise typer.Exit(1)
+
+    if json_output:
+        typer.echo(json.dumps(result, ensure_ascii=False, separators=(",", ":")))
+        return
+    for key, value in result.items():
+        if value is not None:
+            typer.echo(f"{key}: {value}")
+    if worktree:
+        console.print(f"[dim]このワークツリーで作業するには: cd {shlex.quote(result['WORKTREE'])}[/dim]")
+
+
+@feature_app.command("list")
+def feature_list(
+    json_output: bool = typer.Option(False, "--json", help="JSON形式で出力"),
+):
+    """全ワークツリーの機能を、ブランチ・ワークツリー・成果物・タスク進捗とともに一覧表示。"""
+    root = get_repo_root()
+    cache = ArtifactCache(root)
+    features = list_all_features(root, cache)
+    cache.save()
+    if json_output:
+        typer.echo(json.dumps(features, ensure_ascii=False, indent=2))
+        return
+    if not features:
+        console.print("[yellow]機能がありません[/yellow] (specify feature new \"<説明>\" で作成)")
+        return
+    multi = is_multi_root(root)
+    table = Table(show_header=True, header_style="cyan", box=None, padding=(0, 2))
+    table.add_column("機能")
+    table.add_column("ワークツリー", overflow="fold")
+    if multi:
+        table.add_column("specsルート", overflow="fold")
+    table.add_column("成果物")
+    table.add_column("タスク", justify="right")
+    for feature in features:
+        name = feature["name"]
+        if feature["checked_out"]:
+            name = f"[green]{name}[/green]"
+        elif feature["dir"] is None:
+            name = f"[bright_black]{name}[/bright_black]"
+        where = feature["worktree"]
+        if where is None:
+            where = "[bright_black](ブランチのみ)[/bright_black]"
+        elif Path(where) == root:
+            where = "."
+        progress = feature.get("progress")
+        tasks = f"{progress['done']}/{progress['total']}" if progress else ""
+        specs = [Path(feature["dir"]).parent.relative_to(feature["worktree"]).as_posix()] if feature["dir"] else [""]
+        table.add_row(name, where, *(specs if multi else []),
+                      ", ".join(a.removesuffix(".md") for a in feature["artifacts"]), tasks)
+    console.print(table)
+
+
+@feature_app.command("reindex")
+def feature_reindex(
+    json_output: bool = typer.Option(False, "--json", help="JSON形式で出力"),
+):
+    """全specsルートを走査して機能→specsルートのグローバルインデックス (.specify/features.tsv) を作り直す。"""
+    root = get_repo_root()
+    result = rebuild_roots_index(root)
+    if json_output:
+        typer.echo(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        console.print(f"{result['features']}個の機能を{len(result['roots'])}個のspecsルートから索引しました")
+        for number, paths in result["collisions"].items():
+            console.print(f"[yellow]番号の重複[/yellow] {number}: {', '.join(paths)}")
+    if result["collisions"]:
+        raise typer.Exit(1)
+
+
+gates_app = typer.Typer(name="gates", help="憲法の機械判定ゲート", add_completion=False)
+app.add_typer(gates_app, name="gates")
+
+
+@gates_app.command("check")
+def gates_check(
+    feature: str = typer.Option(None, "--feature", help="対象の機能 (既定: 現在のブランチまたはSPECIFY_FEATURE)"),
+    constitution: Path = typer.Option(None, "--constitution", help="ルールを読み込む憲法ファイル (既定: .specify/memory/constitution.md)"),
+    json_output: bool = typer.Option(False, "--json", help="JSON形式で出力"),
+):
+    """constitution.mdの```gatesブロックのルールをplan.md/tasks.mdに対して評価（失敗があれば終了コード1）。"""
+    root = get_repo_root()
+    constitution = constitution or root / CONSTITUTION_RELPATH
+    if not constitution.is_file():
+        console.print(f"[red]エラー:[/red] 憲法ファイルが見つかりません: {constitution}")
+        raise typer.Exit(1)
+    feature_dir = Path(feature_paths(root, feature or get_current_feature(root))["FEATURE_DIR"])
+    cache = ArtifactCache(root)
+    try:
+        gates = load_gates(constitution)
+        result = evaluate_gates(gates, feature_dir, cache)
+    except GateError as e:
+        console.print(f"[red]エラー:[/red] {e}")
+        raise typer.Exit(1)
+    cache.save()
+
+    if json_output:
+        typer.echo(json.dumps(result, ensure_ascii=False, indent=2))
+    elif not gates:
+        console.print(f"[yellow]{constitution}にgatesブロックがありません[/yellow]")
+    else:
+        styles = {"pass": "green", "fail": "red", "skip": "bright_black", "manual": "yellow"}
+        for gate in result["gates"]:
+            status = gate["status"]
+            if status == "fail" and gate["severity"] == "warning":
+                status = "warn"
+            style = styles.get(gate["status"], "yellow") if status != "warn" else "yellow"
+            label = f"{gate['id']}" + (f" [dim]({gate['principle']})[/dim]" if gate["principle"] else "")
+            console.print(f"[{style}]{status.upper():<6}[/{style}] {label}: {gate['message']}")
+            for loc in gate["locations"]:
+                where = f"{loc['file']}:{loc['line']}" if loc["line"] else loc["file"]
+                console.print(f"         [bright_black]{where}[/bright_black] {loc['text']}", highlight=False)
+        s = result["summary"]
+        console.print(f"\n合格 {s['pass']} / 不合格 {s['fail']} / スキップ {s['skip']} / 要判断 {s['manual']}")
+    if not result["passed"]:
+        raise typer.Exit(1)
+
+
+templates_app = typer.Typer(name="templates", help="コマンドテンプレートのサイズ計測と予算チェック", add_completion=False)
+app.add_typer(templates_app, name="templates")
+
+
+@templates_app.command("stats")
+def templates_stats(
+    agent: list[str] = typer.Option(None, "--agent", help="対象のエージェント (複数指定可、既定: すべて)"),
+    script: str = typer.Option("sh", "--script", help="レンダリングに使うスクリプトタイプ: sh または ps"),
+    source: Path = typer.Option(None, "--source", help="コマンドテンプレートのディレクトリ (既定: templates/commands、なければ初期化済みプロジェクトのコマンドファイルを計測)"),
+    compact: bool = typer.Option(False, "--compact", help="予算チェックにコンパクトレンダリングのサイズを使用"),
+    check: bool = typer.Option(False, "--check", help="予算を超えるテンプレートがあれば終了コード1"),
+    budgets: Path = typer.Option(None, "--budgets", help=f"予算ファイル (既定: テンプレートディレクトリの{BUDGETS_FILENAME})"),
+    json_output: bool = typer.Option(False, "--json", help="JSON形式で出力"),
+):
+    """テンプレートごと・エージェントごとのバイト数と推定トークン数を表示。"""
+    agents = agent or list(AGENT_COMMANDS)
+    unknown = [a for a in agents if a not in AGENT_COMMANDS]
+    if unknown:
+        console.print(f"[red]エラー:[/red] 不明なエージェント: {', '.join(unknown)} ({', '.join(AGENT_COMMANDS)}から選択)")
+        raise typer.Exit(1)
+    if script not in SCRIPT_TYPE_CHOICES:
+        console.print(f"[red]エラー:[/red] 無効なスクリプトタイプ '{script}'。選択肢: {', '.join(SCRIPT_TYPE_CHOICES)}")
+        raise typer.Exit(1)
+    root = get_repo_root()
+    if source is None and (root / "templates" / "commands").is_dir():
+        source = root / "templates" / "commands"
+    if source is not None:
+        if not source.is_dir():
+            console.print(f"[red]エラー:[/red] テンプレートディレクトリが見つかりません: {source}")
+            raise typer.Exit(1)
+        rows = template_stats(source, agents, script)
+    else:
+        rows = installed_stats(root, agent or None)
+    if not rows:
+        console.print("[red]エラー:[/red] 計測するコマンドテンプレートがありません")
+        raise typer.Exit(1)
+
+    violations = None
+    if check:
+        budgets = budgets or (source / BUDGETS_FILENAME if source is not None else None)
+        if budgets is None:
+            console.print("[red]エラー:[/red] --checkには--budgetsで予算ファイルを指定してください")
+            raise typer.Exit(1)
+        if not budgets.is_file():
+            console.print(f"[red]エラー:[/red] 予算ファイルが見つかりません: {budgets}")
+            raise typer.Exit(1)
+        try:
+            violations = check_budgets(rows, load_budgets(budgets), compact=compact)
+        except (OSError, ValueError) as e:
+            console.print(f"[red]エラー:[/red] 予算ファイルを読み込めません: {budgets}: {e}")
+            raise typer.Exit(1)
+
+    if json_output:
+        result = {"rows": rows}
+        if violations is not None:
+            result["violations"] = violations
+        typer.echo(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        table = Table(show_header=True, header_style="bold")
+        for column in ("テンプレート", "エージェント"):
+            table.add_column(column)
+        for column in ("バイト", "トークン", "コンパクト", "削減率"):
+            table.add_column(column, justify="right")
+        totals: dict[str, list[int]] = {}
+        for row in rows:
+            saved = 1 - row["compact"]["tokens"] / row["tokens"] if row["tokens"] else 0
+            table.add_row(row["template"], row["agent"], f"{row['bytes']:,}", f"{row['tokens']:,}",
+                          f"{row['compact']['tokens']:,}", f"{saved:.0%}")
+            total = totals.setdefault(row["agent"], [0, 0, 0])
+            total[0] += row["bytes"]
+            total[1] += row["tokens"]
+            total[2] += row["compact"]["tokens"]
+        table.add_section()
+        for name, (size, tokens, compact_tokens) in totals.items():
+            saved = 1 - compact_tokens / tokens if tokens else 0
+            table.add_row("[bold]合計[/bold]", name, f"{size:,}", f"{tokens:,}", f"{compact_tokens:,}", f"{saved:.0%}")
+        console.print(table)
+        if violations is not None:
+            mode = "コンパクト" if compact else "通常"
+            for v in violations:
+                if v["budget"] is None:
+                    console.print(f"[red]予算なし[/red] {v['template']}: {v['tokens']:,} トークン ({v['agent']})")
+                else:
+                    console.print(f"[red]予算超過[/red] {v['template']}: {v['tokens']:,} > {v['budget']:,} トークン ({v['agent']})")
+            if not violations:
+                console.print(f"[green]すべてのテンプレートが予算内です ({mode}レンダリング)[/green]")
+    if violations:
+        raise typer.Exit(1)
+
+
+fleet_app = typer.Typer(name="fleet", help="多数のリポジトリのテンプレート導入状況の監査", add_completion=False)
+app.add_typer(fleet_app, name="fleet")
+
+_FLEET_STATUS_STYLES = {FLEET_OK: "green", FLEET_DRIFT: "yellow", FLEET_UNKNOWN: "red", FLEET_NOT_INITIALIZED: "bright_black", FLEET_ERROR: "red"}
+
+
+@fleet_app.command("status")
+def fleet_status_command(
+    paths: list[Path] = typer.Argument(None, help="監査するリポジトリ (チェックアウト) のディレクトリ"),
+    repos: str = typer.Option(None, "--repos", help="リポジトリのパスを1行に1つ書いたファイル (-で標準入力)"),
+    source: list[Path] = typer.Option(None, "--source", help="リリースマニフェストの取得元: ミラーディレクトリ、zip、zipを置いたディレクトリ (複数指定可。テンプレートストアは常に使用)"),
+    jobs: int = typer.Option(0, "--jobs", "-j", help="並行して走査するリポジトリ数 (既定: CPU数×4、最大32)"),
+    show_files: bool = typer.Option(False, "--files", help="変更・欠落したファイルを表示"),
+    check: bool = typer.Option(False, "--check", help="差分のある、またはリリースを特定できないリポジトリがあれば終了コード1"),
+    json_output: bool = typer.Option(False, "--json", help="JSON形式で出力"),
+):
+    """各リポジトリのテンプレートのリリースと、リリースから変更・削除されたファイルを報告。"""
+    targets = list(paths or [])
+    if repos:
+        if repos == "-":
+            targets += read_repo_list(sys.stdin.read(), Path.cwd())
+        else:
+            repo_list = Path(repos)
+            try:
+                targets += read_repo_list(repo_list.read_text(encoding="utf-8"), repo_list.resolve().parent)
+            except OSError as e:
+                console.print(f"[red]エラー:[/red] {e}")
+                raise typer.Exit(1)
+    if not targets:
+        console.print("[red]エラー:[/red] リポジトリのパスまたは--reposを指定してください")
+        raise typer.Exit(1)
+    try:
+        manifests = load_release_manifests(TemplateStore(), source or [])
+    except (OSError, ValueError) as e:
+        console.print(f"[red]エラー:[/red] {e}")
+        raise typer.Exit(1)
+    if not manifests:
+        console.print("[red]エラー:[/red] 照合するリリースマニフェストがありません "
+                      "(specify initでテンプレートストアに取り込むか、--sourceでミラーまたはzipを指定してください)")
+        raise typer.Exit(1)
+
+    results = run_fleet_status(targets, manifests, jobs=jobs or None)
+    if json_output:
+        typer.echo(json.dumps(results, ensure_ascii=False, indent=2))
+    else:
+        table = Table(show_header=True, header_style="cyan", box=None, padding=(0, 2))
+        table.add_column("リポジトリ", overflow="fold")
+        table.add_column("状態")
+        table.add_column("リリース")
+        table.add_column("エージェント")
+        table.add_column("一致", justify="right")
+        table.add_column("変更", justify="right")
+        table.add_column("欠落", justify="right")
+        for result in results:
+            status = f"[{_FLEET_STATUS_STYLES[result['status']]}]{result['status']}[/]"
+            agent = f"{result['agent']}/{result['script']}" if result["agent"] else ""
+            counted = result["files"] > 0
+            table.add_row(result["path"], status, result["release"] or "", agent,
+                          f"{result['matched']}/{result['files']}" if counted else "",
+                          str(len(result["modified"])) if counted else "",
+                          str(len(result["missing"])) if counted else "")
+        console.print(table)
+        for result in results:
+            if result["error"]:
+                console.print(f"[red]{result['path']}:[/red] {result['error']}")
+            elif show_files and (result["modified"] or result["missing"]):
+                console.print(f"[bold]{result['path']}[/bold]")
+                for rel in result["modified"]:
+                    console.print(f"  [yellow]変更[/yellow] {rel}")
+                for rel in result["missing"]:
+                    console.print(f"  [red]欠落[/red] {rel}")
+        counts = Counter(result["status"] for result in results)
+        console.print(", ".join(f"{status} {n}" for status, n in counts.most_common()) + f" ({len(manifests)}個のリリースマニフェストと照合)")
+    if check and any(result["status"] in (FLEET_DRIFT, FLEET_UNKNOWN, FLEET_ERROR) for result in results):
+        raise typer.Exit(1)
+
+
+mirror_app = typer.Typer(name="mirror", help="エアギャップ環境向けのテンプレートリリースのローカルミラー", add_completion=False)
+app.add_typer(mirror_app, name="mirror")
+
+
+@mirror_app.command("sync")
+def mirror_sync(
+    dest: Path = typer.Argument(..., help="ミラーを保存するディレクトリ"),
+    tag: str = typer.Option(None, "--tag", help="取り込むリリースタグ (既定: latest)"),
+    ai: list[str] = typer.Option(None, "--ai", help="取り込むAIアシスタントに限定 (複数指定可)"),
+    script: list[str] = typer.Option(None, "--script", help="取り込むスクリプトタイプに限定 (複数指定可)"),
+    api_url: str = typer.Option(GITHUB_API, "--api-url", help="同期元のGitHub互換APIのベースURL"),
+    skip_tls: bool = typer.Option(False, "--skip-tls", help="SSL/TLS検証をスキップ(非推奨)"),
+    github_token: str = typer.Option(None, "--github-token", help="APIリクエストで使用するGitHubトークン (またはGH_TOKENやGITHUB_TOKEN環境変数を設定)"),
+):
+    """GitHubリリースのメタデータとテンプレートアセットをローカルディレクトリにスナップショット。"""
+    for value, choices, label in ((ai, AI_CHOICES, "AIアシスタント"), (script, SCRIPT_TYPE_CHOICES, "スクリプトタイプ")):
+        invalid = [v for v in value or [] if v not in choices]
+        if invalid:
+            console.print(f"[red]エラー:[/red] 無効な{label} '{', '.join(invalid)}'。以下から選択: {', '.join(choices.keys())}")
+            raise typer.Exit(1)
+    patterns = [
+        f"spec-kit-template-{a}-{sc}-*.zip"
+        for a in (ai or ["*"])
+        for sc in (script or ["*"])
+    ] + [CHECKSUMS_ASSET] if (ai or script) else None
+
+    sync_client = _make_transport(httpx.Client(verify=False if skip_tls else ssl_context), verbose=True)
+    console.print(f"[cyan]{TEMPLATE_REPO_OWNER}/{TEMPLATE_REPO_NAME}のリリースを{dest}に同期中...[/cyan]")
+    try:
+        summary = sync_release(
+            sync_client,
+            dest,
+            TEMPLATE_REPO_OWNER,
+            TEMPLATE_REPO_NAME,
+            tag=tag,
+            patterns=patterns,
+            headers=_github_auth_headers(github_token),
+            api_base=api_url,
+            on_asset=lambda name, status: console.print(f"  [{'green' if status == 'downloaded' else 'bright_black'}]{status}[/] {name}"),
+        )
+    except (httpx.HTTPError, RuntimeError, OSError, ValueError, IntegrityError, RateLimitExceeded) as e:
+        console.print(Panel(str(e), title="同期エラー", border_style="red"))
+        raise typer.Exit(1)
+    console.print(
+        f"[green]✓[/green] リリース {summary['tag']}: "
+        f"{len(summary['downloaded'])}個をダウンロード, {len(summary['skipped'])}個は最新"
+    )
+
+
+@mirror_app.command("serve")
+def mirror_serve(
+    dest: Path = typer.Argument(..., help="配信するミラーディレクトリ"),
+    host: str = typer.Option("127.0.0.1", "--host", help="待ち受けアドレス"),
+    port: int = typer.Option(8787, "--port", help="待ち受けポート"),
+    verbose: bool = typer.Option(False, "--verbose", help="リクエストをログ出力"),
+):
+    """ミラーをGitHub互換の releases/latest とアセットのエンドポイントとしてHTTPで公開。"""
+    if not is_mirror_dir(dest):
+        console.print(f"[red]エラー:[/red] ミラーディレクトリではありません: {dest} (先に specify mirror sync を実行してください)")
+        raise typer.Exit(1)
+    server = make_mirror_server(dest, host, port, verbose=verbose)
+    console.print(f"[cyan]ミラーを配信中:[/cyan] http://{host}:{port} [dim]({dest}, Ctrl+Cで終了)[/dim]")
+    console.print(f"[dim]利用方法: specify init <project> --template-source http://{host}:{port}[/dim]")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+profile_app = typer.Typer(name="profile", help="--profileで記録したプロファイルの表示", add_completion=False)
+app.add_typer(profile_app, name="profile")
+
+
+@profile_app.command("show")
+def profile_show(
+    path: Path = typer.Argument(None, help="プロファイルファイル (.prof または .json)。省略時は最新のもの"),
+    top: int = typer.Option(15, "--top", help="表示するホットスポットの数"),
+    sort: str = typer.Option("cumulative", "--sort", help="cProfileの並び順: cumulative, tottime, calls"),
+    as_json: bool = typer.Option(False, "--json", help="JSONで出力"),
+):
+    """プロファイルの上位ホットスポットを要約。"""
+    if path is None:
+        path = profiling.latest_profile()
+        if path is None:
+            console.print(f"[red]エラー:[/red] プロファイルがありません ({profiling.default_profile_dir()})。例: specify --profile=trace init ...")
+            raise typer.Exit(1)
+    if not path.is_file():
+        console.print(f"[red]エラー:[/red] ファイルが見つかりません: {path}")
+        raise typer.Exit(1)
+    try:
+        if path.suffix == ".json":
+            summary = profiling.summarize_trace(path, top=top)
+        else:
+            summary = {"rows": profiling.summarize_cprofile(path, top=top, sort=sort)}
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        console.print(f"[red]エラー:[/red] プロファイルを読み込めません: {path}: {e}")
+        raise typer.Exit(1)
+    if as_json:
+        typer.echo(json.dumps(summary, ensure_ascii=False, indent=2))
+        return
+
+    console.print(f"[cyan]プロファイル:[/cyan] {path}")
+    if "rows" in summary:
+        table = Table(show_header=True, header_style="cyan", box=None, padding=(0, 2))
+        table.add_column("関数")
+        table.add_column("呼び出し", justify="right")
+        table.add_column("自身 (ms)", justify="right")
+        table.add_column("累積 (ms)", justify="right")
+        for row in summary["rows"]:
+            table.add_row(row["function"], f"{row['calls']:,}", f"{row['tottime_ms']:.1f}", f"{row['cumtime_ms']:.1f}")
+        console.print(table)
+        return
+
+    console.print(f"[cyan]コマンド:[/cyan] specify {summary['command']}  [cyan]合計:[/cyan] {summary['total_ms']:.1f} ms")
+    if summary["categories"]:
+        console.print("[cyan]カテゴリ別:[/cyan] " + ", ".join(f"{cat} {ms:.1f} ms" for cat, ms in summary["categories"].items()))
+    table = Table(show_header=True, header_style="cyan", box=None, padding=(0, 2))
+    table.add_column("種類")
+    table.add_column("スパン")
+    table.add_column("回数", justify="right")
+    table.add_column("合計 (ms)", justify="right")
+    table.add_column("最大 (ms)", justify="right")
+    for group in summary["hotspots"]:
+        table.add_row(group["cat"], group["name"], f"{group['count']:,}", f"{group['total_ms']:.1f}", f"{group['max_ms']:.1f}")
+    console.print(table)
+
+
 def main():
     app()
 
@@ -0,0 +1,269 @@
+"""
+仕様成果物 (spec.md / plan.md / tasks.md など) の共有パーサーとキャッシュ。
+
+各コマンドが同じMarkdownを個別にgrepする代わりに、ここで一度だけ構造化モデルへ
+変換し、パス+mtime+サイズをキーとしたコンパクトなバイナリキャッシュ
+(`.specify/cache/artifacts.bin`) に保存する。モデルはmarshalで直列化できる
+プレーンなdict/listのみで構成される。
+
+`.specify/cache/` にはすべてを無視する.gitignoreを置き、キャッシュがコミットされないようにする。
+"""
+
+import marshal
+import os
+import re
+from pathlib import Path
+from typing import Optional
+
+# キャッシュ形式を変更した場合はインクリメントする（古いキャッシュは破棄される）
+CACHE_FORMAT = 2
+CACHE_DIR = Path(".specify") / "cache"
+CACHE_RELPATH = CACHE_DIR / "artifacts.bin"
+
+# 英語のフィールド名と日本語テンプレートの見出し語の対応
+PLAN_FIELD_ALIASES = {
+    "Language/Version": ("Language/Version", "言語/バージョン"),
+    "Primary Dependencies": ("Primary Dependencies", "主要依存関係"),
+    "Storage": ("Storage", "ストレージ"),
+    "Testing": ("Testing", "テスト"),
+    "Target Platform": ("Target Platform", "ターゲットプラットフォーム"),
+    "Project Type": ("Project Type", "プロジェクトタイプ"),
+    "Performance Goals": ("Performance Goals", "パフォーマンス目標"),
+    "Constraints": ("Constraints", "制約"),
+    "Scale/Scope": ("Scale/Scope", "スケール/スコープ"),
+}
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_FIELD_RE = re.compile(r"\*\*([^*\n]+?)\*\*\s*[:：]\s*(.*?)(?=\s+\|\s+\*\*|$)")
+_CHECKBOX_RE = re.compile(r"^\s*[-*]\s+\[([ xX])\]\s+(.*)$")
+_TASK_ID_RE = re.compile(r"^(T\d{3,})\b")
+_REQ_DEF_RE = re.compile(r"^\s*[-*]\s+\*\*([A-Z]{2,5}-\d{3,})\*\*\s*[:：]\s*(.*)$")
+_REQ_REF_RE = re.compile(r"\b([A-Z]{2,5}-\d{3,})\b")
+_CLARIFY_RE = re.compile(r"\[NEEDS CLARIFICATION[^\]]*\]")
+
+
+def _parse_frontmatter(lines: list[str]) -> tuple[dict, int]:
+    """先頭のYAMLフロントマターを解析し、(値, 本文開始行インデックス)を返す。
+
+    テンプレートで使われる範囲（スカラーと1段のネストしたマッピング）のみを扱う。
+    """
+    if not lines or lines[0].strip() != "---":
+        return {}, 0
+    data: dict = {}
+    current: Optional[str] = None
+    for i, raw in enumerate(lines[1:], start=1):
+        if raw.strip() == "---":
+            return data, i + 1
+        if not raw.strip() or raw.lstrip().startswith("#"):
+            continue
+        key, sep, value = raw.strip().partition(":")
+        if not sep:
+            continue
+        value = value.strip().strip('"').strip("'")
+        if raw[:1] in (" ", "\t") and current is not None:
+            if not isinstance(data.get(current), dict):
+                data[current] = {}
+            data[current][key.strip()] = value
+        else:
+            current = key.strip()
+            data[current] = value
+    # 閉じ区切りがない場合はフロントマターとして扱わない
+    return {}, 0
+
+
+def parse_markdown(text: str) -> dict:
+    """Markdownテキストを構造化モデル（marshal可能なdict）に変換。"""
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    frontmatter, start = _parse_frontmatter(lines)
+
+    headings: list = []
+    fields: dict = {}
+    checklists: list = []
+    requirements: list = []
+    references: set = set()
+    clarifications: list = []
+    section = ""
+    in_fence = False
+
+    for idx in range(start, len(lines)):
+        line = lines[idx]
+        lineno = idx + 1
+        stripped = line.strip()
+
+        if stripped.startswith("```") or stripped.startswith("~~~"):
+            in_fence = not in_fence
+            continue
+
+        for m in _REQ_REF_RE.finditer(line):
+            references.add(m.group(1))
+
+        # コードブロック内のマーカーは記入例であり、未解決の確認事項として数えない
+        if in_fence:
+            continue
+
+        for m in _CLARIFY_RE.finditer(line):
+            clarifications.append({"text": m.group(0), "line": lineno})
+
+        m = _HEADING_RE.match(line)
+        if m:
+            section = m.group(2)
+            headings.append([len(m.group(1)), section, lineno])
+            continue
+
+        if stripped.startswith("**"):
+            for fm in _FIELD_RE.finditer(stripped):
+                name = fm.group(1).strip()
+                if name not in fields:
+                    fields[name] = fm.group(2).strip()
+
+        m = _CHECKBOX_RE.match(line)
+        if m:
+            body = m.group(2).strip()
+            tid = _TASK_ID_RE.match(body)
+            checklists.append({
+                "checked": m.group(1) != " ",
+                "text": body,
+                "line": lineno,
+                "id": tid.group(1) if tid else None,
+                "parallel": "[P]" in body,
+                "section": section,
+            })
+            continue
+
+        m = _REQ_DEF_RE.match(line)
+        if m:
+            requirements.append({"id": m.group(1), "text": m.group(2).strip(), "line": lineno})
+
+    return {
+        "frontmatter": frontmatter,
+        "headings": headings,
+        "fields": fields,
+        "checklists": checklists,
+        "requirements": requirements,
+        "references": sorted(references),
+        "clarifications": clarifications,
+    }
+
+
+def parse_file(path: Path) -> dict:
+    """ファイルを読み込んでparse_markdownの結果を返す。"""
+    return parse_markdown(Path(path).read_text(encoding="utf-8", errors="replace"))
+
+
+def plan_field(model: dict, name: str) -> str:
+    """plan.mdの技術コンテキストフィールドを取得。
+
+    update-agent-context.shのextract_plan_fieldと同じく、NEEDS CLARIFICATIONを
+    含む値と"N/A"は空文字列として扱う。英語名を指定すると日本語の見出し語も検索する。
+    """
+    fields = model.get("fields", {})
+    for candidate in PLAN_FIELD_ALIASES.get(name, (name,)):
+        value = fields.get(candidate)
+        if value is None:
+            continue
+        if "NEEDS CLARIFICATION" in value or value == "N/A":
+            return ""
+        return value
+    return ""
+
+
+def find_project_root(start: Path) -> Optional[Path]:
+    """.specifyまたは.gitを含む最も近い祖先ディレクトリを返す。"""
+    current = Path(start).resolve()
+    if current.is_file():
+        current = current.parent
+    for candidate in (current, *current.parents):
+        if (candidate / ".specify").is_dir() or (candidate / ".git").exists():
+            return candidate
+    return None
+
+
+def ensure_cache_dir(root: Path) -> Path:
+    """プロジェクトのキャッシュディレクトリを作り、gitの追跡対象から外す.gitignoreを置く。"""
+    cache_dir = Path(root) / CACHE_DIR
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    ignore = cache_dir / ".gitignore"
+    if not ignore.is_file():
+        ignore.write_text("*\n", encoding="utf-8")
+    return cache_dir
+
+
+class ArtifactCache:
+    """解析済み成果物の永続キャッシュ。
+
+    エントリは解決済みパスをキーに (st_mtime_ns, st_size, model) を保持する。
+    ファイルが変更されていなければ再解析せずにモデルを返す。
+    """
+
+    def __init__(self, root: Optional[Path]):
+        self.root = Path(root) if root else None
+        self.path = (self.root / CACHE_RELPATH) if root else None
+        self._entries: Optional[dict] = None
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            self._entries = {}
+            if self.path and self.path.is_file():
+                try:
+                    with self.path.open("rb") as f:
+                        fmt, entries = marshal.load(f)
+                    if fmt == CACHE_FORMAT and isinstance(entries, dict):
+                        self._entries = entries
+                except (EOFError, ValueError, TypeError, OSError):
+                    # 破損したキャッシュは黙って作り直す
+                    self._entries = {}
+        return self._entries
+
+    def get(self, path: Path) -> dict:
+        """パスのモデルを返す。変更があった場合のみ再解析する。"""
+        resolved = str(Path(path).resolve())
+        st = os.stat(resolved)
+        entries = self._load()
+        entry = entries.get(resolved)
+        if entry is not None and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            self.hits += 1
+            return entry[2]
+        self.misses += 1
+        model = parse_file(Path(resolved))
+        entries[resolved] = (st.st_mtime_ns, st.st_size, model)
+        self._dirty = True
+        return model
+
+    def invalidate(self, path: Path) -> None:
+        if self._load().pop(str(Path(path).resolve()), None) is not None:
+            self._dirty = True
+
+    def prune(self) -> int:
+        """存在しなくなったファイルのエントリを削除し、削除数を返す。"""
+        entries = self._load()
+        stale = [p for p in entries if not os.path.exists(p)]
+        for p in stale:
+            del entries[p]
+        if stale:
+            self._dirty = True
+        return len(stale)
+
+    def save(self) -> None:
+        """変更がある場合のみ、アトミックにキャッシュファイルを書き出す。"""
+        if not self._dirty or self.path is None:
+            return
+        try:
+            ensure_cache_dir(self.root)
+            tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+            with tmp.open("wb") as f:
+                marshal.dump((CACHE_FORMAT, self._entries), f)
+            os.replace(tmp, self.path)
+            self._dirty = False
+        except OSError:
+            # キャッシュは最適化にすぎないため、書き込み失敗は無視する
+            pass
+
+
+def load_artifact(path: Path, cache: Optional[ArtifactCache] = None) -> dict:
+    """キャッシュがあれば経由し、なければ直接解析してモデルを返す。"""
+    if cache is None:
+        return parse_file(path)
+    return cache.get(path)
@@ -0,0 +1,205 @@
+"""
+`/clarify`の前処理として仕様書の曖昧さ候補を機械的に抽出する (`specify clarify-scan`)。
+
+検出するもの:
+
+- marker: [NEEDS CLARIFICATION: ...] とTODO/TBD/未定などの未決定マーカー
+- placeholder: テンプレートのまま残った [...] プレースホルダー
+- vague: 定量化されていない曖昧な語（「高速」「適切」「robust」「many」など）
+- unmeasurable_nfr: 数値のない非機能要件（性能・可用性・スケールなど）
+- missing_acceptance: 受け入れシナリオの欠落、または結果 (Then) のないシナリオ
+
+日英の語彙を1つの名前付きグループの正規表現にまとめてモジュール読み込み時に
+コンパイルし、各行を1回の走査で照合する。結果はスコア順の候補リスト。
+"""
+
+import re
+from pathlib import Path
+from typing import Optional
+
+from .artifacts import ArtifactCache
+
+# カテゴリごとの基本スコア（大きいほど先に確認すべき）
+WEIGHTS = {
+    "marker": 10,
+    "missing_acceptance": 8,
+    "unmeasurable_nfr": 6,
+    "placeholder": 5,
+    "vague": 3,
+}
+# 要件（FR-001など）の行にある場合の加点
+REQUIREMENT_BONUS = 2
+# 同じ行に数値がある曖昧語（「高速 (200ms以内)」）や列挙の省略語は優先度を下げる
+QUANTIFIED_PENALTY = 2
+_LOW_VALUE_TERMS = {"etc", "and so on", "など", "等々"}
+
+_VAGUE_EN = (
+    "fast", "faster", "quick", "quickly", "slow", "responsive", "scalable", "robust", "intuitive",
+    "user-friendly", "easy", "easily", "simple", "simply", "efficient", "efficiently", "flexible",
+    "reliable", "secure", "securely", "seamless", "seamlessly", "appropriate", "appropriately",
+    "reasonable", "sufficient", "adequate", "optimal", "minimal", "large", "small", "many", "several",
+    "some", "few", "various", "numerous", "high", "low", "etc", "as needed", "if possible",
+    "as appropriate", "as soon as possible", "and so on", "approximately", "real-time", "best effort",
+)
+_VAGUE_JA = (
+    "高速", "迅速", "すばやく", "素早く", "速やかに", "直感的", "使いやすい", "わかりやすい", "分かりやすい",
+    "簡単", "容易", "簡潔", "適切", "十分", "堅牢", "柔軟", "効率的", "安全に", "高い信頼性", "スケーラブル",
+    "シームレス", "最適", "最小限", "大量", "多数", "多くの", "少数", "いくつか", "様々な", "さまざまな",
+    "一部の", "必要に応じて", "可能であれば", "可能な限り", "なるべく", "できるだけ", "ほぼ", "概ね",
+    "リアルタイム", "など", "等々", "ある程度",
+)
+_MARKERS = ("TODO", "TBD", "FIXME", "???", "未定", "要確認", "検討中")
+
+
+def _trie_pattern(words) -> str:
+    """語のリストを接頭辞を共有する正規表現に変換する（reは選択肢を先頭から順に試すため）。"""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for ch in word.lower():
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: dict) -> str:
+        end = "" in node
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 and not end else "(?:" + "|".join(branches) + ")"
+        return body + "?" if end else body
+
+    return build(trie)
+
+
+# 名前付きグループの1つの正規表現にまとめ、各行を1回の走査で照合する
+_SCAN_RE = re.compile(
+    r"(?P<marker>\[NEEDS CLARIFICATION[^\]]*\]|\b(?:"
+    + _trie_pattern(m for m in _MARKERS if m.isascii() and m.isalnum())
+    + r")\b|"
+    + _trie_pattern(m for m in _MARKERS if not (m.isascii() and m.isalnum()))
+    + r")"
+    r"|(?P<placeholder>\[(?!NEEDS CLARIFICATION)(?![ xX]\])[^\]\n]{1,80}\])(?!\()"
+    r"|(?P<vague>\b(?:" + _trie_pattern(_VAGUE_EN) + r")\b|" + _trie_pattern(_VAGUE_JA) + r")",
+    re.IGNORECASE,
+)
+
+# 非機能要件の話題（性能・可用性・スケール・セキュリティ運用など）
+_NFR_RE = re.compile(
+    r"\bNFR-\d+|パフォーマンス|性能|レイテンシ|応答時間|レスポンス|スループット|可用性|稼働率|"
+    r"同時接続|同時実行|スケール|負荷|容量|保持期間|復旧|"
+    r"\b(?:performance|latency|response time|throughput|availability|uptime|concurren\w*|scal\w+|"
+    r"load|capacity|retention|recovery|RTO|RPO)\b",
+    re.IGNORECASE,
+)
+# 測定可能な量（数値。要件IDの番号は事前に取り除く）
+_QUANTITY_RE = re.compile(r"\d")
+_REQ_ID_RE = re.compile(r"\b[A-Z]{2,5}-\d{3,}\b")
+
+_ACCEPTANCE_HEADING_RE = re.compile(r"受け入れシナリオ|受入基準|受け入れ基準|acceptance", re.IGNORECASE)
+_SCENARIO_RE = re.compile(r"^\s*(?:\d+\.|[-*])\s+")
+_THEN_RE = re.compile(r"\*\*結果\*\*|\bthen\b", re.IGNORECASE)
+# テンプレートの手順・チェックリストの節は対象外
+_SKIP_SECTION_RE = re.compile(
+    r"実行フロー|クイックガイドライン|セクション要件|AI生成用|レビューと受け入れチェックリスト|"
+    r"コンテンツ品質|要件の完全性|実行ステータス|"
+    r"execution flow|quick guidelines|review & acceptance checklist|execution status",
+    re.IGNORECASE,
+)
+
+
+def _candidate(category: str, term: str, line: int, section: str, text: str, requirement: Optional[str]) -> dict:
+    score = WEIGHTS[category] + (REQUIREMENT_BONUS if requirement else 0)
+    return {
+        "category": category,
+        "term": term,
+        "line": line,
+        "section": section,
+        "requirement": requirement,
+        "text": text.strip(),
+        "score": score,
+    }
+
+
+def _sections(model: dict) -> list[tuple[int, int, str, bool]]:
+    """見出しから (開始行, レベル, タイトル, 対象外か) のリスト。対象外は親の見出しから継承する。"""
+    result = []
+    stack: list[tuple[int, bool]] = []
+    for level, title, line in model["headings"]:
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        skip = bool(_SKIP_SECTION_RE.search(title)) or any(s for _lvl, s in stack)
+        stack.append((level, skip))
+        result.append((line, level, title, skip))
+    return result
+
+
+def scan_text(text: str, model: dict) -> list[dict]:
+    """仕様書のテキストと解析済みモデルから候補を抽出する（スコアの降順）。"""
+    requirement_lines = {r["line"]: r["id"] for r in model["requirements"]}
+    sections = _sections(model)
+    candidates: list[dict] = []
+    acceptance_sections = [(line, title) for line, _lvl, title, skip in sections
+                           if not skip and _ACCEPTANCE_HEADING_RE.search(title)]
+    scenarios = 0
+
+    section, skip, in_acceptance = "", False, False
+    next_index = 0
+    in_fence = False
+    for lineno, line in enumerate(text.splitlines(), start=1):
+        while next_index < len(sections) and sections[next_index][0] <= lineno:
+            _line, _level, section, skip = sections[next_index]
+            in_acceptance = bool(_ACCEPTANCE_HEADING_RE.search(section))
+            next_index += 1
+        stripped = line.strip()
+        if stripped.startswith("```") or stripped.startswith("~~~"):
+            in_fence = not in_fence
+            continue
+        if in_fence or skip or not stripped or stripped.startswith("#") or stripped.startswith("<!--"):
+            continue
+        requirement = requirement_lines.get(lineno)
+        quantified = bool(_QUANTITY_RE.search(_REQ_ID_RE.sub("", _SCENARIO_RE.sub("", line, count=1))))
+
+        seen_terms = set()
+        marked = False
+        for m in _SCAN_RE.finditer(line):
+            category = m.lastgroup
+            term = m.group(0)
+            key = (category, term.lower())
+            if key in seen_terms:
+                continue
+            seen_terms.add(key)
+            marked = marked or category == "marker"
+            candidate = _candidate(category, term, lineno, section, line, requirement)
+            if category == "vague" and (quantified or term.lower() in _LOW_VALUE_TERMS):
+                candidate["score"] -= QUANTIFIED_PENALTY
+            candidates.append(candidate)
+
+        nfr = _NFR_RE.search(line)
+        if nfr and not quantified and not marked:
+            candidates.append(_candidate("unmeasurable_nfr", nfr.group(0), lineno, section, line, requirement))
+
+        if in_acceptance and _SCENARIO_RE.match(line):
+            scenarios += 1
+            if not _THEN_RE.search(line):
+                candidates.append(_candidate("missing_acceptance", "結果/Then", lineno, section, line, requirement))
+
+    if not acceptance_sections:
+        candidates.append(_candidate("missing_acceptance", "受け入れシナリオ", 0, "", "受け入れシナリオの節がありません", None))
+    elif scenarios == 0:
+        line, title = acceptance_sections[0]
+        candidates.append(_candidate("missing_acceptance", "受け入れシナリオ", line, title, "受け入れシナリオが記述されていません", None))
+
+    candidates.sort(key=lambda c: (-c["score"], c["line"]))
+    return candidates
+
+
+def scan_spec(path: Path, cache: Optional[ArtifactCache] = None) -> dict:
+    """仕様ファイルを走査し、カテゴリ別の件数と候補リストを返す。"""
+    path = Path(path)
+    text = path.read_text(encoding="utf-8", errors="replace")
+    model = (cache or ArtifactCache(None)).get(path)
+    candidates = scan_text(text, model)
+    summary = dict.fromkeys(WEIGHTS, 0)
+    for candidate in candidates:
+        summary[candidate["category"]] += 1
+    return {"spec": str(path), "summary": summary, "candidates": candidates}
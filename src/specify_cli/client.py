@@ -0,0 +1,121 @@
+"""
+`specify serve` クエリサーバーの最小クライアント。
+
+標準ライブラリのみに依存し、単体のスクリプトとしても実行できる:
+
+    python3 client.py prerequisites --require-tasks --include-tasks
+"""
+
+import hashlib
+import json
+import os
+import socket
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+SOCKET_ENV = "SPECIFY_SOCKET"
+
+
+class ServerUnavailable(Exception):
+    """サーバーに接続できない場合に送出。"""
+
+
+class QueryError(Exception):
+    """サーバーがクエリの失敗を返した場合に送出。"""
+
+
+def default_socket_path(root: Path) -> Path:
+    """リポジトリルートごとのソケットパス（SPECIFY_SOCKETが優先）。
+
+    UNIXソケットのパス長制限を避けるため、一時ディレクトリ配下にルートのハッシュで配置する。
+    """
+    env = os.environ.get(SOCKET_ENV)
+    if env:
+        return Path(env)
+    digest = hashlib.sha1(str(Path(root).resolve()).encode("utf-8")).hexdigest()[:12]
+    uid = os.getuid() if hasattr(os, "getuid") else 0
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return Path(base) / f"specify-{uid}-{digest}.sock"
+
+
+def find_root(start: Path) -> Path:
+    """.specifyまたは.gitを含む最も近い祖先（見つからなければ開始ディレクトリ）。"""
+    start = Path(start).resolve()
+    for candidate in (start, *start.parents):
+        if (candidate / ".specify").is_dir() or (candidate / ".git").exists():
+            return candidate
+    return start
+
+
+def query(kind: str, socket_path: Path, timeout: float = 5.0, *, root: Optional[Path] = None, **args) -> object:
+    """クエリを1件送り、結果を返す。
+
+    rootを渡すとサーバーのリポジトリルートと照合し、異なればServerUnavailableを送出する。
+    """
+    request = {"query": kind, "args": args}
+    if root is not None:
+        request["args"]["root"] = str(Path(root).resolve())
+    feature = os.environ.get("SPECIFY_FEATURE")
+    if feature and "feature" not in args:
+        request["args"]["feature"] = feature
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(socket_path))
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            buf = b""
+            while not buf.endswith(b"\n"):
+                chunk = sock.recv(65536)
+                if not chunk:
+                    break
+                buf += chunk
+    except (FileNotFoundError, ConnectionRefusedError, socket.timeout, OSError) as e:
+        raise ServerUnavailable(str(e)) from e
+    try:
+        response = json.loads(buf.decode("utf-8"))
+    except ValueError as e:
+        # 応答前に切断された（サーバーの終了や処理中のクラッシュ）
+        raise ServerUnavailable(f"no valid response from server: {e}") from e
+    if not isinstance(response, dict):
+        raise ServerUnavailable("no valid response from server")
+    if response.get("unavailable"):
+        raise ServerUnavailable(response.get("error", "server unavailable"))
+    if not response.get("ok"):
+        raise QueryError(response.get("error", "unknown error"))
+    return response["result"]
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv or argv[0] in ("-h", "--help"):
+        print("Usage: client.py <paths|prerequisites|feature-index|task-graph|stats> "
+              "[--require-tasks] [--include-tasks] [--paths-only] [--feature NAME]")
+        return 0
+    kind, rest = argv[0], argv[1:]
+    args: dict = {}
+    while rest:
+        flag = rest.pop(0)
+        if flag == "--feature" and rest:
+            args["feature"] = rest.pop(0)
+        elif flag.startswith("--"):
+            args[flag[2:].replace("-", "_")] = True
+        else:
+            print(f"ERROR: Unknown argument '{flag}'", file=sys.stderr)
+            return 2
+    root = find_root(Path(os.environ.get("SPECIFY_ROOT") or Path.cwd()))
+    try:
+        result = query(kind, default_socket_path(root), root=root, **args)
+    except ServerUnavailable as e:
+        print(f"ERROR: specify serve is not running ({e})", file=sys.stderr)
+        return 3
+    except QueryError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    print(json.dumps(result, ensure_ascii=False, separators=(",", ":")))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
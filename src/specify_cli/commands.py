@@ -0,0 +1,293 @@
+"""
+コマンドテンプレート (templates/commands/*.md) のエージェント別レンダリングとサイズ計測。
+
+create-release-packages.shのgenerate_commandsと同じ変換（{SCRIPT}/{ARGS}/__AGENT__の
+置換、フロントマターのscripts:の削除、パスの書き換え、TOML形式への包み込み）をPythonで
+行い、エージェントごとのバイト数と推定トークン数を計測する。
+
+コンパクトレンダリングは、意味を変えずにプロンプトを短くする:
+コードブロック外のHTMLコメント、行末の空白、行中の連続する空白、連続する空行、
+各テンプレートに重複するユーザー入力の前置きを取り除く。TOML形式ではdescriptionと
+重複するプロンプト内のフロントマターも取り除く。
+
+パッケージングスクリプトから直接実行できるよう、このモジュールは標準ライブラリのみに依存する:
+
+    python src/specify_cli/commands.py compact [--toml] < in.md > out.md
+    python src/specify_cli/commands.py check [templates/commands] [--compact]
+"""
+
+import argparse
+import math
+import os
+import re
+import sys
+import tomllib
+from pathlib import Path
+from typing import Optional
+
+# エージェントごとのコマンドディレクトリ、拡張子、引数プレースホルダー
+AGENT_COMMANDS = {
+    "claude": (".claude/commands", "md", "$ARGUMENTS"),
+    "gemini": (".gemini/commands", "toml", "{{args}}"),
+    "copilot": (".github/prompts", "prompt.md", "$ARGUMENTS"),
+    "cursor": (".cursor/commands", "md", "$ARGUMENTS"),
+    "qwen": (".qwen/commands", "toml", "{{args}}"),
+    "opencode": (".opencode/command", "md", "$ARGUMENTS"),
+    "windsurf": (".windsurf/workflows", "md", "$ARGUMENTS"),
+    "codex": (".codex/prompts", "md", "$ARGUMENTS"),
+    "kilocode": (".kilocode/workflows", "md", "$ARGUMENTS"),
+    "auggie": (".augment/commands", "md", "$ARGUMENTS"),
+    "roo": (".roo/commands", "md", "$ARGUMENTS"),
+}
+
+BUDGETS_FILENAME = "budgets.toml"
+
+_PATH_REWRITES = (
+    (re.compile(r"/?memory/"), ".specify/memory/"),
+    (re.compile(r"/?scripts/"), ".specify/scripts/"),
+    (re.compile(r"/?templates/"), ".specify/templates/"),
+)
+_HTML_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+# 各テンプレートの冒頭にある「ユーザー入力を考慮すること」の前置きと見出し
+_INPUT_PREAMBLE_RE = re.compile(
+    r"^ユーザー(?:の)?入力は、エージェントから[^\n]*考慮してください[^\n]*\n+ユーザー入力[：:]\s*\n",
+    re.MULTILINE,
+)
+COMPACT_INPUT_LABEL = "ユーザー入力（空でない場合は、進める前に必ず考慮すること）:\n"
+_INNER_SPACES_RE = re.compile(r"(?<=\S) {2,}")
+_FRONTMATTER_RE = re.compile(r"\A---\n.*?\n---\n+", re.DOTALL)
+_PROMPT_RE = re.compile(r'(prompt = """\n)(.*)(\n""")', re.DOTALL)
+
+
+def command_filename(name: str, agent: str) -> str:
+    return f"{name}.{AGENT_COMMANDS[agent][1]}"
+
+
+def rewrite_paths(text: str) -> str:
+    """rewrite_paths()と同じく、memory/・scripts/・templates/を.specify/配下に書き換える。"""
+    lines = []
+    for line in text.split("\n"):
+        for pattern, replacement in _PATH_REWRITES:
+            line = pattern.sub(replacement, line)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def _strip_scripts_block(text: str) -> str:
+    out = []
+    dashes = 0
+    in_frontmatter = skip = False
+    for line in text.split("\n"):
+        if line == "---":
+            out.append(line)
+            dashes += 1
+            in_frontmatter = dashes == 1
+            continue
+        if in_frontmatter and line == "scripts:":
+            skip = True
+            continue
+        if in_frontmatter and skip and re.match(r"[a-zA-Z].*:", line):
+            skip = False
+        if in_frontmatter and skip and line[:1] in (" ", "\t"):
+            continue
+        out.append(line)
+    return "\n".join(out)
+
+
+def render_command(text: str, agent: str, script: str, *, compact: bool = False) -> str:
+    """1つのコマンドテンプレートをエージェント向けのファイル内容に変換する。"""
+    _dir, ext, arg_format = AGENT_COMMANDS[agent]
+    text = text.replace("\r", "")
+    description = next((line.split(":", 1)[1].strip() for line in text.split("\n") if line.startswith("description:")), "")
+    script_re = re.compile(rf"^\s*{re.escape(script)}:\s*(.*)$", re.MULTILINE)
+    m = script_re.search(text)
+    script_command = m.group(1) if m else f"(Missing script command for {script})"
+    body = text.replace("{SCRIPT}", script_command)
+    body = _strip_scripts_block(body)
+    body = rewrite_paths(body.replace("{ARGS}", arg_format).replace("__AGENT__", agent))
+    body = body.rstrip("\n")
+    if compact:
+        body = compact_body(body, toml=ext == "toml")
+    if ext == "toml":
+        return f'description = "{description}"\n\nprompt = """\n{body}\n"""\n'
+    return body + "\n"
+
+
+def compact_markdown(text: str) -> str:
+    """意味を保ったままMarkdownのプロンプトを短くする（コードブロックの中身は変更しない）。"""
+    text = _INPUT_PREAMBLE_RE.sub(COMPACT_INPUT_LABEL, text)
+    out: list[str] = []
+    in_fence = False
+    in_comment = False
+    for line in text.split("\n"):
+        if _FENCE_RE.match(line) and not in_comment:
+            in_fence = not in_fence
+            out.append(line.rstrip())
+            continue
+        if not in_fence:
+            if in_comment:
+                end = line.find("-->")
+                if end < 0:
+                    continue
+                line = line[end + 3:]
+                in_comment = False
+            line = _HTML_COMMENT_RE.sub("", line)
+            start = line.find("<!--")
+            if start >= 0:
+                line = line[:start]
+                in_comment = True
+                if not line.strip():
+                    continue
+        line = line.rstrip()
+        if not in_fence:
+            if not line and (not out or not out[-1]):
+                continue
+            line = _INNER_SPACES_RE.sub(" ", line)
+        out.append(line)
+    return "\n".join(out).strip("\n") + "\n"
+
+
+def compact_body(body: str, *, toml: bool = False) -> str:
+    """コマンド本文をコンパクトにする。TOMLではdescriptionと重複するフロントマターも除く。"""
+    body = compact_markdown(body).rstrip("\n")
+    if toml:
+        body = _FRONTMATTER_RE.sub("", body, count=1)
+    return body
+
+
+def compact_rendered(content: str, ext: str) -> str:
+    """レンダリング済みのコマンドファイルをコンパクトにする（TOMLはprompt部分のみ）。"""
+    if ext == "toml":
+        m = _PROMPT_RE.search(content)
+        if not m:
+            return content
+        prompt = compact_body(m.group(2), toml=True)
+        return content[:m.start(2)] + prompt + content[m.end(2):]
+    return compact_markdown(content)
+
+
+def compact_agent_commands(project: Path, agent: str) -> tuple[int, int]:
+    """プロジェクトにインストール済みのエージェントのコマンドをその場でコンパクトにする。
+
+    ストアからハードリンクされたファイルを書き換えないよう、一時ファイルに書いてから置き換える。
+    戻り値は (変更前の合計バイト数, 変更後の合計バイト数)。
+    """
+    directory, ext, _arg = AGENT_COMMANDS[agent]
+    before = after = 0
+    command_dir = Path(project) / directory
+    if not command_dir.is_dir():
+        return before, after
+    for path in sorted(command_dir.glob(f"*.{ext}")):
+        original = path.read_text(encoding="utf-8")
+        compacted = compact_rendered(original, "toml" if ext == "toml" else "md")
+        before += len(original.encode("utf-8"))
+        after += len(compacted.encode("utf-8"))
+        if compacted != original:
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            tmp.write_text(compacted, encoding="utf-8")
+            os.replace(tmp, path)
+    return before, after
+
+
+def estimate_tokens(text: str) -> int:
+    """トークン数の推定値（ASCIIは4文字で1トークン、それ以外は1文字1トークン）。
+
+    トークナイザーに依存せず決定的なため、予算チェックに使う。
+    """
+    non_ascii = sum(1 for ch in text if ord(ch) > 127)
+    return math.ceil((len(text) - non_ascii) / 4) + non_ascii
+
+
+def measure(content: str) -> dict:
+    return {"bytes": len(content.encode("utf-8")), "tokens": estimate_tokens(content)}
+
+
+def command_templates(source: Path) -> list[Path]:
+    return sorted(p for p in Path(source).glob("*.md") if p.is_file())
+
+
+def template_stats(source: Path, agents: list[str], script: str = "sh") -> list[dict]:
+    """テンプレートごと・エージェントごとの通常/コンパクトのサイズ。"""
+    rows = []
+    for template in command_templates(source):
+        text = template.read_text(encoding="utf-8")
+        for agent in agents:
+            full = render_command(text, agent, script)
+            compact = render_command(text, agent, script, compact=True)
+            rows.append({
+                "template": template.stem,
+                "agent": agent,
+                "file": command_filename(template.stem, agent),
+                **measure(full),
+                "compact": measure(compact),
+            })
+    return rows
+
+
+def installed_stats(project: Path, agents: Optional[list[str]] = None) -> list[dict]:
+    """初期化済みプロジェクトにインストールされたコマンドファイルのサイズ。"""
+    rows = []
+    for agent in agents or list(AGENT_COMMANDS):
+        directory, ext, _arg = AGENT_COMMANDS[agent]
+        for path in sorted((Path(project) / directory).glob(f"*.{ext}")):
+            content = path.read_text(encoding="utf-8")
+            compact = compact_rendered(content, "toml" if ext == "toml" else "md")
+            rows.append({
+                "template": path.name[: -len(ext) - 1],
+                "agent": agent,
+                "file": str(path.relative_to(project)),
+                **measure(content),
+                "compact": measure(compact),
+            })
+    return rows
+
+
+def load_budgets(path: Path) -> dict[str, int]:
+    """テンプレート名→推定トークン数の上限。"""
+    with open(path, "rb") as f:
+        return {str(k): int(v) for k, v in tomllib.load(f).get("budgets", {}).items()}
+
+
+def check_budgets(rows: list[dict], budgets: dict[str, int], *, compact: bool = False) -> list[dict]:
+    """予算を超えたテンプレート（エージェント間で最大のもの）のリスト。予算のないテンプレートも報告する。"""
+    worst: dict[str, dict] = {}
+    for row in rows:
+        tokens = row["compact"]["tokens"] if compact else row["tokens"]
+        if row["template"] not in worst or tokens > worst[row["template"]]["tokens"]:
+            worst[row["template"]] = {"template": row["template"], "agent": row["agent"], "tokens": tokens}
+    violations = []
+    for name, entry in sorted(worst.items()):
+        budget = budgets.get(name)
+        if budget is None or entry["tokens"] > budget:
+            violations.append({**entry, "budget": budget})
+    return violations
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="コマンドテンプレートのコンパクト化と予算チェック")
+    sub = parser.add_subparsers(dest="mode", required=True)
+    p_compact = sub.add_parser("compact", help="標準入力の本文をコンパクトにして標準出力へ")
+    p_compact.add_argument("--toml", action="store_true", help="TOMLのprompt用（フロントマターも除く）")
+    p_check = sub.add_parser("check", help="全エージェント・全スクリプトタイプで予算を確認")
+    p_check.add_argument("source", nargs="?", default="templates/commands")
+    p_check.add_argument("--compact", action="store_true", help="コンパクトレンダリングのサイズで判定")
+    args = parser.parse_args(argv)
+
+    if args.mode == "compact":
+        sys.stdout.write(compact_body(sys.stdin.read(), toml=args.toml) + "\n")
+        return 0
+    source = Path(args.source)
+    budgets = load_budgets(source / BUDGETS_FILENAME)
+    rows = template_stats(source, list(AGENT_COMMANDS), "sh") + template_stats(source, list(AGENT_COMMANDS), "ps")
+    violations = check_budgets(rows, budgets, compact=args.compact)
+    for v in violations:
+        if v["budget"] is None:
+            print(f"{v['template']}: no budget in {BUDGETS_FILENAME} ({v['tokens']} tokens, {v['agent']})", file=sys.stderr)
+        else:
+            print(f"{v['template']}: {v['tokens']} tokens exceeds budget {v['budget']} ({v['agent']})", file=sys.stderr)
+    return 1 if violations else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
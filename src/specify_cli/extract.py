@@ -0,0 +1,300 @@
+"""
+テンプレートアーカイブの展開とマージ計画。
+
+--hereでのマージでは、zipのセントラルディレクトリにあるサイズとCRC32を既存ファイルと
+比較し、内容が同一のファイルは書き込まない（mtimeを変えず、ビルドキャッシュや
+git statusの再走査を引き起こさない）。既存ファイルのハッシュはサイズが一致した
+場合にのみ計算する。
+
+ミラーや任意のテンプレートソースから取得したアーカイブは信頼できないため、展開は
+エントリ数・合計展開サイズ・圧縮率の上限をメンバーごとに書き込みながら検査する
+（zipヘッダーの申告値は事前検査にのみ使い、実際に展開したバイト数で判定する）。
+エントリ数はセントラルディレクトリを読み込む前にEOCDレコードから確認し、各メンバーは
+固定サイズのチャンクでストリーミングするため、メモリ使用量はアーカイブの大きさに
+依存しない。上限を超えた場合や失敗した場合は、書き込み途中のファイルと作成した
+ディレクトリを削除し、既存ファイルは変更しない。
+"""
+
+import os
+import shutil
+import struct
+import zipfile
+import zlib
+from pathlib import Path, PurePosixPath
+from typing import BinaryIO, Iterable, Optional
+
+from . import profiling
+
+CREATE = "create"
+OVERWRITE = "overwrite"
+SKIP = "skip"
+
+CHUNK_SIZE = 1024 * 1024
+MAX_ENTRIES_ENV = "SPECIFY_EXTRACT_MAX_ENTRIES"
+MAX_BYTES_ENV = "SPECIFY_EXTRACT_MAX_BYTES"
+MAX_RATIO_ENV = "SPECIFY_EXTRACT_MAX_RATIO"
+DEFAULT_MAX_ENTRIES = 10_000
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+DEFAULT_MAX_RATIO = 100
+# 小さなファイル（空白だけのファイルなど）は圧縮率が高くなりやすいので、
+# 展開サイズがこれを超えるまで圧縮率は検査しない
+RATIO_MIN_BYTES = 1024 * 1024
+
+_EOCD_SIG = b"PK\x05\x06"
+_EOCD_SIZE = 22
+_ZIP64_LOCATOR_SIG = b"PK\x06\x07"
+_ZIP64_LOCATOR_SIZE = 20
+_ZIP64_EOCD_SIG = b"PK\x06\x06"
+_STAGING_SUFFIX = ".specify-tmp"
+
+
+class ExtractLimitError(ValueError):
+    """アーカイブが展開の上限（エントリ数・サイズ・圧縮率）を超えた場合に送出。"""
+
+
+class ExtractLimits:
+    """展開の上限。省略した値は環境変数、なければ既定値を使う。"""
+
+    def __init__(self, max_entries: Optional[int] = None, max_bytes: Optional[int] = None,
+                 max_ratio: Optional[float] = None):
+        self.max_entries = int(os.environ.get(MAX_ENTRIES_ENV, DEFAULT_MAX_ENTRIES)) if max_entries is None else max_entries
+        self.max_bytes = int(os.environ.get(MAX_BYTES_ENV, DEFAULT_MAX_BYTES)) if max_bytes is None else max_bytes
+        self.max_ratio = float(os.environ.get(MAX_RATIO_ENV, DEFAULT_MAX_RATIO)) if max_ratio is None else max_ratio
+
+
+def strip_root_prefix(names: list[str]) -> str:
+    """全エントリが単一のルートディレクトリ配下にある場合、そのプレフィックスを返す。"""
+    tops = {PurePosixPath(n).parts[0] for n in names if PurePosixPath(n).parts}
+    if len(tops) != 1:
+        return ""
+    top = next(iter(tops))
+    if any(n.rstrip("/") == top and not n.endswith("/") for n in names):
+        return ""  # ルートがファイルの場合はフラット化しない
+    return top + "/"
+
+
+def is_safe_relpath(rel: str) -> bool:
+    path = PurePosixPath(rel.replace("\\", "/"))
+    return bool(path.parts) and not path.is_absolute() and ".." not in path.parts and ":" not in path.parts[0]
+
+
+def zip_members(zf: zipfile.ZipFile) -> list[tuple[str, zipfile.ZipInfo]]:
+    """(ルートを除いた相対パス, ZipInfo)のリスト。安全でないパスがあればValueError。"""
+    infos = zf.infolist()
+    prefix = strip_root_prefix([i.filename for i in infos])
+    members = []
+    for info in infos:
+        rel = (info.filename[len(prefix):] if prefix else info.filename).rstrip("/")
+        if not rel:
+            continue
+        if not is_safe_relpath(rel):
+            raise ValueError(f"アーカイブに安全でないパスが含まれています: {info.filename}")
+        members.append((rel, info))
+    return members
+
+
+def declared_entry_count(fp: BinaryIO) -> Optional[int]:
+    """EOCD（Zip64ではZip64 EOCD）に記録されたエントリ数。見つからなければNone。
+
+    セントラルディレクトリ全体を読み込まずに、末尾の最大64KiB+22バイトだけを読む。
+    """
+    fp.seek(0, os.SEEK_END)
+    size = fp.tell()
+    tail_len = min(size, _EOCD_SIZE + 0xFFFF)
+    fp.seek(size - tail_len)
+    tail = fp.read(tail_len)
+    pos = tail.rfind(_EOCD_SIG)
+    if pos < 0 or len(tail) - pos < _EOCD_SIZE:
+        return None
+    (entries,) = struct.unpack("<H", tail[pos + 10:pos + 12])
+    locator = tail[pos - _ZIP64_LOCATOR_SIZE:pos] if pos >= _ZIP64_LOCATOR_SIZE else b""
+    if entries == 0xFFFF and locator[:4] == _ZIP64_LOCATOR_SIG:
+        (offset,) = struct.unpack("<Q", locator[8:16])
+        fp.seek(offset)
+        record = fp.read(40)
+        if record[:4] == _ZIP64_EOCD_SIG and len(record) == 40:
+            (entries,) = struct.unpack("<Q", record[32:40])
+    return entries
+
+
+def open_archive(path: Path, limits: Optional[ExtractLimits] = None) -> zipfile.ZipFile:
+    """エントリ数の上限をEOCDで確認してからzipを開く（巨大なセントラルディレクトリを読み込まない）。"""
+    limits = limits or ExtractLimits()
+    with open(path, "rb") as fp:
+        entries = declared_entry_count(fp)
+    if entries is not None and entries > limits.max_entries:
+        raise ExtractLimitError(
+            f"アーカイブのエントリ数が上限を超えています: {entries:,} > {limits.max_entries:,} ({MAX_ENTRIES_ENV}で変更可能)"
+        )
+    return zipfile.ZipFile(path)
+
+
+class BoundedExtractor:
+    """上限を検査しながらzipのメンバーを書き出す。1つのアーカイブの展開ごとに作る。"""
+
+    def __init__(self, zf: zipfile.ZipFile, limits: Optional[ExtractLimits] = None):
+        self.zf = zf
+        self.limits = limits or ExtractLimits()
+        self.written = 0
+
+    def members(self) -> list[tuple[str, zipfile.ZipInfo]]:
+        """安全なメンバーのリスト。申告値で上限を超えることが明らかなら書き込む前に失敗する。"""
+        infos = self.zf.infolist()
+        if len(infos) > self.limits.max_entries:
+            raise ExtractLimitError(
+                f"アーカイブのエントリ数が上限を超えています: {len(infos):,} > {self.limits.max_entries:,} ({MAX_ENTRIES_ENV}で変更可能)"
+            )
+        members = zip_members(self.zf)
+        declared = 0
+        for rel, info in members:
+            declared += info.file_size
+            self._check_ratio(rel, info.file_size, info.compress_size)
+        self._check_total(declared)
+        return members
+
+    def _check_total(self, total: int) -> None:
+        if total > self.limits.max_bytes:
+            raise ExtractLimitError(
+                f"展開サイズが上限を超えています: {total:,} > {self.limits.max_bytes:,} バイト ({MAX_BYTES_ENV}で変更可能)"
+            )
+
+    def _check_ratio(self, rel: str, size: int, compressed: int) -> None:
+        if size > RATIO_MIN_BYTES and size > self.limits.max_ratio * max(compressed, 1):
+            raise ExtractLimitError(
+                f"{rel}: 圧縮率が上限を超えています ({size / max(compressed, 1):,.0f}:1 > {self.limits.max_ratio:g}:1, {MAX_RATIO_ENV}で変更可能)"
+            )
+
+    def copy(self, rel: str, info: zipfile.ZipInfo, dst: BinaryIO) -> int:
+        """1メンバーを固定サイズのチャンクで書き出し、チャンクごとに上限を検査する。"""
+        size = 0
+        with self.zf.open(info) as src:
+            while chunk := src.read(CHUNK_SIZE):
+                size += len(chunk)
+                if size > info.file_size:
+                    raise ExtractLimitError(f"{rel}: 展開サイズがヘッダーの申告値 ({info.file_size:,} バイト) を超えています")
+                self._check_total(self.written + size)
+                self._check_ratio(rel, size, info.compress_size)
+                dst.write(chunk)
+        self.written += size
+        return size
+
+
+def _mkdirs(path: Path, created: list[Path]) -> None:
+    """親から順にディレクトリを作成し、新たに作ったものをcreatedに記録する。"""
+    missing = []
+    while not path.exists():
+        missing.append(path)
+        path = path.parent
+    for directory in reversed(missing):
+        directory.mkdir()
+        created.append(directory)
+
+
+def _rollback(files: Iterable[Path], dirs: list[Path]) -> None:
+    for path in files:
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+    for directory in reversed(dirs):
+        try:
+            directory.rmdir()
+        except OSError:
+            pass
+
+
+def extract_zip(zf: zipfile.ZipFile, dest: Path, *, limits: Optional[ExtractLimits] = None) -> list[tuple[str, zipfile.ZipInfo]]:
+    """zipを新しいツリーに展開する（単一のルートディレクトリは取り除く）。
+
+    既存のファイルは上書きしない（FileExistsError）。失敗した場合は書き込んだファイルと
+    作成したディレクトリを削除する。展開したメンバーのリストを返す。
+    """
+    extractor = BoundedExtractor(zf, limits)
+    members = extractor.members()
+    files: list[Path] = []
+    dirs: list[Path] = []
+    try:
+        _mkdirs(dest, dirs)
+        for rel, info in members:
+            target = dest / rel
+            if info.is_dir():
+                _mkdirs(target, dirs)
+                continue
+            _mkdirs(target.parent, dirs)
+            with profiling.span(rel, "zip", size=info.file_size):
+                with open(target, "xb") as dst:
+                    files.append(target)
+                    extractor.copy(rel, info, dst)
+    except BaseException:
+        _rollback(files, dirs)
+        raise
+    return members
+
+
+def file_crc32(path: Path, chunk_size: int = 1024 * 1024) -> int:
+    crc = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def classify(target: Path, size: int, crc: int) -> str:
+    """既存ファイルとアーカイブのメンバーを比較し、create/overwrite/skipを返す。"""
+    try:
+        st = target.stat()
+    except FileNotFoundError:
+        return CREATE
+    if target.is_dir() or st.st_size != size:
+        return OVERWRITE
+    return SKIP if file_crc32(target) == crc else OVERWRITE
+
+
+def plan_merge(entries: Iterable[tuple[str, int, int]], dest: Path) -> list[tuple[str, str]]:
+    """(相対パス, サイズ, CRC32)の列からマージ計画 [(action, 相対パス)] を作る。"""
+    return [(classify(dest / rel, size, crc), rel) for rel, size, crc in entries]
+
+
+def merge_zip(zf: zipfile.ZipFile, dest: Path, *, dry_run: bool = False,
+              limits: Optional[ExtractLimits] = None) -> list[tuple[str, str]]:
+    """zipをdestにマージする。内容が同一のファイルはスキップし、実行した計画を返す。
+
+    変更するファイルはまず同じディレクトリの一時ファイルに書き出し、全メンバーの書き込みが
+    上限内で終わってから置き換える。途中で失敗した場合、既存のファイルは変更されない。
+    """
+    extractor = BoundedExtractor(zf, limits)
+    plan = []
+    staged: list[tuple[Path, Path]] = []
+    dirs: list[Path] = []
+    try:
+        for rel, info in extractor.members():
+            target = dest / rel
+            if info.is_dir():
+                if not dry_run:
+                    _mkdirs(target, dirs)
+                continue
+            action = classify(target, info.file_size, info.CRC)
+            plan.append((action, rel))
+            if dry_run or action == SKIP:
+                continue
+            if target.is_dir() and not target.is_symlink():
+                raise IsADirectoryError(f"ファイルを展開する場所にディレクトリがあります: {target}")
+            _mkdirs(target.parent, dirs)
+            tmp = target.with_name(f".{target.name}{_STAGING_SUFFIX}")
+            with profiling.span(rel, "zip", action=action, size=info.file_size):
+                with open(tmp, "wb") as dst:
+                    staged.append((tmp, target))
+                    extractor.copy(rel, info, dst)
+        for tmp, target in staged:
+            os.replace(tmp, target)
+    except BaseException:
+        _rollback((tmp for tmp, _target in staged), dirs)
+        raise
+    return plan
+
+
+def summarize_plan(plan: list[tuple[str, str]]) -> dict:
+    counts = {CREATE: 0, OVERWRITE: 0, SKIP: 0}
+    for action, _ in plan:
+        counts[action] += 1
+    return counts
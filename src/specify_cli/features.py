@@ -0,0 +1,709 @@
+"""
+機能ディレクトリ (specs/NNN-*) の解決と派生状態の計算。
+
+scripts/bash/common.sh の get_repo_root / get_current_branch / get_feature_paths と
+同じ規則をPythonで実装し、機能インデックスとタスク進捗を生成する。
+
+モノレポでは .specify/config でパッケージごとの specs ルートを宣言できる
+（TOMLのサブセット。common.sh/common.ps1も同じ規則で読む）:
+
+    [specs]
+    default = "core"
+
+    [specs.roots]
+    core = "specs"
+    api = "packages/api/specs"
+
+複数ルートの場合、.specify/features.tsv（コミットする）が機能名→specsルートの
+グローバルインデックスとなる。機能ディレクトリの解決はインデックスを引くか各ルートの
+<ルート>/<機能名>をstatするだけで、ルート配下を走査しない。番号はロック下で
+インデックス・ローカルブランチ・作成先のルートから決めるため、パッケージ間で衝突しない。
+"""
+
+import json
+import os
+import re
+import subprocess
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from . import profiling
+from .artifacts import CACHE_DIR, ArtifactCache, ensure_cache_dir, find_project_root
+
+FEATURE_DIR_RE = re.compile(r"^(\d{3})-")
+INDEX_RELPATH = CACHE_DIR / "feature-index.json"
+PROGRESS_RELDIR = CACHE_DIR / "progress"
+
+# check-prerequisites.shが報告する成果物（表示順）
+FEATURE_ARTIFACTS = ("spec.md", "plan.md", "tasks.md", "research.md", "data-model.md", "quickstart.md", "contracts")
+
+CONFIG_RELPATH = Path(".specify") / "config"
+ROOTS_INDEX_RELPATH = Path(".specify") / "features.tsv"
+ROOTS_INDEX_HEADER = "# feature\tspecs root (specify feature newが追記。`specify feature reindex`で再生成)\n"
+DEFAULT_SPECS_DIR = "specs"
+DEFAULT_ROOT_NAME = "default"
+SPECS_ROOT_ENV = "SPECIFY_SPECS_ROOT"
+
+_SECTION_RE = re.compile(r"^\[([A-Za-z0-9_.-]+)\]$")
+_KEY_VALUE_RE = re.compile(r"""^([A-Za-z0-9_-]+)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^#]*?))\s*(?:#.*)?$""")
+
+
+def parse_config(text: str) -> dict[str, dict[str, str]]:
+    """.specify/configを{セクション: {キー: 値}}にする（文字列値のみのTOMLサブセット）。"""
+    sections: dict[str, dict[str, str]] = {}
+    current = sections.setdefault("", {})
+    for raw in text.splitlines():
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+        m = _SECTION_RE.match(line)
+        if m:
+            current = sections.setdefault(m.group(1), {})
+            continue
+        m = _KEY_VALUE_RE.match(line)
+        if m:
+            current[m.group(1)] = next(v for v in m.group(2, 3, 4) if v is not None)
+    return sections
+
+
+def load_config(root: Path) -> dict[str, dict[str, str]]:
+    try:
+        return parse_config((root / CONFIG_RELPATH).read_text(encoding="utf-8"))
+    except OSError:
+        return {}
+
+
+def specs_roots(root: Path, config: Optional[dict] = None) -> dict[str, str]:
+    """specsルート名→リポジトリルートからの相対パス（宣言順）。未設定ならdefault=specs。"""
+    config = load_config(root) if config is None else config
+    roots = {name: path.strip("/") for name, path in config.get("specs.roots", {}).items() if path.strip("/")}
+    return roots or {DEFAULT_ROOT_NAME: DEFAULT_SPECS_DIR}
+
+
+def is_multi_root(root: Path) -> bool:
+    return len(specs_roots(root)) > 1
+
+
+def specs_dirs(root: Path) -> list[Path]:
+    """全specsルートの絶対パス。"""
+    return [root / rel for rel in specs_roots(root).values()]
+
+
+def select_specs_root(root: Path, name: Optional[str] = None, cwd: Optional[Path] = None) -> str:
+    """新しい機能を作るspecsルートの相対パスを決める。
+
+    明示した名前、SPECIFY_SPECS_ROOT、カレントディレクトリを含むパッケージ（specsルートの親が
+    最も深く一致するもの）、[specs] default、最初のルートの順。
+    """
+    config = load_config(root)
+    roots = specs_roots(root, config)
+    name = name or os.environ.get(SPECS_ROOT_ENV) or None
+    if name:
+        if name not in roots:
+            raise FeatureError(f"specsルート '{name}' は{CONFIG_RELPATH}にありません (選択肢: {', '.join(roots)})")
+        return roots[name]
+    if cwd is not None:
+        cwd, top = Path(cwd).resolve(), root.resolve()
+        matches = []
+        for rel in roots.values():
+            package = (root / rel).parent.resolve()
+            if package != top and (cwd == package or package in cwd.parents):
+                matches.append((len(package.parts), rel))
+        if matches:
+            return max(matches)[1]
+    default = config.get("specs", {}).get("default")
+    if default in roots:
+        return roots[default]
+    return next(iter(roots.values()))
+
+
+def read_roots_index(root: Path) -> dict[str, str]:
+    """.specify/features.tsvの機能名→specsルートの相対パス。"""
+    index = {}
+    try:
+        text = (root / ROOTS_INDEX_RELPATH).read_text(encoding="utf-8")
+    except OSError:
+        return index
+    for line in text.splitlines():
+        feature, _, rel = line.partition("\t")
+        if feature and rel and not feature.startswith("#"):
+            index[feature] = rel.strip()
+    return index
+
+
+def write_roots_index(root: Path, index: dict[str, str]) -> None:
+    lines = [f"{feature}\t{rel}\n" for feature, rel in sorted(
+        index.items(), key=lambda item: (int(FEATURE_DIR_RE.match(item[0]).group(1)), item[0]))]
+    path = root / ROOTS_INDEX_RELPATH
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(ROOTS_INDEX_HEADER + "".join(lines), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+@contextmanager
+def roots_index_lock(root: Path) -> Iterator[None]:
+    """番号の割り当てとインデックスへの追記を直列化する（create-new-feature.shのflockと同じファイル）。"""
+    lock_path = root / ROOTS_INDEX_RELPATH.with_name(ROOTS_INDEX_RELPATH.name + ".lock")
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def resolve_feature_dir(root: Path, feature: str) -> Path:
+    """機能ディレクトリ: インデックス、既存ディレクトリのあるルート、既定のルートの順で決める。"""
+    roots = specs_roots(root)
+    if len(roots) == 1:
+        return root / next(iter(roots.values())) / feature
+    rel = read_roots_index(root).get(feature)
+    if rel is None:
+        rel = next((r for r in roots.values() if (root / r / feature).is_dir()), None)
+    return root / (rel or select_specs_root(root)) / feature
+
+
+def iter_feature_dirs(root: Path) -> Iterator[tuple[str, Path]]:
+    """全specsルートの (機能名, 機能ディレクトリ)。同名の機能は最初のルートを採用する。"""
+    seen = set()
+    for specs_dir in specs_dirs(root):
+        for name in list_features(specs_dir):
+            if name not in seen:
+                seen.add(name)
+                yield name, specs_dir / name
+
+
+def _git(args: list[str], cwd: Path) -> Optional[str]:
+    try:
+        result = profiling.run(["git", *args], cwd=cwd, capture_output=True, text=True, check=True)
+    except (subprocess.CalledProcessError, FileNotFoundError, NotADirectoryError):
+        return None
+    return result.stdout.strip()
+
+
+def get_repo_root(start: Optional[Path] = None) -> Path:
+    """gitのトップレベル、なければ.specify/.gitを持つ祖先、最後に開始ディレクトリを返す。"""
+    start = Path(start or Path.cwd())
+    top = _git(["rev-parse", "--show-toplevel"], start)
+    if top:
+        return Path(top)
+    return find_project_root(start) or start.resolve()
+
+
+def has_git(root: Path) -> bool:
+    if (root / ".git").exists():
+        return True
+    return _git(["rev-parse", "--show-toplevel"], root) is not None
+
+
+def read_head_branch(root: Path) -> Optional[str]:
+    """gitを起動せずに.git/HEADからブランチ名を読む（ワークツリーの.gitファイルにも対応）。
+
+    rev-parse --abbrev-refと同じく、detached HEADでは"HEAD"を返す。読めない場合はNone。
+    """
+    git_path = root / ".git"
+    try:
+        if git_path.is_file():
+            gitdir = git_path.read_text(encoding="utf-8").strip()
+            if not gitdir.startswith("gitdir:"):
+                return None
+            git_path = (root / gitdir[len("gitdir:"):].strip()).resolve()
+        head = (git_path / "HEAD").read_text(encoding="utf-8").strip()
+    except OSError:
+        return None
+    if head.startswith("ref: refs/heads/"):
+        return head[len("ref: refs/heads/"):]
+    return "HEAD"
+
+
+def list_features(specs_dir: Path) -> list[str]:
+    """NNN-プレフィックスを持つ機能ディレクトリ名を番号順に返す。"""
+    try:
+        entries = [e.name for e in os.scandir(specs_dir) if e.is_dir() and FEATURE_DIR_RE.match(e.name)]
+    except FileNotFoundError:
+        return []
+    return sorted(entries, key=lambda name: (int(FEATURE_DIR_RE.match(name).group(1)), name))
+
+
+def get_current_feature(root: Path) -> str:
+    """SPECIFY_FEATURE、gitブランチ、最新の機能ディレクトリ、"main"の順で現在の機能を決定。"""
+    env = os.environ.get("SPECIFY_FEATURE", "")
+    if env:
+        return env
+    branch = read_head_branch(root) or _git(["rev-parse", "--abbrev-ref", "HEAD"], root)
+    if branch:
+        return branch
+    features = sorted((name for name, _dir in iter_feature_dirs(root)),
+                      key=lambda name: (int(FEATURE_DIR_RE.match(name).group(1)), name))
+    return features[-1] if features else "main"
+
+
+def feature_paths(root: Path, feature: str) -> dict:
+    """get_feature_pathsと同じキーでパスを返す。"""
+    feature_dir = resolve_feature_dir(root, feature)
+    return {
+        "REPO_ROOT": str(root),
+        "CURRENT_BRANCH": feature,
+        "FEATURE_DIR": str(feature_dir),
+        "FEATURE_SPEC": str(feature_dir / "spec.md"),
+        "IMPL_PLAN": str(feature_dir / "plan.md"),
+        "TASKS": str(feature_dir / "tasks.md"),
+        "RESEARCH": str(feature_dir / "research.md"),
+        "DATA_MODEL": str(feature_dir / "data-model.md"),
+        "QUICKSTART": str(feature_dir / "quickstart.md"),
+        "CONTRACTS_DIR": str(feature_dir / "contracts"),
+    }
+
+
+def list_worktrees(root: Path) -> list[dict]:
+    """git worktree list --porcelainを解析する。先頭がメインのワークツリー。
+
+    gitがない場合はrootのみを1件として返す。
+    """
+    out = _git(["worktree", "list", "--porcelain"], root)
+    if out is None:
+        return [{"path": str(root), "branch": read_head_branch(root), "head": None, "main": True}]
+    worktrees: list[dict] = []
+    for block in out.split("\n\n"):
+        record: dict = {}
+        for line in block.splitlines():
+            key, _, value = line.partition(" ")
+            if key == "worktree":
+                record = {"path": value, "branch": None, "head": None, "main": not worktrees}
+            elif key == "HEAD":
+                record["head"] = value
+            elif key == "branch":
+                record["branch"] = value[len("refs/heads/"):] if value.startswith("refs/heads/") else value
+            elif key == "detached":
+                record["branch"] = "HEAD"
+            elif key in ("bare", "locked", "prunable"):
+                record[key] = True
+        if record:
+            worktrees.append(record)
+    return worktrees
+
+
+def feature_branches(root: Path) -> list[str]:
+    """NNN-プレフィックスを持つローカルブランチ名。"""
+    out = _git(["for-each-ref", "--format=%(refname:short)", "refs/heads"], root)
+    return [b for b in (out or "").splitlines() if FEATURE_DIR_RE.match(b)]
+
+
+def next_feature_number(root: Path, worktrees: Optional[list[dict]] = None,
+                        specs_root: Optional[str] = None) -> int:
+    """全ワークツリーのspecsルートとローカルブランチを通して次の機能番号を決める。
+
+    並行して別のワークツリーで作成中の機能（未マージのブランチ）とも番号が衝突しない。
+    複数ルートの場合は各ワークツリーのグローバルインデックスと作成先のルートだけを見る。
+    """
+    worktrees = worktrees if worktrees is not None else list_worktrees(root)
+    roots = specs_roots(root)
+    multi = len(roots) > 1
+    scan = [specs_root or select_specs_root(root)] if multi else list(roots.values())
+    names = set(feature_branches(root))
+    for wt in worktrees:
+        if wt.get("bare") or wt.get("prunable"):
+            continue
+        wt_root = Path(wt["path"])
+        if multi:
+            names.update(read_roots_index(wt_root))
+        for rel in scan:
+            names.update(list_features(wt_root / rel))
+    names = {n for n in names if FEATURE_DIR_RE.match(n)}
+    return max((int(FEATURE_DIR_RE.match(n).group(1)) for n in names), default=0) + 1
+
+
+def feature_branch_name(number: int, description: str) -> str:
+    """create-new-feature.shと同じ規則（小文字化、英数字以外をハイフン、先頭3語）。"""
+    slug = re.sub(r"[^a-z0-9]", "-", description.lower())
+    words = [w for w in slug.split("-") if w][:3]
+    return f"{number:03d}-{'-'.join(words)}"
+
+
+def default_worktree_path(main_root: Path, branch: str) -> Path:
+    """既定のワークツリー配置: メインのワークツリーと同じ階層の<リポジトリ名>.worktrees/<ブランチ>。"""
+    return main_root.parent / f"{main_root.name}.worktrees" / branch
+
+
+class FeatureError(Exception):
+    """機能の作成に失敗した場合に送出。"""
+
+
+def create_feature(root: Path, description: str, *, worktree: bool = False,
+                   worktree_path: Optional[Path] = None, base: Optional[str] = None,
+                   specs_root: Optional[str] = None, cwd: Optional[Path] = None,
+                   attempts: int = 5) -> dict:
+    """新しい機能のブランチと <specsルート>/<branch>/spec.md を作成する。
+
+    worktree=Trueの場合はチェックアウトを切り替えず、git worktree addで専用の
+    ワークツリーを作成してその中に機能ディレクトリを置く。ブランチ作成が競合した場合
+    （並行実行で同じ番号が使われた場合）は番号を進めて再試行する。
+    複数ルートの場合、specs_root（ルート名）またはcwdから作成先を選び、番号の割り当てから
+    グローバルインデックスへの追記までをロック下で行う。
+    """
+    description = description.strip()
+    if not description:
+        raise FeatureError("機能の説明が空です")
+    git = has_git(root)
+    if worktree and not git:
+        raise FeatureError("--worktreeにはGitリポジトリが必要です")
+    multi = is_multi_root(root)
+    specs_rel = select_specs_root(root, specs_root, cwd)
+    worktrees = list_worktrees(root)
+    main_root = Path(worktrees[0]["path"])
+    # ロックはメインのワークツリーに置き、全ワークツリーからの作成を直列化する
+    with roots_index_lock(main_root) if multi else nullcontext():
+        if multi and not (root / ROOTS_INDEX_RELPATH).is_file():
+            # 初回は全ルートを1回だけ走査してインデックスを作る（既存の機能と番号が衝突しないように）
+            rebuild_roots_index(root)
+        result = _create_feature(root, description, git, worktree, worktree_path, base, specs_rel,
+                                 worktrees, attempts)
+        if multi:
+            # 機能ディレクトリと同じワークツリーのインデックスに記録する（ブランチと一緒にマージされる）
+            index_root = Path(result["WORKTREE"]) if worktree else root
+            index = read_roots_index(index_root)
+            index[result["BRANCH_NAME"]] = specs_rel
+            write_roots_index(index_root, index)
+    return result
+
+
+def _create_feature(root: Path, description: str, git: bool, worktree: bool,
+                    worktree_path: Optional[Path], base: Optional[str], specs_rel: str,
+                    worktrees: list[dict], attempts: int) -> dict:
+    main_root = Path(worktrees[0]["path"])
+    number = next_feature_number(root, worktrees, specs_rel)
+    for _ in range(attempts):
+        branch = feature_branch_name(number, description)
+        feature_root = root
+        if worktree:
+            feature_root = Path(worktree_path) if worktree_path else default_worktree_path(main_root, branch)
+            if feature_root.exists():
+                raise FeatureError(f"ワークツリーのパスが既に存在します: {feature_root}")
+            feature_root.parent.mkdir(parents=True, exist_ok=True)
+            cmd = ["git", "worktree", "add", "-b", branch, str(feature_root)] + ([base] if base else [])
+        elif git:
+            cmd = ["git", "checkout", "-b", branch]
+        else:
+            cmd = None
+        if cmd is not None:
+            result = profiling.run(cmd, cwd=root, capture_output=True, text=True)
+            if result.returncode != 0:
+                if _git(["rev-parse", "--verify", "--quiet", f"refs/heads/{branch}"], root) is not None:
+                    number += 1
+                    continue
+                raise FeatureError(result.stderr.strip() or f"{' '.join(cmd[:3])} に失敗しました")
+        break
+    else:
+        raise FeatureError(f"空いている機能番号が見つかりません (最後に試行: {number:03d})")
+
+    feature_dir = feature_root / specs_rel / branch
+    feature_dir.mkdir(parents=True, exist_ok=True)
+    spec_file = feature_dir / "spec.md"
+    # ワークツリーにテンプレートがコミットされていなければ作成元のものを使う
+    template = next((t for t in (feature_root / ".specify/templates/spec-template.md",
+                                 root / ".specify/templates/spec-template.md") if t.is_file()), None)
+    if template is not None:
+        spec_file.write_bytes(template.read_bytes())
+    else:
+        spec_file.touch()
+    return {
+        "BRANCH_NAME": branch,
+        "SPEC_FILE": str(spec_file),
+        "FEATURE_NUM": f"{number:03d}",
+        "HAS_GIT": git,
+        "WORKTREE": str(feature_root) if worktree else None,
+        "SPECS_ROOT": specs_rel,
+    }
+
+
+def list_all_features(root: Path, cache: ArtifactCache) -> list[dict]:
+    """全ワークツリーの機能を番号順に列挙する。
+
+    同じ機能ディレクトリが複数のワークツリーにある場合（マージ済みの機能など）は、
+    その機能のブランチをチェックアウトしているワークツリーを優先し、なければ最初に
+    見つかったものを採用する。ディレクトリのないローカルの機能ブランチも含める。
+    """
+    worktrees = [wt for wt in list_worktrees(root) if not (wt.get("bare") or wt.get("prunable"))]
+    features: dict[str, dict] = {}
+    for wt in worktrees:
+        wt_root = Path(wt["path"])
+        for name, feature_dir in iter_feature_dirs(wt_root):
+            owner = wt["branch"] == name
+            current = features.get(name)
+            if current is not None:
+                current["worktrees"].append(str(wt_root))
+                if not owner or current["checked_out"]:
+                    continue
+            record = feature_entry(feature_dir, cache)
+            record.update({
+                "name": name,
+                "worktree": str(wt_root),
+                "branch": None,
+                "checked_out": owner,
+                "worktrees": current["worktrees"] if current else [str(wt_root)],
+            })
+            features[name] = record
+    for branch in feature_branches(root):
+        if branch in features:
+            features[branch]["branch"] = branch
+        else:
+            features[branch] = {
+                "name": branch, "number": FEATURE_DIR_RE.match(branch).group(1), "dir": None,
+                "artifacts": [], "worktree": None, "branch": branch, "checked_out": False, "worktrees": [],
+            }
+    return sorted(features.values(), key=lambda f: (int(f["number"]), f["name"]))
+
+
+def rebuild_roots_index(root: Path) -> dict:
+    """全specsルートを1回走査して.specify/features.tsvを作り直す（既存リポジトリの移行用）。
+
+    同じ番号が複数の機能に使われている場合はcollisionsとして報告する（インデックスには両方を残す）。
+    """
+    index: dict[str, str] = {}
+    by_number: dict[str, list[str]] = {}
+    for rel in specs_roots(root).values():
+        for name in list_features(root / rel):
+            if name in index:
+                continue
+            index[name] = rel
+            by_number.setdefault(FEATURE_DIR_RE.match(name).group(1), []).append(f"{rel}/{name}")
+    write_roots_index(root, index)
+    collisions = {number: paths for number, paths in sorted(by_number.items()) if len(paths) > 1}
+    return {"features": len(index), "roots": specs_roots(root), "collisions": collisions}
+
+
+class PrerequisiteError(Exception):
+    """前提条件を満たしていない場合に送出。メッセージはスクリプトのERROR出力と同じ形式。"""
+
+
+def scan_feature_dir(feature_dir: Path) -> dict:
+    """機能ディレクトリを1回のscandirで走査し、成果物ごとの種別・サイズ・mtimeを返す。
+
+    ディレクトリが存在しない場合はNoneではなく空のdictを返す。contracts/は中身の有無も記録する。
+    """
+    artifacts: dict = {}
+    try:
+        it = os.scandir(feature_dir)
+    except (FileNotFoundError, NotADirectoryError):
+        return artifacts
+    with it:
+        for entry in it:
+            if entry.name not in FEATURE_ARTIFACTS:
+                continue
+            st = entry.stat()
+            is_dir = entry.is_dir()
+            record = {"type": "dir" if is_dir else "file", "size": st.st_size, "mtime": st.st_mtime}
+            if is_dir:
+                with os.scandir(entry.path) as sub:
+                    record["nonempty"] = next(sub, None) is not None
+            artifacts[entry.name] = record
+    return {name: artifacts[name] for name in FEATURE_ARTIFACTS if name in artifacts}
+
+
+def _is_file(artifacts: dict, name: str) -> bool:
+    return artifacts.get(name, {}).get("type") == "file"
+
+
+def check_prerequisites(root: Path, feature: Optional[str] = None, *, require_tasks: bool = False,
+                        include_tasks: bool = False, paths_only: bool = False) -> dict:
+    """check-prerequisites.sh --jsonと同じキーを持つペイロードを返す。
+
+    機能ディレクトリは1回だけ走査し、見つかった成果物のサイズとmtimeをARTIFACTSとして付加する。
+    """
+    feature = feature or get_current_feature(root)
+    paths = feature_paths(root, feature)
+    if has_git(root) and not FEATURE_DIR_RE.match(feature):
+        raise PrerequisiteError(
+            f"ERROR: Not on a feature branch. Current branch: {feature}\n"
+            "Feature branches should be named like: 001-feature-name"
+        )
+    if paths_only:
+        return {
+            "REPO_ROOT": paths["REPO_ROOT"],
+            "BRANCH": feature,
+            "FEATURE_DIR": paths["FEATURE_DIR"],
+            "FEATURE_SPEC": paths["FEATURE_SPEC"],
+            "IMPL_PLAN": paths["IMPL_PLAN"],
+            "TASKS": paths["TASKS"],
+        }
+    feature_dir = Path(paths["FEATURE_DIR"])
+    artifacts = scan_feature_dir(feature_dir)
+    if not artifacts and not feature_dir.is_dir():
+        raise PrerequisiteError(
+            f"ERROR: Feature directory not found: {feature_dir}\n"
+            "Run /specify first to create the feature structure."
+        )
+    if not _is_file(artifacts, "plan.md"):
+        raise PrerequisiteError(
+            f"ERROR: plan.md not found in {feature_dir}\n"
+            "Run /plan first to create the implementation plan."
+        )
+    if require_tasks and not _is_file(artifacts, "tasks.md"):
+        raise PrerequisiteError(
+            f"ERROR: tasks.md not found in {feature_dir}\n"
+            "Run /tasks first to create the task list."
+        )
+    return {
+        "FEATURE_DIR": str(feature_dir),
+        "AVAILABLE_DOCS": available_docs(artifacts, include_tasks=include_tasks),
+        "ARTIFACTS": artifacts,
+    }
+
+
+def available_docs(artifacts: dict, *, include_tasks: bool = False) -> list[str]:
+    """scan_feature_dirの結果からAVAILABLE_DOCSをスクリプトと同じ順序で組み立てる。"""
+    docs = [name for name in ("research.md", "data-model.md") if _is_file(artifacts, name)]
+    contracts = artifacts.get("contracts", {})
+    if contracts.get("type") == "dir" and contracts.get("nonempty"):
+        docs.append("contracts/")
+    if _is_file(artifacts, "quickstart.md"):
+        docs.append("quickstart.md")
+    if include_tasks and _is_file(artifacts, "tasks.md"):
+        docs.append("tasks.md")
+    return docs
+
+
+def task_graph(model: dict) -> dict:
+    """tasks.mdのモデルから依存関係グラフを構築。
+
+    tasks-template.mdの規則に従い、フェーズ（見出し）は前のフェーズ全体に依存し、
+    フェーズ内では[P]のないタスクが順序の区切りとなる。[P]タスクは直前の区切りにのみ依存する。
+    """
+    nodes = []
+    done = set()
+    phase = None
+    phase_ids: list[str] = []
+    prev_phase_ids: list[str] = []
+    base: list[str] = []
+    group: list[str] = []
+    for item in model.get("checklists", []):
+        tid = item.get("id")
+        if not tid:
+            continue
+        if item["section"] != phase:
+            if phase_ids:
+                prev_phase_ids = phase_ids
+            phase, phase_ids, base, group = item["section"], [], list(prev_phase_ids), []
+        if item["parallel"]:
+            deps = list(base)
+            group.append(tid)
+        else:
+            deps = list(group) if group else list(base)
+            base, group = [tid], []
+        phase_ids.append(tid)
+        if item["checked"]:
+            done.add(tid)
+        nodes.append({
+            "id": tid,
+            "text": item["text"],
+            "phase": phase,
+            "parallel": item["parallel"],
+            "done": item["checked"],
+            "line": item["line"],
+            "deps": deps,
+        })
+    ready = [n["id"] for n in nodes if not n["done"] and all(d in done for d in n["deps"])]
+    return {"tasks": nodes, "ready": ready}
+
+
+def task_progress(model: dict) -> dict:
+    """tasks.mdのモデルからタスク進捗を集計。"""
+    tasks = [c for c in model.get("checklists", []) if c.get("id")]
+    done = [t for t in tasks if t["checked"]]
+    pending = [t for t in tasks if not t["checked"]]
+    return {
+        "total": len(tasks),
+        "done": len(done),
+        "remaining": len(pending),
+        "parallel": sum(1 for t in pending if t["parallel"]),
+        "next": pending[0]["id"] if pending else None,
+    }
+
+
+def feature_entry(feature_dir: Path, cache: ArtifactCache) -> dict:
+    """機能インデックスの1エントリ（成果物の有無と主要メタデータ）を作成。"""
+    present = []
+    mtime = 0
+    with os.scandir(feature_dir) as it:
+        for entry in it:
+            if entry.name in FEATURE_ARTIFACTS:
+                present.append(entry.name)
+                mtime = max(mtime, entry.stat().st_mtime_ns)
+    record = {
+        "number": FEATURE_DIR_RE.match(feature_dir.name).group(1),
+        "dir": str(feature_dir),
+        "artifacts": sorted(present, key=FEATURE_ARTIFACTS.index),
+        "mtime_ns": mtime,
+    }
+    spec = feature_dir / "spec.md"
+    if spec.is_file():
+        model = cache.get(spec)
+        heading = next((h[1] for h in model["headings"] if h[0] == 1), "")
+        record["title"] = heading.split(":", 1)[-1].split("：", 1)[-1].strip()
+        record["requirements"] = [r["id"] for r in model["requirements"]]
+    tasks = feature_dir / "tasks.md"
+    if tasks.is_file():
+        record["progress"] = task_progress(cache.get(tasks))
+    return record
+
+
+def write_json_atomic(path: Path, data) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2) + "\n", encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def load_index(root: Path) -> dict:
+    try:
+        return json.loads((root / INDEX_RELPATH).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {"features": {}}
+
+
+def build_index(root: Path, cache: ArtifactCache) -> dict:
+    """全specsルートの機能からインデックスを作り直す。"""
+    index = {"generated": time.time(), "features": {}}
+    for name, feature_dir in iter_feature_dirs(root):
+        index["features"][name] = feature_entry(feature_dir, cache)
+    return index
+
+
+def update_index_entry(index: dict, root: Path, feature: str, cache: ArtifactCache) -> None:
+    """1つの機能のエントリのみを更新（ディレクトリが消えていれば削除）。"""
+    feature_dir = resolve_feature_dir(root, feature)
+    if feature_dir.is_dir() and FEATURE_DIR_RE.match(feature):
+        index["features"][feature] = feature_entry(feature_dir, cache)
+    else:
+        index["features"].pop(feature, None)
+    index["generated"] = time.time()
+
+
+def save_index(root: Path, index: dict) -> None:
+    ensure_cache_dir(root)
+    write_json_atomic(root / INDEX_RELPATH, index)
+
+
+def write_progress(root: Path, feature: str, cache: ArtifactCache) -> Optional[dict]:
+    """機能のタスク進捗を.specify/cache/progress/<feature>.jsonに書き出す。"""
+    tasks = resolve_feature_dir(root, feature) / "tasks.md"
+    target = root / PROGRESS_RELDIR / f"{feature}.json"
+    if not tasks.is_file():
+        if target.exists():
+            target.unlink()
+        return None
+    progress = task_progress(cache.get(tasks))
+    ensure_cache_dir(root)
+    write_json_atomic(target, progress)
+    return progress
@@ -0,0 +1,291 @@
+"""
+多数のリポジトリのテンプレート導入状況の監査 (`specify fleet status`)。
+
+各リポジトリにインストールされたテンプレートのファイル（`.specify/scripts`・`.specify/templates`・
+エージェントのコマンドファイル）をCRC32で照合し、どのリリースのどのアセットから導入されたかと、
+リリースから変更・削除されたファイルを報告する。
+
+リリースマニフェスト（アセットごとの 相対パス → サイズ, CRC32）はテンプレートストアの展開済み
+ツリーか、ミラー・zipの中央ディレクトリから作り、`<キャッシュ>/manifests/` に保存する。
+`init --compact` で書き換えたコマンドファイルと照合できるよう、コンパクトレンダリング後の
+サイズとCRC32も記録する。
+
+リポジトリはスレッドプールで並行に走査する。リポジトリ内ではパスごとのハッシュをメモ化し、
+複数のリリースで共通のファイルを読み直さない。サイズが異なるファイルは読まずに不一致とする。
+"""
+
+import fnmatch
+import json
+import os
+import re
+import stat
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .commands import AGENT_COMMANDS, compact_rendered
+from .extract import file_crc32, open_archive, zip_members
+from .store import EDITABLE_PATTERNS, MANIFEST_NAME, TemplateStore, cache_root
+
+MANIFEST_CACHE_FORMAT = 1
+# コンパクト版を計算するコマンドファイルの上限（これより大きいメンバーは読まない）
+MAX_COMMAND_BYTES = 1024 * 1024
+SCRIPT_DIRS = {"sh": ".specify/scripts/bash", "ps": ".specify/scripts/powershell"}
+
+OK = "ok"
+DRIFT = "drift"
+UNKNOWN = "unknown"
+NOT_INITIALIZED = "not-initialized"
+ERROR = "error"
+
+_ASSET_RE = re.compile(r"^spec-kit-template-(?P<agent>[a-z]+)-(?P<script>sh|ps)-(?P<release>.+)\.zip$")
+
+
+def default_jobs() -> int:
+    return min(32, (os.cpu_count() or 1) * 4)
+
+
+def manifest_cache_dir() -> Path:
+    return cache_root() / "manifests"
+
+
+def parse_asset_name(filename: str) -> dict:
+    """アセット名からエージェント・スクリプト種別・リリースを取り出す（不明な部分はNone）。"""
+    m = _ASSET_RE.match(filename)
+    if not m:
+        return {"agent": None, "script": None, "release": None}
+    return m.groupdict()
+
+
+def release_sort_key(release: Optional[str]) -> tuple:
+    """`v0.0.17` を (0, 0, 17) として比較するためのキー（数字以外の部分は文字列として比較）。"""
+    parts = re.split(r"[.\-+]", (release or "").lstrip("v"))
+    return tuple((0, int(p), "") if p.isdigit() else (-1, 0, p) for p in parts)
+
+
+def _is_editable(rel: str) -> bool:
+    return any(fnmatch.fnmatch(rel, p) for p in EDITABLE_PATTERNS)
+
+
+def _command_ext(rel: str, agent: Optional[str]) -> Optional[str]:
+    """エージェントのコマンドファイルなら拡張子 ("md"/"toml") を返す。"""
+    if agent not in AGENT_COMMANDS:
+        return None
+    directory, ext, _arg = AGENT_COMMANDS[agent]
+    if rel.startswith(directory + "/") and rel.endswith("." + ext):
+        return "toml" if ext == "toml" else "md"
+    return None
+
+
+def _compact_variant(data: bytes, ext: str) -> Optional[list]:
+    """コンパクトレンダリング後の [サイズ, CRC32]（内容が変わらなければNone）。"""
+    try:
+        text = data.decode("utf-8")
+    except UnicodeDecodeError:
+        return None
+    compacted = compact_rendered(text, ext).encode("utf-8")
+    if compacted == data:
+        return None
+    return [len(compacted), zlib.crc32(compacted)]
+
+
+def _new_manifest(filename: str, key: str) -> dict:
+    return dict(parse_asset_name(filename), format=MANIFEST_CACHE_FORMAT, asset=filename, key=key, files={})
+
+
+def manifest_from_store(entry: Path) -> Optional[dict]:
+    """テンプレートストアのエントリ（展開済みツリー）からリリースマニフェストを作る。"""
+    try:
+        stored = json.loads((entry / MANIFEST_NAME).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    stem, _sep, size = entry.name.rpartition("-")
+    if not size.isdigit() or not stored.get("files"):
+        return None
+    manifest = _new_manifest(f"{stem}.zip", entry.name)
+    for rel, fsize, crc, _mode, _mtime in stored["files"]:
+        if _is_editable(rel):
+            continue
+        record = [fsize, crc]
+        ext = _command_ext(rel, manifest["agent"])
+        if ext and fsize <= MAX_COMMAND_BYTES:
+            try:
+                variant = _compact_variant((entry / "tree" / rel).read_bytes(), ext)
+            except OSError:
+                variant = None
+            record += variant or []
+        manifest["files"][rel] = record
+    return manifest
+
+
+def manifest_from_zip(path: Path) -> dict:
+    """テンプレートのzipの中央ディレクトリからリリースマニフェストを作る（展開しない）。"""
+    manifest = _new_manifest(path.name, TemplateStore.key(path.name, path.stat().st_size))
+    with open_archive(path) as zf:
+        for rel, info in zip_members(zf):
+            if info.is_dir() or _is_editable(rel):
+                continue
+            record = [info.file_size, info.CRC]
+            ext = _command_ext(rel, manifest["agent"])
+            if ext and info.file_size <= MAX_COMMAND_BYTES:
+                record += _compact_variant(zf.read(info), ext) or []
+            manifest["files"][rel] = record
+    return manifest
+
+
+def _cached(key: str, cache_dir: Path) -> Optional[dict]:
+    try:
+        manifest = json.loads((cache_dir / f"{key}.json").read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get("format") == MANIFEST_CACHE_FORMAT else None
+
+
+def _save(manifest: dict, cache_dir: Path) -> None:
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    path = cache_dir / f"{manifest['key']}.json"
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(manifest, ensure_ascii=False), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def template_zips(source: Path) -> list[Path]:
+    """zipファイル、zipを置いたディレクトリ、またはミラーディレクトリからテンプレートのzipを列挙する。"""
+    source = Path(source)
+    if source.is_file():
+        return [source]
+    if not source.is_dir():
+        raise FileNotFoundError(f"リリースの取得元が見つかりません: {source}")
+    pattern = "*/*/releases/download/*/spec-kit-template-*.zip" if (source / "repos").is_dir() else "spec-kit-template-*.zip"
+    return sorted(source.glob(pattern))
+
+
+def load_release_manifests(store: Optional[TemplateStore] = None, sources: Iterable[Path] = (),
+                           cache_dir: Optional[Path] = None) -> list[dict]:
+    """テンプレートストアと取得元のzipからリリースマニフェストを集める（キャッシュ済みなら再計算しない）。"""
+    cache_dir = cache_dir or manifest_cache_dir()
+    manifests: dict[str, dict] = {}
+
+    def add(key: str, build) -> None:
+        if key in manifests:
+            return
+        manifest = _cached(key, cache_dir)
+        if manifest is None:
+            manifest = build()
+            if manifest is None:
+                return
+            _save(manifest, cache_dir)
+        manifests[key] = manifest
+
+    if store is not None and store.root.is_dir():
+        for entry in sorted(store.root.iterdir()):
+            if entry.name.startswith(".") or not (entry / MANIFEST_NAME).is_file():
+                continue
+            add(entry.name, lambda entry=entry: manifest_from_store(entry))
+    for source in sources:
+        for path in template_zips(source):
+            add(TemplateStore.key(path.name, path.stat().st_size), lambda path=path: manifest_from_zip(path))
+    return list(manifests.values())
+
+
+def _candidates(repo: Path, manifests: list[dict]) -> list[dict]:
+    """リポジトリにエージェントのコマンドディレクトリとスクリプトディレクトリがあるマニフェスト。"""
+    result = []
+    for manifest in manifests:
+        agent, script = manifest["agent"], manifest["script"]
+        if agent in AGENT_COMMANDS and not (repo / AGENT_COMMANDS[agent][0]).is_dir():
+            continue
+        if script in SCRIPT_DIRS and not (repo / SCRIPT_DIRS[script]).is_dir():
+            continue
+        result.append(manifest)
+    return result
+
+
+class _RepoFiles:
+    """リポジトリ内のファイルの (サイズ, CRC32) をメモ化して照合する。"""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.sizes: dict[str, Optional[int]] = {}
+        self.crcs: dict[str, int] = {}
+
+    def size(self, rel: str) -> Optional[int]:
+        if rel not in self.sizes:
+            try:
+                st = os.stat(self.root / rel)
+                self.sizes[rel] = None if stat.S_ISDIR(st.st_mode) else st.st_size
+            except OSError:
+                self.sizes[rel] = None
+        return self.sizes[rel]
+
+    def crc(self, rel: str) -> int:
+        if rel not in self.crcs:
+            self.crcs[rel] = file_crc32(self.root / rel)
+        return self.crcs[rel]
+
+    def compare(self, rel: str, record: list) -> str:
+        """match・modified・missingのいずれかを返す。サイズが一致する候補があるときだけ内容を読む。"""
+        size = self.size(rel)
+        if size is None:
+            return "missing"
+        variants = [record[i:i + 2] for i in range(0, len(record), 2)]
+        if any(size == vsize for vsize, _crc in variants):
+            crc = self.crc(rel)
+            if any(size == vsize and crc == vcrc for vsize, vcrc in variants):
+                return "match"
+        return "modified"
+
+
+def scan_repo(path: Path, manifests: list[dict]) -> dict:
+    """1つのリポジトリを照合し、最もよく一致するリリースと差分のあるファイルを返す。"""
+    result = {"path": str(path), "status": UNKNOWN, "release": None, "asset": None, "agent": None,
+              "script": None, "files": 0, "matched": 0, "modified": [], "missing": [], "error": None}
+    try:
+        if not path.is_dir():
+            raise FileNotFoundError(f"ディレクトリがありません: {path}")
+        if not (path / ".specify").is_dir():
+            result["status"] = NOT_INITIALIZED
+            return result
+        files = _RepoFiles(path)
+        best = None
+        for manifest in _candidates(path, manifests):
+            states = {rel: files.compare(rel, record) for rel, record in manifest["files"].items()}
+            matched = sum(1 for state in states.values() if state == "match")
+            rank = (matched, -(len(states) - matched), release_sort_key(manifest["release"]))
+            if matched and (best is None or rank > best[0]):
+                best = (rank, manifest, states)
+    except OSError as e:
+        result.update(status=ERROR, error=str(e))
+        return result
+    if best is None:
+        return result
+    (matched, _missing, _release), manifest, states = best
+    result.update(
+        release=manifest["release"], asset=manifest["asset"], agent=manifest["agent"], script=manifest["script"],
+        files=len(states), matched=matched,
+        modified=sorted(rel for rel, state in states.items() if state == "modified"),
+        missing=sorted(rel for rel, state in states.items() if state == "missing"),
+    )
+    result["status"] = DRIFT if result["modified"] or result["missing"] else OK
+    return result
+
+
+def fleet_status(paths: list[Path], manifests: list[dict], *, jobs: Optional[int] = None) -> list[dict]:
+    """リポジトリをスレッドプールで並行に照合する（結果は入力順）。"""
+    if not paths:
+        return []
+    workers = max(1, min(jobs or default_jobs(), len(paths)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="specify-fleet") as pool:
+        return list(pool.map(lambda p: scan_repo(Path(p), manifests), paths))
+
+
+def read_repo_list(text: str, base: Path) -> list[Path]:
+    """1行に1つのパス（#以降はコメント、相対パスはbaseから）を読む。"""
+    paths = []
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if line:
+            path = Path(line).expanduser()
+            paths.append(path if path.is_absolute() else base / path)
+    return paths
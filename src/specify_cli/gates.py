@@ -0,0 +1,298 @@
+"""
+憲法の機械判定ゲート (`specify gates check`)。
+
+constitution.mdの```gatesフェンスブロックにTOMLでルールを宣言し、解析済みの
+plan.md/tasks.mdに対して評価する。判断を要する原則は`check = "manual"`として
+宣言し、モデルが評価する対象として一覧に残す。
+
+    ```gates
+    [[gate]]
+    id = "simplicity"
+    principle = "VII. 簡潔性"
+    check = "max_projects"
+    max = 3
+
+    [[gate]]
+    id = "test-first"
+    check = "test_first"
+    ```
+
+各ゲートの結果はpass/fail/skip/manualと、違反箇所（ファイル・行・内容）のリスト。
+"""
+
+import re
+import tomllib
+from pathlib import Path
+from typing import Callable, Optional
+
+from .artifacts import PLAN_FIELD_ALIASES, ArtifactCache
+
+CONSTITUTION_RELPATH = Path(".specify") / "memory" / "constitution.md"
+
+PASS = "pass"
+FAIL = "fail"
+SKIP = "skip"
+MANUAL = "manual"
+
+SEVERITIES = ("error", "warning")
+
+_HTML_COMMENT_RE = re.compile(r"<!--.*?-->", re.DOTALL)
+_GATES_BLOCK_RE = re.compile(r"^(`{3,}|~{3,})\s*gates\s*$\n(.*?)^\1\s*$", re.MULTILINE | re.DOTALL)
+_SOURCE_HEADING_RE = re.compile(r"source code|ソースコード|プロジェクト構造", re.IGNORECASE)
+_TOP_DIR_RE = re.compile(r"^([A-Za-z0-9_.\-]+)/")
+# プロジェクトとして数えないトップレベルのディレクトリ
+NON_PROJECT_DIRS = {"tests", "test", "docs", "specs", "scripts", ".github", ".specify"}
+
+DEFAULT_TEST_PATTERN = r"tests?/(?:contract|integration)/"
+DEFAULT_IMPL_PATTERN = r"\bsrc/"
+DEFAULT_DEPENDENCY_FIELDS = ("Language/Version", "Primary Dependencies", "Storage", "Testing", "Target Platform")
+
+
+class GateError(Exception):
+    """ゲートの宣言が不正な場合に送出。"""
+
+
+def load_gates(constitution: Path) -> list[dict]:
+    """constitution.mdの```gatesブロック（複数可）からルールを読み込む。
+
+    HTMLコメント内のブロック（テンプレートの例）は無視する。行番号は保持する。
+    """
+    text = Path(constitution).read_text(encoding="utf-8")
+    text = _HTML_COMMENT_RE.sub(lambda m: "\n" * m.group(0).count("\n"), text)
+    gates: list[dict] = []
+    for m in _GATES_BLOCK_RE.finditer(text):
+        line = text.count("\n", 0, m.start(2)) + 1
+        try:
+            data = tomllib.loads(m.group(2))
+        except tomllib.TOMLDecodeError as e:
+            raise GateError(f"{constitution}:{line}: gatesブロックを解釈できません: {e}") from e
+        for gate in data.get("gate", []):
+            if "id" not in gate or "check" not in gate:
+                raise GateError(f"{constitution}:{line}: 各ゲートにはidとcheckが必要です: {gate}")
+            if gate["check"] not in CHECKS and gate["check"] != MANUAL:
+                raise GateError(
+                    f"{constitution}:{line}: 不明なcheck '{gate['check']}' (ゲート {gate['id']})。"
+                    f"使用可能: {', '.join(sorted([*CHECKS, MANUAL]))}"
+                )
+            if gate.setdefault("severity", "error") not in SEVERITIES:
+                raise GateError(f"{constitution}:{line}: severityはerrorまたはwarningです (ゲート {gate['id']})")
+            gates.append(gate)
+    return gates
+
+
+class Documents:
+    """評価対象の成果物（テキストと解析済みモデル）を遅延読み込みする。"""
+
+    def __init__(self, feature_dir: Path, cache: ArtifactCache):
+        self.feature_dir = Path(feature_dir)
+        self.cache = cache
+        self._loaded: dict[str, Optional[tuple[Path, list[str], dict]]] = {}
+
+    def get(self, name: str) -> Optional[tuple[Path, list[str], dict]]:
+        """(パス, 行のリスト, モデル)。ファイルがなければNone。"""
+        if name not in self._loaded:
+            path = self.feature_dir / f"{name}.md"
+            if path.is_file():
+                lines = path.read_text(encoding="utf-8", errors="replace").splitlines()
+                self._loaded[name] = (path, lines, self.cache.get(path))
+            else:
+                self._loaded[name] = None
+        return self._loaded[name]
+
+
+def _location(path: Path, line: int, text: str) -> dict:
+    return {"file": str(path), "line": line, "text": text.strip()}
+
+
+def _field_line(lines: list[str], names: tuple[str, ...]) -> tuple[int, str]:
+    for lineno, line in enumerate(lines, start=1):
+        if any(f"**{name}**" in line for name in names):
+            return lineno, line
+    return 0, ""
+
+
+def _plan_field(model: dict, name: str) -> tuple[tuple[str, ...], Optional[str]]:
+    names = PLAN_FIELD_ALIASES.get(name, (name,))
+    return names, next((model["fields"][n] for n in names if n in model["fields"]), None)
+
+
+def source_projects(lines: list[str]) -> list[tuple[int, str]]:
+    """plan.mdのソースコード構造のコードブロックから、トップレベルのプロジェクトを抽出する。"""
+    in_section = False
+    in_fence = False
+    projects: list[tuple[int, str]] = []
+    for lineno, line in enumerate(lines, start=1):
+        stripped = line.strip()
+        if not in_fence and stripped.startswith("#"):
+            if in_section and projects:
+                break
+            in_section = bool(_SOURCE_HEADING_RE.search(stripped))
+            continue
+        if stripped.startswith("```"):
+            if in_fence and in_section and projects:
+                break
+            in_fence = not in_fence
+            continue
+        if in_section and in_fence:
+            m = _TOP_DIR_RE.match(line)
+            if m and m.group(1) not in NON_PROJECT_DIRS:
+                projects.append((lineno, line))
+    return projects
+
+
+def check_max_projects(gate: dict, docs: Documents) -> tuple[str, str, list[dict]]:
+    plan = docs.get("plan")
+    if plan is None:
+        return SKIP, "plan.mdがありません", []
+    path, lines, _model = plan
+    projects = source_projects(lines)
+    limit = int(gate.get("max", 3))
+    locations = [_location(path, lineno, text) for lineno, text in projects]
+    if not projects:
+        return SKIP, "plan.mdにソースコード構造のコードブロックがありません", []
+    if len(projects) > limit:
+        return FAIL, f"プロジェクト数 {len(projects)} が上限 {limit} を超えています", locations
+    return PASS, f"プロジェクト数 {len(projects)} (上限 {limit})", []
+
+
+def check_test_first(gate: dict, docs: Documents) -> tuple[str, str, list[dict]]:
+    tasks = docs.get("tasks")
+    if tasks is None:
+        return SKIP, "tasks.mdがありません", []
+    path, _lines, model = tasks
+    test_re = re.compile(gate.get("test_pattern", DEFAULT_TEST_PATTERN))
+    impl_re = re.compile(gate.get("impl_pattern", DEFAULT_IMPL_PATTERN))
+    items = [c for c in model["checklists"] if c.get("id")]
+    first_impl = next((c for c in items if impl_re.search(c["text"]) and not test_re.search(c["text"])), None)
+    if first_impl is None:
+        return PASS, "実装タスクがありません", []
+    late = [c for c in items if c["line"] > first_impl["line"] and test_re.search(c["text"])]
+    if late:
+        return FAIL, (
+            f"{len(late)}個のテストタスクが最初の実装タスク {first_impl['id']} (行 {first_impl['line']}) より後にあります"
+        ), [_location(path, c["line"], f"- {c['text']}") for c in late]
+    tests = sum(1 for c in items if test_re.search(c["text"]))
+    if tests == 0 and gate.get("require_tests", True):
+        return FAIL, "実装タスクより前にテストタスクがありません", [_location(path, first_impl["line"], f"- {first_impl['text']}")]
+    return PASS, f"{tests}個のテストタスクがすべて実装タスクより前にあります", []
+
+
+def check_forbidden_dependency(gate: dict, docs: Documents) -> tuple[str, str, list[dict]]:
+    plan = docs.get("plan")
+    if plan is None:
+        return SKIP, "plan.mdがありません", []
+    path, lines, model = plan
+    patterns = gate.get("patterns") or ([gate["pattern"]] if "pattern" in gate else [])
+    if not patterns:
+        raise GateError(f"ゲート {gate['id']}: patternsを指定してください")
+    forbidden = re.compile("|".join(f"(?:{p})" for p in patterns), re.IGNORECASE)
+    locations = []
+    for name in gate.get("fields", DEFAULT_DEPENDENCY_FIELDS):
+        names, value = _plan_field(model, name)
+        if value and forbidden.search(value):
+            lineno, text = _field_line(lines, names)
+            locations.append(_location(path, lineno, text))
+    if locations:
+        return FAIL, f"禁止された依存関係が指定されています ({', '.join(patterns)})", locations
+    return PASS, "禁止された依存関係はありません", []
+
+
+def check_required_field(gate: dict, docs: Documents) -> tuple[str, str, list[dict]]:
+    plan = docs.get("plan")
+    if plan is None:
+        return SKIP, "plan.mdがありません", []
+    path, lines, model = plan
+    name = gate.get("field")
+    if not name:
+        raise GateError(f"ゲート {gate['id']}: fieldを指定してください")
+    names, value = _plan_field(model, name)
+    lineno, text = _field_line(lines, names)
+    if not value or value == "N/A" or "NEEDS CLARIFICATION" in value:
+        locations = [_location(path, lineno, text)] if lineno else []
+        return FAIL, f"{name} が未記入です", locations
+    pattern = gate.get("pattern")
+    if pattern and not re.search(pattern, value, re.IGNORECASE):
+        return FAIL, f"{name} が /{pattern}/ に一致しません: {value}", [_location(path, lineno, text)]
+    return PASS, f"{name}: {value}", []
+
+
+def check_no_clarifications(gate: dict, docs: Documents) -> tuple[str, str, list[dict]]:
+    target = gate.get("target", "plan")
+    doc = docs.get(target)
+    if doc is None:
+        return SKIP, f"{target}.mdがありません", []
+    path, lines, model = doc
+    locations = [_location(path, c["line"], lines[c["line"] - 1]) for c in model["clarifications"]]
+    if locations:
+        return FAIL, f"{target}.mdに未解決のNEEDS CLARIFICATIONが{len(locations)}個あります", locations
+    return PASS, f"{target}.mdに未解決のNEEDS CLARIFICATIONはありません", []
+
+
+def _pattern_locations(gate: dict, docs: Documents) -> Optional[tuple[Path, list[dict]]]:
+    target = gate.get("target", "plan")
+    doc = docs.get(target)
+    if doc is None:
+        return None
+    path, lines, _model = doc
+    if "pattern" not in gate:
+        raise GateError(f"ゲート {gate['id']}: patternを指定してください")
+    pattern = re.compile(gate["pattern"], re.IGNORECASE)
+    return path, [_location(path, n, line) for n, line in enumerate(lines, start=1) if pattern.search(line)]
+
+
+def check_forbidden_pattern(gate: dict, docs: Documents) -> tuple[str, str, list[dict]]:
+    found = _pattern_locations(gate, docs)
+    if found is None:
+        return SKIP, f"{gate.get('target', 'plan')}.mdがありません", []
+    path, locations = found
+    if locations:
+        return FAIL, f"{path.name}に /{gate['pattern']}/ が{len(locations)}箇所あります", locations
+    return PASS, f"{path.name}に /{gate['pattern']}/ はありません", []
+
+
+def check_required_pattern(gate: dict, docs: Documents) -> tuple[str, str, list[dict]]:
+    found = _pattern_locations(gate, docs)
+    if found is None:
+        return SKIP, f"{gate.get('target', 'plan')}.mdがありません", []
+    path, locations = found
+    if not locations:
+        return FAIL, f"{path.name}に /{gate['pattern']}/ がありません", [_location(path, 0, "")]
+    return PASS, f"{path.name}に /{gate['pattern']}/ があります (行 {locations[0]['line']})", []
+
+
+CHECKS: dict[str, Callable[[dict, Documents], tuple[str, str, list[dict]]]] = {
+    "max_projects": check_max_projects,
+    "test_first": check_test_first,
+    "forbidden_dependency": check_forbidden_dependency,
+    "required_field": check_required_field,
+    "no_clarifications": check_no_clarifications,
+    "forbidden_pattern": check_forbidden_pattern,
+    "required_pattern": check_required_pattern,
+}
+
+
+def evaluate(gates: list[dict], feature_dir: Path, cache: Optional[ArtifactCache] = None) -> dict:
+    """全ゲートを評価する。passedはseverity=errorのゲートに失敗がない場合にTrue。"""
+    docs = Documents(feature_dir, cache or ArtifactCache(None))
+    results = []
+    for gate in gates:
+        result = {
+            "id": gate["id"],
+            "check": gate["check"],
+            "principle": gate.get("principle", ""),
+            "severity": gate["severity"],
+        }
+        if gate["check"] == MANUAL:
+            result.update(status=MANUAL, message=gate.get("description", ""), locations=[])
+        else:
+            try:
+                status, message, locations = CHECKS[gate["check"]](gate, docs)
+            except re.error as e:
+                raise GateError(f"ゲート {gate['id']}: 正規表現が不正です: {e}") from e
+            if status == FAIL and gate.get("message"):
+                message = f"{gate['message']} ({message})"
+            result.update(status=status, message=message, locations=locations)
+        results.append(result)
+    summary = {s: sum(1 for r in results if r["status"] == s) for s in (PASS, FAIL, SKIP, MANUAL)}
+    passed = not any(r["status"] == FAIL and r["severity"] == "error" for r in results)
+    return {"feature_dir": str(feature_dir), "passed": passed, "summary": summary, "gates": results}
@@ -0,0 +1,67 @@
+"""
+リリースアセットの整合性検証。
+
+パッケージャーはテンプレートのzipと一緒に`sha256sum`形式のSHA256SUMSをリリースに添付する。
+ダウンロード時はiter_bytesのループ内でsha256とサイズを逐次計算し、ファイルを読み直さずに
+展開前に照合する。
+"""
+
+import hashlib
+from pathlib import Path
+from typing import Optional
+
+CHECKSUMS_ASSET = "SHA256SUMS"
+
+
+class IntegrityError(Exception):
+    """ダウンロードしたアセットのサイズまたはチェックサムが一致しない場合に送出。"""
+
+
+def parse_checksums(text: str) -> dict[str, str]:
+    """`<sha256>  <name>`（バイナリモードの`*<name>`も可）の行を{name: sha256}にする。"""
+    sums = {}
+    for line in text.splitlines():
+        parts = line.strip().split(None, 1)
+        if len(parts) != 2 or len(parts[0]) != 64:
+            continue
+        digest, name = parts
+        sums[name.lstrip("*").strip()] = digest.lower()
+    return sums
+
+
+def find_asset(release: dict, name: str) -> Optional[dict]:
+    return next((a for a in release.get("assets", []) if a.get("name") == name), None)
+
+
+class StreamVerifier:
+    """チャンクを受け取りながらsha256とサイズを計算し、最後に期待値と照合する。"""
+
+    def __init__(self, expected_size: Optional[int] = None, expected_sha256: Optional[str] = None):
+        self.expected_size = expected_size
+        self.expected_sha256 = expected_sha256
+        self.size = 0
+        self._hash = hashlib.sha256()
+
+    def update(self, chunk: bytes) -> None:
+        self._hash.update(chunk)
+        self.size += len(chunk)
+
+    @property
+    def sha256(self) -> str:
+        return self._hash.hexdigest()
+
+    def verify(self, name: str) -> None:
+        if self.expected_size is not None and self.size != self.expected_size:
+            raise IntegrityError(f"{name}: サイズが一致しません (期待 {self.expected_size:,} バイト, 受信 {self.size:,} バイト)")
+        if self.expected_sha256 is not None and self.sha256 != self.expected_sha256:
+            raise IntegrityError(f"{name}: SHA-256が一致しません (期待 {self.expected_sha256}, 実際 {self.sha256})")
+
+
+def verify_file(path: Path, expected_size: Optional[int] = None, expected_sha256: Optional[str] = None) -> StreamVerifier:
+    """保存済みのファイルを読みながら照合する（不一致はIntegrityError）。"""
+    verifier = StreamVerifier(expected_size, expected_sha256)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            verifier.update(chunk)
+    verifier.verify(Path(path).name)
+    return verifier
@@ -0,0 +1,227 @@
+"""
+テンプレートリリースのローカルミラー。
+
+`specify mirror sync` はGitHubリリース（メタデータとアセット）をローカルディレクトリに
+スナップショットし、`specify mirror serve` はそれをGitHub互換のエンドポイントとして
+HTTPで公開する。`init --template-source` はミラーのURLまたはディレクトリを受け付ける。
+
+ディレクトリ構成:
+
+    <mirror>/repos/<owner>/<repo>/releases/latest.json
+    <mirror>/repos/<owner>/<repo>/releases/tags/<tag>.json
+    <mirror>/<owner>/<repo>/releases/download/<tag>/<asset>
+"""
+
+import fnmatch
+import json
+import os
+import shutil
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Callable, Optional
+from urllib.parse import unquote, urlsplit
+
+import httpx
+
+from .integrity import CHECKSUMS_ASSET, IntegrityError, StreamVerifier, parse_checksums, verify_file
+from .transport import Transport
+
+GITHUB_API = "https://api.github.com"
+
+
+def release_api_url(base: str, owner: str, repo: str, tag: Optional[str] = None) -> str:
+    """GitHub互換APIのリリース取得URL（tag省略時はlatest）。"""
+    base = base.rstrip("/")
+    if tag:
+        return f"{base}/repos/{owner}/{repo}/releases/tags/{tag}"
+    return f"{base}/repos/{owner}/{repo}/releases/latest"
+
+
+def _release_dir(root: Path, owner: str, repo: str) -> Path:
+    return root / "repos" / owner / repo / "releases"
+
+
+def asset_path(root: Path, owner: str, repo: str, tag: str, name: str) -> Path:
+    return root / owner / repo / "releases" / "download" / tag / name
+
+
+def is_mirror_dir(path: Path) -> bool:
+    return (path / "repos").is_dir()
+
+
+def _write_json(path: Path, data) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def load_release(root: Path, owner: str, repo: str, tag: Optional[str] = None) -> dict:
+    """ミラーに保存されたリリースJSONを読み込む。"""
+    releases = _release_dir(root, owner, repo)
+    path = releases / "tags" / f"{tag}.json" if tag else releases / "latest.json"
+    if not path.is_file():
+        raise FileNotFoundError(f"ミラーにリリースがありません: {path}")
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def local_asset(root: Path, owner: str, repo: str, release: dict, asset: dict) -> Path:
+    """リリースアセットに対応するミラー内のファイルパス。"""
+    return asset_path(root, owner, repo, release["tag_name"], asset["name"])
+
+
+def _is_intact(path: Path, size: Optional[int], sha256: Optional[str]) -> bool:
+    """既存のアセットがサイズと（わかれば）SHA-256に一致するか。"""
+    if not path.is_file() or path.stat().st_size != size:
+        return False
+    if sha256 is None:
+        return True
+    try:
+        verify_file(path, size, sha256)
+    except IntegrityError:
+        return False
+    return True
+
+
+def sync_release(
+    client: "httpx.Client | Transport",
+    root: Path,
+    owner: str,
+    repo: str,
+    *,
+    tag: Optional[str] = None,
+    patterns: Optional[list[str]] = None,
+    headers: Optional[dict] = None,
+    api_base: str = GITHUB_API,
+    on_asset: Optional[Callable[[str, str], None]] = None,
+) -> dict:
+    """リリースをミラーに取り込み、{"tag", "downloaded", "skipped"}を返す。
+
+    clientにはhttpx.Clientまたはtransport.Transport（再試行とクォータ共有つき）を渡せる。
+    リリースにSHA256SUMSがあれば毎回最初に取り込み、ダウンロードする各アセットをストリーム中に
+    照合する（不一致はIntegrityError）。既に同じサイズで存在するアセットはSHA256SUMSと照合し、
+    一致すれば再ダウンロードしない（一致しなければ取り直す。SHA256SUMSがない古いリリースではサイズのみ）。
+    latest.jsonはすべてのアセットが揃ってから置き換えるため、同期中もミラーは一貫した状態を保つ。
+    """
+    headers = headers or {}
+    response = client.get(release_api_url(api_base, owner, repo, tag), timeout=30, follow_redirects=True, headers=headers)
+    if response.status_code != 200:
+        raise RuntimeError(f"GitHub APIが{response.status_code}を返しました: {response.url}")
+    release = response.json()
+    tag_name = release["tag_name"]
+
+    downloaded, skipped = [], []
+    checksums: dict[str, str] = {}
+    # SHA256SUMSを先に取り込み、以降のアセットの照合に使う
+    assets = sorted(release.get("assets", []), key=lambda a: a["name"] != CHECKSUMS_ASSET)
+    for asset in assets:
+        name = asset["name"]
+        if patterns and not any(fnmatch.fnmatch(name, p) for p in patterns):
+            continue
+        target = asset_path(root, owner, repo, tag_name, name)
+        if name != CHECKSUMS_ASSET and _is_intact(target, asset.get("size"), checksums.get(name)):
+            skipped.append(name)
+            if on_asset:
+                on_asset(name, "skipped")
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(f"{name}.part")
+        verifier = StreamVerifier(asset.get("size"), checksums.get(name))
+        try:
+            with client.stream("GET", asset["browser_download_url"], timeout=60, follow_redirects=True, headers=headers) as r:
+                if r.status_code != 200:
+                    raise RuntimeError(f"アセットのダウンロードが{r.status_code}で失敗しました: {name}")
+                with open(tmp, "wb") as f:
+                    for chunk in r.iter_bytes(chunk_size=65536):
+                        f.write(chunk)
+                        verifier.update(chunk)
+            verifier.verify(name)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+        os.replace(tmp, target)
+        if name == CHECKSUMS_ASSET:
+            checksums = parse_checksums(target.read_text(encoding="utf-8"))
+        downloaded.append(name)
+        if on_asset:
+            on_asset(name, "downloaded")
+
+    releases = _release_dir(root, owner, repo)
+    _write_json(releases / "tags" / f"{tag_name}.json", release)
+    if tag is None:
+        _write_json(releases / "latest.json", release)
+    return {"tag": tag_name, "downloaded": downloaded, "skipped": skipped}
+
+
+def _rewrite_release(release: dict, base_url: str, owner: str, repo: str) -> dict:
+    """アセットのダウンロードURLをミラー自身を指すように書き換える。"""
+    rewritten = dict(release)
+    tag = release["tag_name"]
+    rewritten["assets"] = [
+        dict(asset, browser_download_url=f"{base_url}/{owner}/{repo}/releases/download/{tag}/{asset['name']}")
+        for asset in release.get("assets", [])
+    ]
+    return rewritten
+
+
+def _safe_part(part: str) -> bool:
+    return part not in ("", ".", "..") and "/" not in part and "\\" not in part
+
+
+class MirrorRequestHandler(BaseHTTPRequestHandler):
+    """GitHubのreleases API (latest/tags) とアセットのダウンロードパスを提供する。"""
+
+    mirror_root: Path = Path(".")
+
+    def _base_url(self) -> str:
+        host = self.headers.get("Host") or f"{self.server.server_address[0]}:{self.server.server_address[1]}"
+        return f"http://{host}"
+
+    def do_GET(self):
+        parts = [unquote(p) for p in urlsplit(self.path).path.strip("/").split("/")]
+        if not all(_safe_part(p) for p in parts):
+            self.send_error(404)
+            return
+        if len(parts) >= 5 and parts[0] == "repos" and parts[3] == "releases":
+            owner, repo = parts[1], parts[2]
+            tag = parts[5] if len(parts) == 6 and parts[4] == "tags" else None
+            if tag is None and parts[4:] != ["latest"]:
+                self.send_error(404)
+                return
+            try:
+                release = load_release(self.mirror_root, owner, repo, tag)
+            except (FileNotFoundError, ValueError):
+                self.send_error(404, "release not mirrored")
+                return
+            body = json.dumps(_rewrite_release(release, self._base_url(), owner, repo)).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        if len(parts) == 6 and parts[2:4] == ["releases", "download"]:
+            path = asset_path(self.mirror_root, parts[0], parts[1], parts[4], parts[5])
+            if not path.is_file():
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/octet-stream")
+            self.send_header("Content-Length", str(path.stat().st_size))
+            self.end_headers()
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, self.wfile)
+            return
+        self.send_error(404)
+
+    def log_message(self, format, *args):
+        if getattr(self.server, "verbose", False):
+            super().log_message(format, *args)
+
+
+def make_server(root: Path, host: str = "127.0.0.1", port: int = 8787, verbose: bool = False) -> ThreadingHTTPServer:
+    """ミラーディレクトリを配信するHTTPサーバーを作成（serve_forever()は呼び出し側で行う）。"""
+    handler = type("BoundMirrorRequestHandler", (MirrorRequestHandler,), {"mirror_root": Path(root).resolve()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.verbose = verbose
+    return server
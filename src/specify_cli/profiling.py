@@ -0,0 +1,207 @@
+"""
+`specify --profile` のプロファイリングフック。
+
+- cprofile: コマンド全体をcProfileで計測し、pstats形式（.prof）で保存する。
+- trace: HTTPリクエスト、zipメンバーの書き込み、サブプロセス（git等）、トラッカーの
+  ステップをスパンとして記録し、Chromeのトレース形式（.json、chrome://tracingや
+  Perfettoで表示可能）で保存する。
+
+無効時は_activeがNoneのままで、span()は共有の何もしないコンテキストを返すだけになる。
+cProfile/pstatsは有効化時・表示時にのみインポートする。
+"""
+
+import json
+import os
+import subprocess
+import threading
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Optional
+
+PROFILE_MODES = ("cprofile", "trace")
+
+_NULL_SPAN = nullcontext()
+_active: Optional["Profiler"] = None
+
+
+def default_profile_dir() -> Path:
+    from .store import cache_root  # storeはextract経由でこのモジュールをインポートする
+    return cache_root() / "profiles"
+
+
+class _Span:
+    __slots__ = ("profiler", "name", "cat", "args", "start")
+
+    def __init__(self, profiler: "Profiler", name: str, cat: str, args: dict):
+        self.profiler = profiler
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.args["error"] = exc_type.__name__
+        self.profiler.add(self.name, self.cat, self.start, time.perf_counter_ns(), self.args)
+        return False
+
+
+class Profiler:
+    """1回のコマンド実行の計測状態。"""
+
+    def __init__(self, mode: str, command: str):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"unknown profile mode: {mode}")
+        self.mode = mode
+        self.command = command
+        self.origin = time.perf_counter_ns()
+        self.events: list[dict] = []
+        self._steps: dict[tuple[str, str], int] = {}
+        self._cprofile = None
+        if mode == "cprofile":
+            import cProfile
+            self._cprofile = cProfile.Profile()
+
+    def start(self) -> None:
+        if self._cprofile is not None:
+            self._cprofile.enable()
+
+    def add(self, name: str, cat: str, start_ns: int, end_ns: int, args: Optional[dict] = None) -> None:
+        self.events.append({
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": (start_ns - self.origin) / 1000,
+            "dur": (end_ns - start_ns) / 1000,
+            "pid": os.getpid(),
+            "tid": threading.get_ident(),
+            "args": args or {},
+        })
+
+    def step(self, tracker: str, key: str, label: str, status: str) -> None:
+        """StepTrackerの状態遷移をスパンに変換する（running→終了状態）。"""
+        now = time.perf_counter_ns()
+        if status == "running":
+            self._steps.setdefault((tracker, key), now)
+        elif status in ("done", "error", "skipped"):
+            start = self._steps.pop((tracker, key), now)
+            self.add(label, "step", start, now, {"tracker": tracker, "key": key, "status": status})
+
+    def stop(self, output: Path) -> Path:
+        end = time.perf_counter_ns()
+        output.parent.mkdir(parents=True, exist_ok=True)
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            self._cprofile.dump_stats(str(output))
+            return output
+        self.add(f"specify {self.command}", "command", self.origin, end)
+        trace = {
+            "traceEvents": sorted(self.events, key=lambda e: e["ts"]),
+            "displayTimeUnit": "ms",
+            "otherData": {"command": self.command, "mode": self.mode},
+        }
+        output.write_text(json.dumps(trace, ensure_ascii=False), encoding="utf-8")
+        return output
+
+
+def enabled() -> bool:
+    return _active is not None
+
+
+def start(mode: str, command: str) -> Profiler:
+    global _active
+    _active = Profiler(mode, command)
+    _active.start()
+    return _active
+
+
+def stop(output: Optional[Path] = None) -> Optional[Path]:
+    """計測を終了してファイルに保存し、そのパスを返す。"""
+    global _active
+    profiler, _active = _active, None
+    if profiler is None:
+        return None
+    if output is None:
+        suffix = ".prof" if profiler.mode == "cprofile" else ".json"
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        output = default_profile_dir() / f"{profiler.command or 'specify'}-{stamp}-{os.getpid()}{suffix}"
+    return profiler.stop(Path(output))
+
+
+def span(name: str, cat: str, **args):
+    """計測範囲のコンテキストマネージャ（無効時は何もしない）。"""
+    if _active is None:
+        return _NULL_SPAN
+    return _Span(_active, name, cat, args)
+
+
+def step(tracker: str, key: str, label: str, status: str) -> None:
+    if _active is not None:
+        _active.step(tracker, key, label, status)
+
+
+def run(cmd, **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.runをスパンで囲んで実行する。"""
+    if _active is None:
+        return subprocess.run(cmd, **kwargs)
+    name = cmd if isinstance(cmd, str) else " ".join(str(c) for c in cmd[:3])
+    with _Span(_active, name, "subprocess", {"cmd": cmd if isinstance(cmd, str) else [str(c) for c in cmd]}):
+        return subprocess.run(cmd, **kwargs)
+
+
+def latest_profile(directory: Optional[Path] = None) -> Optional[Path]:
+    directory = directory or default_profile_dir()
+    if not directory.is_dir():
+        return None
+    candidates = [p for p in directory.iterdir() if p.suffix in (".prof", ".json")]
+    return max(candidates, key=lambda p: p.stat().st_mtime, default=None)
+
+
+def summarize_trace(path: Path, top: int = 15) -> dict:
+    """トレースのスパンを名前ごとに集計する（合計時間の降順）。"""
+    trace = json.loads(path.read_text(encoding="utf-8"))
+    events = trace.get("traceEvents", [])
+    total = max((e["dur"] for e in events if e.get("cat") == "command"), default=0.0)
+    groups: dict[tuple[str, str], dict] = {}
+    for event in events:
+        if event.get("cat") == "command":
+            continue
+        group = groups.setdefault((event["cat"], event["name"]), {
+            "cat": event["cat"], "name": event["name"], "count": 0, "total_ms": 0.0, "max_ms": 0.0,
+        })
+        dur_ms = event["dur"] / 1000
+        group["count"] += 1
+        group["total_ms"] += dur_ms
+        group["max_ms"] = max(group["max_ms"], dur_ms)
+    by_cat: dict[str, float] = {}
+    for group in groups.values():
+        by_cat[group["cat"]] = by_cat.get(group["cat"], 0.0) + group["total_ms"]
+    hotspots = sorted(groups.values(), key=lambda g: g["total_ms"], reverse=True)[:top]
+    return {
+        "command": trace.get("otherData", {}).get("command", ""),
+        "total_ms": total / 1000,
+        "categories": dict(sorted(by_cat.items(), key=lambda kv: kv[1], reverse=True)),
+        "hotspots": hotspots,
+    }
+
+
+def summarize_cprofile(path: Path, top: int = 15, sort: str = "cumulative") -> list[dict]:
+    """pstatsの上位関数（既定は累積時間順）。"""
+    import pstats
+    stats = pstats.Stats(str(path))
+    stats.sort_stats(sort)
+    rows = []
+    for func in stats.fcn_list[:top]:
+        cc, nc, tt, ct, _callers = stats.stats[func]
+        filename, line, name = func
+        rows.append({
+            "function": f"{name} ({Path(filename).name}:{line})" if line else name,
+            "calls": nc,
+            "tottime_ms": tt * 1000,
+            "cumtime_ms": ct * 1000,
+        })
+    return rows
@@ -0,0 +1,341 @@
+"""
+機能成果物の全文検索インデックス (`specify search`)。
+
+全specsルート（既定はspecs/）の機能ディレクトリのMarkdown成果物とcontracts/のファイルを、SQLite FTS5の仮想テーブル
+(`.specify/cache/search.db`) に索引付けする。ファイルごとにmtimeとサイズを記録し、
+検索のたびに変更されたファイルだけを共有パーサー（ArtifactCache）で再解析する。
+
+日本語は分かち書きされないため、FTS5のtrigramトークナイザーで部分一致を索引する
+（SQLite 3.34未満ではunicode61にフォールバックする）。trigramで扱えない2文字以下の
+語はLIKEで絞り込む。
+
+クエリは空白区切りの語のAND。`列:語`で列を限定し、`-語`で除外、"..."で句を指定する:
+
+    specify search 認証 req:FR-001 entity:User stack:postgres kind:plan
+"""
+
+import os
+import re
+import sqlite3
+from pathlib import Path
+from typing import Optional
+
+from . import profiling
+from .artifacts import PLAN_FIELD_ALIASES, ArtifactCache, ensure_cache_dir
+from .features import CACHE_DIR, iter_feature_dirs
+
+# スキーマを変更した場合はインクリメントする（古いインデックスは作り直される）
+# 2: docs.pathをspecs/からの相対パスからリポジトリルートからの相対パスに変更
+SCHEMA_VERSION = 2
+DB_RELPATH = CACHE_DIR / "search.db"
+
+# 索引する列と、bm25の重み（識別子やタイトルへの一致を本文より上位にする）
+COLUMNS = ("feature", "kind", "title", "headings", "requirements", "entities", "stack", "body")
+WEIGHTS = (2.0, 1.0, 5.0, 3.0, 8.0, 6.0, 4.0, 1.0)
+
+# クエリの列指定の別名
+FIELD_ALIASES = {
+    "feature": "feature",
+    "kind": "kind",
+    "title": "title",
+    "heading": "headings",
+    "req": "requirements",
+    "requirement": "requirements",
+    "entity": "entities",
+    "stack": "stack",
+    "body": "body",
+}
+
+# plan.mdの技術スタックとして索引するフィールド
+STACK_FIELDS = ("Language/Version", "Primary Dependencies", "Storage", "Testing", "Target Platform", "Project Type")
+
+CONTRACT_SUFFIXES = {".md", ".yaml", ".yml", ".json", ".graphql", ".proto", ".txt"}
+
+_ENTITY_SECTION_RE = re.compile(r"エンティティ|entit", re.IGNORECASE)
+_ENTITY_BULLET_RE = re.compile(r"^\s*[-*]\s+\*\*([^*\n]+?)\*\*")
+_TERM_RE = re.compile(r'(-?)(?:([A-Za-z_]+):)?(?:"([^"]*)"|(\S+))')
+
+
+class SearchError(Exception):
+    """インデックスを利用できない場合、またはクエリが不正な場合に送出。"""
+
+
+def fts_tokenizer(conn: sqlite3.Connection) -> str:
+    """trigramが使えればtrigram、なければunicode61。"""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.probe USING fts5(x, tokenize='trigram')")
+        conn.execute("DROP TABLE temp.probe")
+        return "trigram"
+    except sqlite3.OperationalError as e:
+        if "fts5" in str(e) and "no such module" in str(e):
+            raise SearchError("このPythonのSQLiteはFTS5をサポートしていません") from e
+        return "unicode61"
+
+
+def _document_kind(rel: Path, feature: str) -> str:
+    # 機能ディレクトリ内のパス（specsルートの深さはルートごとに異なる）
+    parts = rel.parts[max(i for i, part in enumerate(rel.parts) if part == feature) + 1:]
+    if len(parts) > 1 and parts[0] == "contracts":
+        return "contract"
+    return rel.stem
+
+
+def iter_documents(root: Path):
+    """(リポジトリルートからの相対パス, 機能名, os.stat_result) を列挙する。"""
+    for feature, feature_dir in iter_feature_dirs(root):
+        with os.scandir(feature_dir) as it:
+            entries = list(it)
+        for entry in entries:
+            if entry.is_file() and entry.name.endswith(".md"):
+                yield (feature_dir / entry.name).relative_to(root), feature, entry.stat()
+            elif entry.is_dir() and entry.name == "contracts":
+                for dirpath, _dirnames, filenames in os.walk(entry.path):
+                    for name in filenames:
+                        path = Path(dirpath, name)
+                        if path.suffix.lower() in CONTRACT_SUFFIXES:
+                            yield path.relative_to(root), feature, path.stat()
+
+
+def extract_entities(model: dict, text: str, kind: str) -> list[str]:
+    """エンティティ名: spec.mdの主要エンティティの箇条書きと、data-model.mdの見出し。"""
+    names: list[str] = []
+    if kind == "data-model":
+        names.extend(h[1] for h in model["headings"] if h[0] in (2, 3))
+    sections = [(h[2], h[1]) for h in model["headings"]]
+    if not any(_ENTITY_SECTION_RE.search(title) for _line, title in sections):
+        return names
+    current = ""
+    section_iter = iter(sections)
+    next_section = next(section_iter, None)
+    for lineno, line in enumerate(text.splitlines(), start=1):
+        while next_section is not None and next_section[0] <= lineno:
+            current = next_section[1]
+            next_section = next(section_iter, None)
+        if _ENTITY_SECTION_RE.search(current):
+            m = _ENTITY_BULLET_RE.match(line)
+            if m:
+                names.append(m.group(1).strip())
+    return names
+
+
+def document_row(path: Path, feature: str, kind: str, cache: ArtifactCache) -> dict:
+    """1ファイル分の索引列を作成する。"""
+    text = path.read_text(encoding="utf-8", errors="replace")
+    row = dict.fromkeys(COLUMNS, "")
+    row.update(feature=feature, kind=kind, body=text)
+    if path.suffix != ".md":
+        row["title"] = path.name
+        return row
+    model = cache.get(path)
+    row["title"] = next((h[1] for h in model["headings"] if h[0] == 1), path.name)
+    row["headings"] = "\n".join(h[1] for h in model["headings"])
+    row["requirements"] = " ".join(
+        dict.fromkeys([r["id"] for r in model["requirements"]] + model["references"])
+    )
+    row["entities"] = "\n".join(extract_entities(model, text, kind))
+    if kind == "plan":
+        fields = model["fields"]
+        stack = []
+        for name in STACK_FIELDS:
+            value = next((fields[a] for a in PLAN_FIELD_ALIASES[name] if a in fields), "")
+            if value and value != "N/A" and "NEEDS CLARIFICATION" not in value:
+                stack.append(f"{name}: {value}")
+        row["stack"] = "\n".join(stack)
+    return row
+
+
+class SearchIndex:
+    """`.specify/cache/search.db`のFTS5インデックス。"""
+
+    def __init__(self, root: Path, path: Optional[Path] = None):
+        self.root = Path(root)
+        if path:
+            self.path = Path(path)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        else:
+            self.path = ensure_cache_dir(self.root) / DB_RELPATH.name
+        self.conn = sqlite3.connect(self.path)
+        self.tokenizer = self._ensure_schema()
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def _ensure_schema(self) -> str:
+        conn = self.conn
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        version = conn.execute("SELECT value FROM meta WHERE key = 'schema'").fetchone()
+        tokenizer = conn.execute("SELECT value FROM meta WHERE key = 'tokenizer'").fetchone()
+        if version and version[0] == str(SCHEMA_VERSION) and tokenizer:
+            return tokenizer[0]
+        tokenizer = fts_tokenizer(conn)
+        with conn:
+            conn.execute("DROP TABLE IF EXISTS docs")
+            conn.execute("DROP TABLE IF EXISTS docs_fts")
+            conn.execute(
+                "CREATE TABLE docs (id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, "
+                "feature TEXT NOT NULL, kind TEXT NOT NULL, mtime_ns INTEGER NOT NULL, size INTEGER NOT NULL)"
+            )
+            conn.execute(f"CREATE VIRTUAL TABLE docs_fts USING fts5({', '.join(COLUMNS)}, tokenize='{tokenizer}')")
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [("schema", str(SCHEMA_VERSION)), ("tokenizer", tokenizer)],
+            )
+        return tokenizer
+
+    def refresh(self, cache: Optional[ArtifactCache] = None) -> dict:
+        """mtime/サイズが変わったファイルだけを再索引し、消えたファイルを削除する。"""
+        cache = cache or ArtifactCache(self.root)
+        known = {path: (doc_id, mtime, size) for doc_id, path, mtime, size
+                 in self.conn.execute("SELECT id, path, mtime_ns, size FROM docs")}
+        stats = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        with profiling.span("search index refresh", "search"), self.conn:
+            seen = set()
+            for rel, feature, st in iter_documents(self.root):
+                key = rel.as_posix()
+                seen.add(key)
+                current = known.get(key)
+                if current is not None and current[1] == st.st_mtime_ns and current[2] == st.st_size:
+                    stats["unchanged"] += 1
+                    continue
+                kind = _document_kind(rel, feature)
+                try:
+                    row = document_row(self.root / rel, feature, kind, cache)
+                except OSError:
+                    continue
+                if current is not None:
+                    doc_id = current[0]
+                    self.conn.execute("DELETE FROM docs_fts WHERE rowid = ?", (doc_id,))
+                    self.conn.execute("UPDATE docs SET mtime_ns = ?, size = ? WHERE id = ?",
+                                      (st.st_mtime_ns, st.st_size, doc_id))
+                    stats["updated"] += 1
+                else:
+                    doc_id = self.conn.execute(
+                        "INSERT INTO docs (path, feature, kind, mtime_ns, size) VALUES (?, ?, ?, ?, ?)",
+                        (key, feature, kind, st.st_mtime_ns, st.st_size),
+                    ).lastrowid
+                    stats["added"] += 1
+                self.conn.execute(
+                    f"INSERT INTO docs_fts (rowid, {', '.join(COLUMNS)}) VALUES (?, {', '.join('?' * len(COLUMNS))})",
+                    (doc_id, *(row[c] for c in COLUMNS)),
+                )
+            for key in set(known) - seen:
+                doc_id = known[key][0]
+                self.conn.execute("DELETE FROM docs_fts WHERE rowid = ?", (doc_id,))
+                self.conn.execute("DELETE FROM docs WHERE id = ?", (doc_id,))
+                stats["removed"] += 1
+        cache.save()
+        return stats
+
+    def search(self, query: str, *, limit: int = 20) -> list[dict]:
+        """クエリに一致する文書をbm25の順位で返す。"""
+        match, likes, params = compile_query(query, self.tokenizer)
+        if not match and not likes:
+            raise SearchError("検索語がありません")
+        where = []
+        args: list = []
+        if match:
+            where.append("docs_fts MATCH ?")
+            args.append(match)
+        for sql, value in zip(likes, params):
+            where.append(sql)
+            args.append(value)
+        weights = ", ".join(str(w) for w in WEIGHTS)
+        rank = f"bm25(docs_fts, {weights})" if match else "0"
+        snippet = "snippet(docs_fts, -1, '[', ']', '…', 24)" if match else "substr(docs_fts.body, 1, 120)"
+        sql = (
+            f"SELECT docs.path, docs.feature, docs.kind, docs_fts.title, {snippet}, {rank} AS score "
+            "FROM docs_fts JOIN docs ON docs.id = docs_fts.rowid "
+            f"WHERE {' AND '.join(where)} ORDER BY score, docs.path LIMIT ?"
+        )
+        try:
+            with profiling.span("search query", "search", query=query):
+                rows = self.conn.execute(sql, (*args, limit)).fetchall()
+        except sqlite3.OperationalError as e:
+            raise SearchError(f"クエリを解釈できません: {e}") from e
+        terms = [t for t, negated in query_terms(query) if not negated]
+        results = []
+        for path, feature, kind, title, snip, score in rows:
+            full = self.root / path
+            results.append({
+                "path": str(full),
+                "line": first_match_line(full, terms),
+                "feature": feature,
+                "kind": kind,
+                "title": title,
+                "snippet": " ".join(snip.split()),
+                "score": round(-score, 3) if match else 0.0,
+            })
+        return results
+
+    def stats(self) -> dict:
+        docs, features = self.conn.execute("SELECT COUNT(*), COUNT(DISTINCT feature) FROM docs").fetchone()
+        return {"documents": docs, "features": features, "tokenizer": self.tokenizer, "path": str(self.path)}
+
+
+def query_terms(query: str) -> list[tuple[str, bool]]:
+    """(語, 除外か) のリスト。列指定は取り除く。"""
+    return [(m.group(3) if m.group(3) is not None else m.group(4), m.group(1) == "-")
+            for m in _TERM_RE.finditer(query) if (m.group(3) or m.group(4))]
+
+
+def compile_query(query: str, tokenizer: str) -> tuple[str, list[str], list[str]]:
+    """クエリをFTS5のMATCH式と、短い語のLIKE条件に変換する。
+
+    語はすべて引用符で囲むため、FTS5の演算子として解釈されることはない。
+    """
+    positives: list[str] = []
+    negatives: list[str] = []
+    likes: list[str] = []
+    params: list[str] = []
+    has_positive = False
+    for m in _TERM_RE.finditer(query):
+        negated, field, phrase, word = m.group(1) == "-", m.group(2), m.group(3), m.group(4)
+        term = phrase if phrase is not None else word
+        if not term:
+            continue
+        column = None
+        if field:
+            column = FIELD_ALIASES.get(field.lower())
+            if column is None:
+                raise SearchError(f"不明なフィールド '{field}'。使用可能: {', '.join(sorted(FIELD_ALIASES))}")
+        has_positive = has_positive or not negated
+        if tokenizer == "trigram" and len(term) < 3:
+            target = f"docs_fts.{column}" if column else "(" + " || ' ' || ".join(f"docs_fts.{c}" for c in COLUMNS) + ")"
+            likes.append(f"{target} {'NOT ' if negated else ''}LIKE ? ESCAPE '\\'")
+            params.append("%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+            continue
+        expr = '"' + term.replace('"', '""') + '"'
+        if tokenizer != "trigram" and phrase is None:
+            expr += " *"
+        if column:
+            expr = f"{column} : {expr}"
+        (negatives if negated else positives).append(expr)
+    if not has_positive and (negatives or likes):
+        raise SearchError("除外 (-語) 以外の検索語が1つ以上必要です")
+    match = " AND ".join(positives)
+    if negatives:
+        match += " NOT " + " NOT ".join(negatives)
+    return match, likes, params
+
+
+def first_match_line(path: Path, terms: list[str]) -> Optional[int]:
+    """いずれかの語を最初に含む行番号（大文字小文字を区別しない）。"""
+    needles = [t.lower() for t in terms if t]
+    if not needles:
+        return None
+    try:
+        with path.open(encoding="utf-8", errors="replace") as f:
+            for lineno, line in enumerate(f, start=1):
+                lowered = line.lower()
+                if any(n in lowered for n in needles):
+                    return lineno
+    except OSError:
+        return None
+    return None
@@ -0,0 +1,243 @@
+"""
+`specify serve` の常駐クエリサーバー。
+
+スラッシュコマンドのスクリプトが毎回bashを起動してgitをforkする代わりに、
+UNIXドメインソケット上でパス・前提条件・機能インデックス・タスクグラフの問い合わせに
+ウォームなメモリ状態から応答する。状態はwatchモジュールのバックエンドで最新に保つ。
+
+プロトコルは1行1リクエストのJSON: {"query": "...", "args": {...}}
+応答は {"ok": true, "result": ...} または {"ok": false, "error": "..."}。
+リクエストに "format": "raw" を指定すると、成功時は結果のJSONのみ、失敗時は
+"ERROR"で始まるテキストを返す（シェルスクリプトからjqなしで扱うため）。
+
+クライアントはargsに自身のリポジトリルート ("root")、またはシェルスクリプトのようにgitを
+forkせずに済ませたい場合は作業ディレクトリ ("cwd") を渡す。サーバーのリポジトリに属さない場合
+（別のワークツリーやサブモジュールからの問い合わせなど）は {"ok": false, "unavailable": true} を
+返し、rawでは"UNAVAILABLE"で始まるテキストを返す。クライアントはサーバーが無い場合と同様に
+ローカルの処理にフォールバックする。
+
+prerequisitesは既定で成果物のサイズとmtime (ARTIFACTS) を含む。"artifacts": falseを渡すと
+check-prerequisites.sh --jsonと同じ形のJSONを返す。
+"""
+
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from .features import (
+    PrerequisiteError,
+    check_prerequisites,
+    feature_paths,
+    get_current_feature,
+    has_git,
+    resolve_feature_dir,
+    task_graph,
+)
+from .watch import Watcher, make_backend
+
+
+class RootMismatch(Exception):
+    """問い合わせ元のリポジトリルートがサーバーのルートと異なる場合に送出。"""
+
+
+class QueryState:
+    """サーバーが保持するウォームな状態とクエリのディスパッチ。"""
+
+    def __init__(self, root: Path):
+        self.root = root
+        self.lock = threading.Lock()
+        self.watcher = Watcher(root, agent_context=False, lock=self.lock)
+        self.watcher.full_refresh()
+        self.has_git = has_git(root)
+        self.started = time.time()
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.handlers: dict[str, Callable[[dict], object]] = {
+            "paths": self._paths,
+            "prerequisites": self._prerequisites,
+            "feature-index": self._feature_index,
+            "task-graph": self._task_graph,
+            "stats": self._stats,
+        }
+
+    def dispatch(self, request: dict) -> dict:
+        start = time.perf_counter()
+        handler = self.handlers.get(request.get("query"))
+        try:
+            if handler is None:
+                raise ValueError(f"unknown query: {request.get('query')!r} (available: {', '.join(self.handlers)})")
+            args = request.get("args") or {}
+            if not isinstance(args, dict):
+                raise ValueError(f"args must be an object, not {type(args).__name__}")
+            self._check_root(args)
+            with self.lock:
+                result = handler(args)
+            return {"ok": True, "result": result}
+        except RootMismatch as e:
+            return {"ok": False, "unavailable": True, "error": str(e)}
+        except (PrerequisiteError, ValueError, OSError) as e:
+            return {"ok": False, "error": str(e)}
+        except Exception as e:
+            # 不正なリクエストでもハンドラのスレッドを落とさず、クライアントに応答を返す
+            return {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        finally:
+            self.queries += 1
+            self.query_seconds += time.perf_counter() - start
+
+    def _check_root(self, args: dict) -> None:
+        root = args.get("root")
+        if root is not None and Path(str(root)).resolve() != self.root.resolve():
+            raise RootMismatch(f"server root is {self.root}, not {root}")
+        cwd = args.get("cwd")
+        if cwd is not None:
+            self._check_cwd(Path(str(cwd)).resolve())
+
+    def _check_cwd(self, cwd: Path) -> None:
+        """cwdがサーバーのリポジトリ内（入れ子のワークツリーやサブモジュールを除く）にあるか確認する。"""
+        root = self.root.resolve()
+        if cwd != root and root not in cwd.parents:
+            raise RootMismatch(f"server root is {self.root}, {cwd} is outside it")
+        for directory in (cwd, *cwd.parents):
+            if directory == root:
+                return
+            if (directory / ".git").exists():
+                raise RootMismatch(f"{cwd} belongs to another repository or worktree ({directory})")
+
+    def _feature(self, args: dict) -> str:
+        return args.get("feature") or get_current_feature(self.root)
+
+    def _paths(self, args: dict) -> dict:
+        paths = feature_paths(self.root, self._feature(args))
+        paths["HAS_GIT"] = "true" if self.has_git else "false"
+        return paths
+
+    def _prerequisites(self, args: dict) -> dict:
+        result = check_prerequisites(
+            self.root,
+            self._feature(args),
+            require_tasks=bool(args.get("require_tasks")),
+            include_tasks=bool(args.get("include_tasks")),
+            paths_only=bool(args.get("paths_only")),
+        )
+        if not args.get("artifacts", True):
+            result.pop("ARTIFACTS", None)
+        return result
+
+    def _feature_index(self, args: dict) -> dict:
+        return self.watcher.index
+
+    def _task_graph(self, args: dict) -> dict:
+        tasks = resolve_feature_dir(self.root, self._feature(args)) / "tasks.md"
+        if not tasks.is_file():
+            raise ValueError(f"ERROR: tasks.md not found: {tasks}")
+        return task_graph(self.watcher.cache.get(tasks))
+
+    def _stats(self, args: dict) -> dict:
+        return {
+            "uptime": time.time() - self.started,
+            "queries": self.queries,
+            "query_seconds": self.query_seconds,
+            "cache_hits": self.watcher.cache.hits,
+            "cache_misses": self.watcher.cache.misses,
+            "watch": self.watcher.stats,
+        }
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError(f"expected an object, not {type(request).__name__}")
+            except ValueError as e:
+                response = {"ok": False, "error": f"invalid request: {e}"}
+            else:
+                response = self.server.state.dispatch(request)
+                if request.get("format") == "raw":
+                    self.wfile.write(_raw_response(response).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+                    continue
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+def _raw_response(response: dict) -> str:
+    if response["ok"]:
+        return json.dumps(response["result"], ensure_ascii=False, separators=(",", ":"))
+    error = response["error"]
+    if response.get("unavailable"):
+        return f"UNAVAILABLE: {error}"
+    return error if error.startswith("ERROR") else f"ERROR: {error}"
+
+
+class QueryServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: Path, state: QueryState):
+        self.state = state
+        self.socket_path = socket_path
+        super().__init__(str(socket_path), _Handler)
+        os.chmod(socket_path, 0o600)
+
+    def server_close(self):
+        super().server_close()
+        try:
+            self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def socket_in_use(socket_path: Path) -> bool:
+    """既存ソケットに応答するサーバーがいるか確認する。
+
+    接続を拒否された古いソケットファイルだけを削除する。ソケット以外のファイルや、
+    権限がないなど他の理由で接続できないソケットはそのまま残してOSErrorを送出する。
+    """
+    try:
+        st = os.lstat(socket_path)
+    except FileNotFoundError:
+        return False
+    if not stat.S_ISSOCK(st.st_mode):
+        raise FileExistsError(f"not a socket: {socket_path}")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(socket_path))
+            return True
+        except ConnectionRefusedError:
+            socket_path.unlink()
+            return False
+
+
+def serve(root: Path, socket_path: Path, *, poll: bool = False, debounce: float = 0.2,
+          on_ready: Optional[Callable[[QueryServer], None]] = None) -> None:
+    """サーバーを起動し、ファイル監視スレッドで状態を更新しながら要求に応答する。"""
+    state = QueryState(root)
+    backend = make_backend(root, poll=poll)
+    stop = threading.Event()
+
+    watcher_thread = threading.Thread(
+        target=state.watcher.run,
+        kwargs={"backend": backend, "debounce": debounce, "should_stop": stop.is_set},
+        name="specify-watch",
+        daemon=True,
+    )
+    watcher_thread.start()
+    server = QueryServer(socket_path, state)
+    try:
+        if on_ready:
+            on_ready(server)
+        server.serve_forever(poll_interval=0.5)
+    finally:
+        stop.set()
+        server.server_close()
+        watcher_thread.join(timeout=2)
+        backend.close()
@@ -0,0 +1,246 @@
+"""
+wheelに同梱したテンプレートのスナップショットからのレンダリング（ネットワーク不要のinit）。
+
+wheelにはビルド元のtemplates/・scripts/・memory/が `specify_cli/snapshot/` として
+含まれる（pyproject.tomlのforce-include）。ソースのチェックアウトから実行した場合は
+リポジトリのディレクトリをそのまま使う。
+
+レンダリングはcreate-release-packages.shのbuild_variantと同じ内容を作る:
+
+    .specify/memory/          memory/ をそのままコピー
+    .specify/scripts/         scripts/bash または scripts/powershell（とscripts/直下のファイル）
+    .specify/templates/       templates/（commands/を除く）。plan-template.mdは{SCRIPT}/__AGENT__を
+                              置換してフロントマターを取り除く
+    <エージェントのコマンド>  templates/commands/*.md を commands.render_command で変換
+
+同じリリースのzipと同じ内容になるため、`specify fleet status` でもそのリリースとして照合される。
+
+リリースのタグはpyproject.tomlのバージョンとは独立に決まる（get-next-version.sh）。リリースジョブの
+record-snapshot-release.shが「タグ と templates/・scripts/・memory/の内容のハッシュ」を
+`specify_cli/SNAPSHOT_RELEASE` に書いてコミットするため、gitからのインストールにも含まれる。
+スナップショットの内容がハッシュと一致する場合だけそのリリースとみなし、initの既定の取得元にする。
+一致しない（リリース後に変更されたテンプレートなど）・記録がない場合は開発版として扱い、
+initはこれまでどおりGitHubの最新リリースをダウンロードする。
+"""
+
+import hashlib
+import json
+import os
+import re
+import tempfile
+import time
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+from .commands import AGENT_COMMANDS, command_templates, render_command
+from .extract import CREATE, OVERWRITE, SKIP, classify
+from .fleet import release_sort_key
+from .store import cache_root
+
+SNAPSHOT_DIRNAME = "snapshot"
+SOURCE_DIRS = ("templates", "scripts", "memory")
+SCRIPT_VARIANT_DIRS = {"sh": "bash", "ps": "powershell"}
+# バックグラウンドでの新しいリリースの確認を無効にする環境変数
+NO_UPDATE_CHECK_ENV = "SPECIFY_NO_UPDATE_CHECK"
+# 最新リリースの確認結果を保存するファイル（キャッシュディレクトリ内）と確認の間隔
+LATEST_RELEASE_CACHE = "latest-release.json"
+UPDATE_CHECK_INTERVAL = 24 * 60 * 60
+# リリースジョブ（record-snapshot-release.sh）がタグと内容のハッシュを書き込むファイル（パッケージ内）
+RELEASE_FILE = "SNAPSHOT_RELEASE"
+
+
+def _is_source_tree(path: Path) -> bool:
+    return all((path / name).is_dir() for name in SOURCE_DIRS) and (path / "templates" / "commands").is_dir()
+
+
+def snapshot_root() -> Optional[Path]:
+    """同梱のスナップショット、なければソースのチェックアウトのルート（どちらもなければNone）。"""
+    bundled = Path(__file__).resolve().parent / SNAPSHOT_DIRNAME
+    if _is_source_tree(bundled):
+        return bundled
+    checkout = Path(__file__).resolve().parents[2]
+    if _is_source_tree(checkout) and (checkout / "pyproject.toml").is_file():
+        return checkout
+    return None
+
+
+def source_fingerprint(root: Path) -> str:
+    """templates/・scripts/・memory/の内容のハッシュ（record-snapshot-release.shと同じ計算）。
+
+    相対パス順に並べた `sha256sum` 形式の行 (`<sha256>  <相対パス>`) 全体のSHA-256。
+    """
+    root = Path(root)
+    files = sorted(
+        path.relative_to(root).as_posix()
+        for name in SOURCE_DIRS
+        for path in (root / name).rglob("*")
+        if path.is_file()
+    )
+    digest = hashlib.sha256()
+    for rel in files:
+        digest.update(f"{hashlib.sha256((root / rel).read_bytes()).hexdigest()}  {rel}\n".encode("utf-8"))
+    return digest.hexdigest()
+
+
+@lru_cache(maxsize=None)
+def snapshot_release() -> Optional[str]:
+    """同梱スナップショットのリリースタグ。
+
+    リリースジョブが記録したハッシュと現在のスナップショットの内容が一致する場合のみ返す
+    （記録がない・一致しない場合は開発版としてNone）。
+    """
+    root = snapshot_root()
+    if root is None:
+        return None
+    try:
+        fields = (Path(__file__).resolve().parent / RELEASE_FILE).read_text(encoding="utf-8").split()
+    except OSError:
+        return None
+    if len(fields) != 2 or fields[1] != source_fingerprint(root):
+        return None
+    return fields[0]
+
+
+def update_check_enabled() -> bool:
+    return os.environ.get(NO_UPDATE_CHECK_ENV, "").strip().lower() not in ("1", "true", "yes")
+
+
+def _latest_cache_path() -> Path:
+    return cache_root() / LATEST_RELEASE_CACHE
+
+
+def cached_latest_release() -> tuple[Optional[str], float]:
+    """前回確認した最新リリースのタグと確認時刻（未確認なら (None, 0)）。"""
+    try:
+        data = json.loads(_latest_cache_path().read_text(encoding="utf-8"))
+        return data.get("tag"), float(data.get("checked", 0))
+    except (OSError, ValueError, TypeError, AttributeError):
+        return None, 0.0
+
+
+def record_latest_release(tag: Optional[str]) -> None:
+    """確認結果を記録する（tagがNoneなら前回のタグを残して確認時刻だけ更新）。"""
+    if tag is None:
+        tag = cached_latest_release()[0]
+    path = _latest_cache_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    tmp.write_text(json.dumps({"tag": tag, "checked": time.time()}), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def update_check_due() -> bool:
+    """前回の確認からUPDATE_CHECK_INTERVAL以上経っていればTrue。"""
+    _tag, checked = cached_latest_release()
+    return time.time() - checked >= UPDATE_CHECK_INTERVAL
+
+
+def newer_release(tag: Optional[str]) -> Optional[str]:
+    """tagが同梱スナップショットのリリースより新しければtagを返す。"""
+    current = snapshot_release()
+    if tag and current and release_sort_key(tag) > release_sort_key(current):
+        return tag
+    return None
+
+
+def render_plan_template(text: str, agent: str, script: str) -> Optional[str]:
+    """plan-template.mdの{SCRIPT}と__AGENT__を置換し、フロントマターを取り除く（スクリプトの指定がなければNone）。"""
+    text = text.replace("\r", "")
+    m = re.search(rf"^\s*{re.escape(script)}:\s*(.*)$", text, re.MULTILINE)
+    if not m:
+        return None
+    body = text.replace("{SCRIPT}", f".specify/{m.group(1)}").replace("__AGENT__", agent)
+    out = []
+    dashes = 0
+    in_frontmatter = False
+    for line in body.split("\n"):
+        if line == "---":
+            dashes += 1
+            if dashes <= 2:
+                in_frontmatter = dashes == 1
+                continue
+        if not in_frontmatter:
+            out.append(line)
+    return "\n".join(out).rstrip("\n") + "\n"
+
+
+def _copy_tree(source: Path, prefix: str, files: dict, *, exclude: Optional[Path] = None) -> None:
+    for path in sorted(source.rglob("*")):
+        if not path.is_file() or (exclude is not None and exclude in path.parents):
+            continue
+        rel = f"{prefix}/{path.relative_to(source).as_posix()}"
+        files[rel] = (path.read_bytes(), path.stat().st_mode & 0o777)
+
+
+def render_tree(source: Path, agent: str, script: str) -> dict[str, tuple[bytes, int]]:
+    """リリースのzipと同じ構成のファイル {相対パス: (内容, モード)} をメモリ上に作る。"""
+    if agent not in AGENT_COMMANDS:
+        raise ValueError(f"unknown agent: {agent}")
+    if script not in SCRIPT_VARIANT_DIRS:
+        raise ValueError(f"unknown script type: {script}")
+    source = Path(source)
+    files: dict[str, tuple[bytes, int]] = {}
+    _copy_tree(source / "memory", ".specify/memory", files)
+
+    scripts = source / "scripts"
+    variant = scripts / SCRIPT_VARIANT_DIRS[script]
+    if variant.is_dir():
+        _copy_tree(variant, f".specify/scripts/{variant.name}", files)
+    for path in sorted(scripts.iterdir()):
+        if path.is_file():
+            files[f".specify/scripts/{path.name}"] = (path.read_bytes(), path.stat().st_mode & 0o777)
+
+    templates = source / "templates"
+    _copy_tree(templates, ".specify/templates", files, exclude=templates / "commands")
+    plan_rel = ".specify/templates/plan-template.md"
+    if plan_rel in files:
+        content, mode = files[plan_rel]
+        rendered = render_plan_template(content.decode("utf-8"), agent, script)
+        if rendered is not None:
+            files[plan_rel] = (rendered.encode("utf-8"), mode)
+
+    directory, ext, _arg = AGENT_COMMANDS[agent]
+    for template in command_templates(templates / "commands"):
+        rendered = render_command(template.read_text(encoding="utf-8"), agent, script)
+        files[f"{directory}/{template.stem}.{ext}"] = (rendered.encode("utf-8"), 0o644)
+    return files
+
+
+def materialize(files: dict[str, tuple[bytes, int]], dest: Path, *, overwrite: bool = False,
+                dry_run: bool = False, plan: Optional[list] = None) -> dict:
+    """レンダリングしたファイルをdestに書き込み、create/overwrite/skipの件数を返す。
+
+    overwrite=Trueの場合（--hereでのマージ）、サイズとCRC32が同一の既存ファイルはそのまま残し、
+    異なるファイルは一時ファイルに書いてから置き換える。planを渡すと (action, 相対パス) を追記する。
+    """
+    counts = {CREATE: 0, OVERWRITE: 0, SKIP: 0}
+    for rel, (content, mode) in files.items():
+        target = dest / rel
+        action = classify(target, len(content), zlib.crc32(content)) if overwrite else CREATE
+        if action == CREATE and not overwrite and (target.exists() or target.is_symlink()):
+            raise FileExistsError(f"file exists: {target}")
+        if plan is not None:
+            plan.append((action, rel))
+        counts[action] += 1
+        if dry_run or action == SKIP:
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if action == CREATE:
+            with open(target, "xb") as f:
+                f.write(content)
+            os.chmod(target, mode)
+            continue
+        if target.is_dir():
+            raise IsADirectoryError(f"directory in the way: {target}")
+        fd, tmp = tempfile.mkstemp(prefix=f".{target.name}.", suffix=".specify-tmp", dir=target.parent)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.chmod(tmp, mode)
+            os.replace(tmp, target)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+    return counts
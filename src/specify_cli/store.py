@@ -0,0 +1,287 @@
+"""
+展開済みテンプレートツリーのストア。
+
+テンプレートのzipは一度だけキャッシュディレクトリに展開し、以降のinitでは
+ストアのファイルをハードリンク・reflink・copy_file_rangeでプロジェクトに配置する。
+同一ボリューム上での大量プロビジョニングでは、プロジェクトごとのI/Oが
+メタデータ操作のみになる。
+
+コピーオンライトの安全性:
+- ストア内のファイルは読み取り専用にし、ハードリンク経由のインプレース書き込みを防ぐ。
+- ワークフローがインプレースで編集するファイル（EDITABLE_PATTERNS）は常にコピーする。
+- 再利用前にマニフェストのサイズ/mtime/権限と照合し、改変されたツリーは展開し直す。
+
+並行実行: エントリの登録は `<エントリ>.lock` のflockで直列化し、ロック内でマニフェストを
+照合し直す。展開は別ディレクトリで行ってからrenameで置き換え、使用中のエントリをその場で
+削除することはない（置き換える古いツリーは先に退避してから削除する）。
+"""
+
+import errno
+import fnmatch
+import json
+import os
+import shutil
+import stat
+import tempfile
+import zipfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import platformdirs
+
+from .extract import CREATE, OVERWRITE, SKIP, ExtractLimits, classify, extract_zip, open_archive
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_FORMAT = 1
+LINK_MODES = ("auto", "reflink", "hardlink", "copy")
+
+# /constitutionなどがインプレースで更新するファイル。ハードリンクせず常にコピーする
+EDITABLE_PATTERNS = (
+    ".specify/memory/*",
+    "CLAUDE.md",
+    "GEMINI.md",
+    "QWEN.md",
+    "AGENTS.md",
+)
+
+# linux/fs.h: FICLONE = _IOW(0x94, 9, int)
+_FICLONE = 0x40049409
+
+
+def cache_root() -> Path:
+    """specify-cliのユーザーキャッシュディレクトリ（SPECIFY_CACHE_DIRが優先）。"""
+    env = os.environ.get("SPECIFY_CACHE_DIR")
+    return Path(env) if env else Path(platformdirs.user_cache_dir("specify-cli"))
+
+
+def default_store_root() -> Path:
+    return cache_root() / "templates"
+
+
+def _zip_mode(info: zipfile.ZipInfo) -> int:
+    mode = (info.external_attr >> 16) & 0o7777
+    return mode or (0o755 if info.is_dir() else 0o644)
+
+
+def _is_editable(rel: str) -> bool:
+    return any(fnmatch.fnmatch(rel, p) for p in EDITABLE_PATTERNS)
+
+
+class TemplateStore:
+    """キャッシュディレクトリ内の展開済みテンプレートツリーの集合。"""
+
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root) if root else default_store_root()
+
+    @staticmethod
+    def key(filename: str, size: int) -> str:
+        stem = filename[:-4] if filename.endswith(".zip") else filename
+        return f"{stem}-{size}"
+
+    def entry_dir(self, filename: str, size: int) -> Path:
+        return self.root / self.key(filename, size)
+
+    def load_manifest(self, filename: str, size: int) -> Optional[dict]:
+        try:
+            manifest = json.loads((self.entry_dir(filename, size) / MANIFEST_NAME).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return manifest if manifest.get("format") == MANIFEST_FORMAT else None
+
+    def has(self, filename: str, size: int) -> bool:
+        """改変されていない展開済みツリーがあればTrue。"""
+        manifest = self.load_manifest(filename, size)
+        return manifest is not None and self.verify(filename, size, manifest)
+
+    def verify(self, filename: str, size: int, manifest: dict) -> bool:
+        tree = self.entry_dir(filename, size) / "tree"
+        for rel, fsize, _crc, mode, mtime_ns in manifest["files"]:
+            try:
+                st = os.stat(tree / rel)
+            except OSError:
+                return False
+            # ハードリンク経由のchmodも改変として検出する（ストアのファイルは読み取り専用）
+            if st.st_size != fsize or st.st_mtime_ns != mtime_ns or stat.S_IMODE(st.st_mode) != mode & ~0o222:
+                return False
+        return True
+
+    def ensure(self, zip_path: Path, filename: str, size: int, *, limits: Optional[ExtractLimits] = None) -> dict:
+        """zipを展開してストアに登録し、マニフェストを返す（既に有効なら何もしない）。"""
+        manifest = self._valid_manifest(filename, size)
+        if manifest is not None:
+            return manifest
+        entry = self.entry_dir(filename, size)
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._entry_lock(entry):
+            # 待っている間に他のプロセスが登録していればそれを使う
+            manifest = self._valid_manifest(filename, size)
+            if manifest is not None:
+                return manifest
+            staging = Path(tempfile.mkdtemp(prefix=".staging-", dir=self.root))
+            try:
+                manifest = self._extract(zip_path, staging / "tree", limits)
+                (staging / MANIFEST_NAME).write_text(json.dumps(manifest), encoding="utf-8")
+                if self._valid_manifest(filename, size) is not None:
+                    # ロックのない環境で展開中に他のプロセスが登録した（有効なエントリは置き換えない）
+                    raise FileExistsError(errno.EEXIST, "store entry exists", str(entry))
+                self._install(staging, entry)
+            except OSError as e:
+                # ロックのない環境で他のプロセスが先に登録した場合は、そのエントリを使う
+                winner = self._valid_manifest(filename, size)
+                self._remove(staging)
+                if winner is None or e.errno not in (errno.EEXIST, errno.ENOTEMPTY, errno.EACCES):
+                    raise
+                return winner
+            except BaseException:
+                self._remove(staging)
+                raise
+        return manifest
+
+    def _valid_manifest(self, filename: str, size: int) -> Optional[dict]:
+        manifest = self.load_manifest(filename, size)
+        return manifest if manifest is not None and self.verify(filename, size, manifest) else None
+
+    @contextmanager
+    def _entry_lock(self, entry: Path) -> Iterator[None]:
+        """エントリの登録を直列化する（fcntlがない環境ではロックせず、renameの失敗で検出する）。"""
+        with open(entry.with_name(entry.name + ".lock"), "a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _install(self, staging: Path, entry: Path) -> None:
+        """stagingをエントリとして配置する。改変された古いツリーは退避してから置き換えて削除する。"""
+        if not entry.exists():
+            os.replace(staging, entry)
+            return
+        trash = Path(tempfile.mkdtemp(prefix=".trash-", dir=self.root)) / entry.name
+        os.replace(entry, trash)
+        try:
+            os.replace(staging, entry)
+        finally:
+            self._remove(trash.parent)
+
+    def _extract(self, zip_path: Path, tree: Path, limits: Optional[ExtractLimits] = None) -> dict:
+        files, dirs = [], []
+        with open_archive(zip_path, limits) as zf:
+            members = extract_zip(zf, tree, limits=limits)
+            for rel, info in members:
+                target = tree / rel
+                if info.is_dir():
+                    dirs.append(rel)
+                    continue
+                mode = _zip_mode(info)
+                # ストアのファイルは読み取り専用（ハードリンク経由の書き換えを防ぐ）
+                os.chmod(target, mode & ~0o222)
+                files.append([rel, info.file_size, info.CRC, mode, os.stat(target).st_mtime_ns])
+        return {"format": MANIFEST_FORMAT, "files": files, "dirs": dirs}
+
+    @staticmethod
+    def _remove(path: Path) -> None:
+        def make_writable(func, p, _exc):
+            os.chmod(p, stat.S_IWRITE | stat.S_IREAD | stat.S_IEXEC)
+            func(p)
+        shutil.rmtree(path, onerror=make_writable)
+
+    def materialize(self, filename: str, size: int, manifest: dict, dest: Path, *, mode: str = "auto",
+                    overwrite: bool = False, dry_run: bool = False,
+                    plan: Optional[list] = None) -> dict:
+        """ストアのツリーをdestに配置し、方式ごとのファイル数を返す。
+
+        overwrite=Trueの場合（--hereでのマージ）、マニフェストのサイズ/CRC32と既存ファイルを
+        比較し、同一のファイルはそのまま残す。異なるファイルはリンク前に削除して置き換える。
+        planを渡すと (action, 相対パス) を追記する。dry_run=Trueでは何も書き込まない。
+        """
+        if mode not in LINK_MODES:
+            raise ValueError(f"unknown link mode: {mode}")
+        tree = self.entry_dir(filename, size) / "tree"
+        counts = {"hardlink": 0, "reflink": 0, "copy_file_range": 0, "copy": 0, "skipped": 0}
+        if not dry_run:
+            for rel in manifest["dirs"]:
+                (dest / rel).mkdir(parents=True, exist_ok=True)
+        for rel, fsize, crc, file_mode, _mtime in manifest["files"]:
+            target = dest / rel
+            action = classify(target, fsize, crc) if overwrite else CREATE
+            if action == CREATE and not overwrite and (target.exists() or target.is_symlink()):
+                raise FileExistsError(errno.EEXIST, "file exists", str(target))
+            if plan is not None:
+                plan.append((action, rel))
+            if action == SKIP:
+                counts["skipped"] += 1
+                continue
+            if dry_run:
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            if action == OVERWRITE or target.is_symlink():
+                target.unlink()
+            method = place_file(tree / rel, target, mode="copy" if _is_editable(rel) and mode == "hardlink" else mode)
+            if method != "hardlink":
+                os.chmod(target, file_mode)
+            counts[method] += 1
+        return counts
+
+
+def _reflink(src: Path, dst: Path) -> None:
+    if fcntl is None:
+        raise OSError(errno.EOPNOTSUPP, "reflink is not supported")
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        try:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+        except OSError:
+            d.close()
+            os.unlink(dst)
+            raise
+
+
+def _copy_file_range(src: Path, dst: Path) -> None:
+    if not hasattr(os, "copy_file_range"):
+        raise OSError(errno.EOPNOTSUPP, "copy_file_range is not supported")
+    with open(src, "rb") as s, open(dst, "wb") as d:
+        remaining = os.fstat(s.fileno()).st_size
+        try:
+            while remaining > 0:
+                n = os.copy_file_range(s.fileno(), d.fileno(), remaining)
+                if n == 0:
+                    break
+                remaining -= n
+        except OSError:
+            d.close()
+            os.unlink(dst)
+            raise
+
+
+def place_file(src: Path, dst: Path, *, mode: str = "auto") -> str:
+    """1ファイルを配置し、実際に使われた方式を返す。
+
+    hardlink: os.link（別ボリュームなどで失敗したらコピー）
+    reflink/auto: FICLONE → copy_file_range → 通常コピーの順に試す
+    """
+    if mode == "hardlink":
+        try:
+            os.link(src, dst)
+            return "hardlink"
+        except OSError:
+            pass
+    if mode in ("auto", "reflink"):
+        try:
+            _reflink(src, dst)
+            return "reflink"
+        except OSError:
+            pass
+        try:
+            _copy_file_range(src, dst)
+            return "copy_file_range"
+        except OSError:
+            pass
+    shutil.copyfile(src, dst)
+    return "copy"
@@ -0,0 +1,256 @@
+"""
+レート制限を考慮したHTTPトランスポート。
+
+httpx.Clientをラップし、get()/stream()を同じ呼び出し形式で提供する:
+
+- 接続エラー・5xxはジッター付き指数バックオフで再試行する。
+- 403/429はRetry-AfterまたはX-RateLimit-Resetに従って待機してから再試行する
+  （待機が上限を超える場合はRateLimitExceededを送出して即座に失敗する）。
+- GitHubの残りクォータ（X-RateLimit-Remaining/Reset）をキャッシュディレクトリの
+  ファイルに記録し、同一ホスト上の並行実行で共有する。記録はホストとトークンごとの
+  トークンバケットで、リクエストのたびにファイルロック下で1つ消費し、リセット時刻に
+  補充される。残りが0なら各プロセスはリクエストを送らずにリセットまで待つ。
+"""
+
+import email.utils
+import hashlib
+import json
+import os
+import random
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+from urllib.parse import urlsplit
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+import httpx
+
+from . import profiling
+from .store import cache_root
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+DEFAULT_ATTEMPTS = 4
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 30.0
+# レート制限のリセット待ちの上限（秒）。超える場合は待たずに失敗する
+MAX_WAIT_ENV = "SPECIFY_MAX_RATE_LIMIT_WAIT"
+DEFAULT_MAX_WAIT = 60.0
+
+
+class RateLimitExceeded(Exception):
+    """クォータのリセットまで待てない場合に送出。"""
+
+    def __init__(self, message: str, reset: Optional[float] = None):
+        super().__init__(message)
+        self.reset = reset
+
+
+def default_budget_path() -> Path:
+    return cache_root() / "rate-limit.json"
+
+
+def bucket_key(url: str, headers: Optional[dict] = None) -> str:
+    """クォータはホストと認証主体ごと（トークンはハッシュのみ記録する）。"""
+    auth = (headers or {}).get("Authorization", "")
+    who = hashlib.sha256(auth.encode("utf-8")).hexdigest()[:12] if auth else "anonymous"
+    return f"{urlsplit(url).netloc}|{who}"
+
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """Retry-After（秒数またはHTTP日付）を待機秒数に変換する。"""
+    if not value:
+        return None
+    now = time.time() if now is None else now
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - now)
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = DEFAULT_BASE_DELAY, cap: float = DEFAULT_MAX_DELAY) -> float:
+    """フルジッターの指数バックオフ（attemptは1始まり）。"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class RateLimitBudget:
+    """プロセス間で共有する、ホスト/トークンごとの残りクォータの記録。"""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else default_budget_path()
+
+    @contextmanager
+    def _locked(self) -> Iterator[dict]:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_name(self.path.name + ".lock"), "a+") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                try:
+                    data = json.loads(self.path.read_text(encoding="utf-8"))
+                except (OSError, ValueError):
+                    data = {}
+                yield data
+                tmp = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+                tmp.write_text(json.dumps(data), encoding="utf-8")
+                os.replace(tmp, self.path)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def acquire(self, key: str, now: Optional[float] = None) -> float:
+        """トークンを1つ消費する。残りがなければリセットまでの待機秒数を返す（消費しない）。"""
+        now = time.time() if now is None else now
+        with self._locked() as data:
+            bucket = data.get(key)
+            if bucket is None:
+                return 0.0
+            if bucket["reset"] <= now:
+                del data[key]  # リセット済み。次の応答ヘッダーで再記録する
+                return 0.0
+            if bucket["remaining"] <= 0:
+                return bucket["reset"] - now
+            bucket["remaining"] -= 1
+            return 0.0
+
+    def record(self, key: str, headers: httpx.Headers, now: Optional[float] = None) -> None:
+        """応答のX-RateLimit-*ヘッダーで記録を更新する。"""
+        try:
+            remaining = int(headers["x-ratelimit-remaining"])
+            reset = float(headers["x-ratelimit-reset"])
+        except (KeyError, ValueError):
+            return
+        limit = headers.get("x-ratelimit-limit")
+        with self._locked() as data:
+            bucket = data.get(key)
+            # 同じウィンドウ内では応答の到着順が前後しうるため小さい方を採用する
+            if bucket is not None and bucket["reset"] == reset:
+                remaining = min(remaining, bucket["remaining"])
+            data[key] = {
+                "remaining": remaining,
+                "reset": reset,
+                "limit": int(limit) if limit and limit.isdigit() else None,
+                "updated": time.time() if now is None else now,
+            }
+
+    def snapshot(self) -> dict:
+        try:
+            return json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+
+class Transport:
+    """再試行とクォータ共有を行うhttpx.Clientのラッパー。"""
+
+    def __init__(
+        self,
+        client: httpx.Client,
+        *,
+        budget: Optional[RateLimitBudget] = None,
+        attempts: int = DEFAULT_ATTEMPTS,
+        base_delay: float = DEFAULT_BASE_DELAY,
+        max_delay: float = DEFAULT_MAX_DELAY,
+        max_wait: Optional[float] = None,
+        sleep: Callable[[float], None] = time.sleep,
+        on_retry: Optional[Callable[[str, float], None]] = None,
+    ):
+        self.client = client
+        self.budget = budget
+        self.attempts = attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_wait = float(os.environ.get(MAX_WAIT_ENV, DEFAULT_MAX_WAIT)) if max_wait is None else max_wait
+        self.sleep = sleep
+        self.on_retry = on_retry
+        self.retries = 0
+
+    def backoff(self, attempt: int) -> float:
+        return backoff_delay(attempt, self.base_delay, self.max_delay)
+
+    def _wait(self, seconds: float, reason: str) -> None:
+        if seconds > self.max_wait:
+            reset = time.time() + seconds
+            raise RateLimitExceeded(
+                f"{reason}: {time.strftime('%H:%M:%S', time.localtime(reset))}まで待機が必要です "
+                f"(上限 {self.max_wait:.0f}秒, {MAX_WAIT_ENV}で変更可能)",
+                reset=reset,
+            )
+        if self.on_retry:
+            self.on_retry(reason, seconds)
+        self.sleep(seconds)
+
+    def _reserve(self, key: str) -> None:
+        if self.budget is None:
+            return
+        wait = self.budget.acquire(key)
+        if wait > 0:
+            # 並行ジョブが同時に再開しないようにジッターを加える
+            self._wait(wait + random.uniform(0, 1), "GitHub APIのレート制限 (共有クォータ)")
+            self.budget.acquire(key)
+
+    def _retry_delay(self, response: httpx.Response, attempt: int) -> Optional[float]:
+        """再試行すべき応答なら待機秒数、そうでなければNone。"""
+        status = response.status_code
+        headers = response.headers
+        rate_limited = status == 429 or (status == 403 and (
+            headers.get("x-ratelimit-remaining") == "0" or "retry-after" in headers))
+        if rate_limited:
+            retry_after = parse_retry_after(headers.get("retry-after"))
+            if retry_after is not None:
+                return retry_after
+            reset = headers.get("x-ratelimit-reset")
+            if reset and reset.isdigit():
+                return max(0.0, int(reset) - time.time()) + random.uniform(0, 1)
+            return self.backoff(attempt)
+        if status in RETRY_STATUSES:
+            return self.backoff(attempt)
+        return None
+
+    def _send(self, method: str, url: str, *, stream: bool, **kwargs) -> httpx.Response:
+        key = bucket_key(url, kwargs.get("headers"))
+        for attempt in range(1, self.attempts + 1):
+            self._reserve(key)
+            try:
+                request = self.client.build_request(method, url, **{k: v for k, v in kwargs.items() if k != "follow_redirects"})
+                with profiling.span(f"{method} {urlsplit(url).netloc}{urlsplit(url).path}", "http", attempt=attempt) as span:
+                    response = self.client.send(request, stream=stream, follow_redirects=kwargs.get("follow_redirects", True))
+                    if span is not None:
+                        span.args["status"] = response.status_code
+            except httpx.TransportError as e:
+                if attempt == self.attempts:
+                    raise
+                self.retries += 1
+                self._wait(self.backoff(attempt), f"接続エラー ({type(e).__name__})")
+                continue
+            if self.budget is not None:
+                self.budget.record(key, response.headers)
+            delay = self._retry_delay(response, attempt)
+            if delay is None or attempt == self.attempts:
+                return response
+            response.close()
+            self.retries += 1
+            reason = f"HTTP {response.status_code}"
+            if response.status_code in (403, 429):
+                reason = f"GitHub APIのレート制限 ({reason})"
+            self._wait(delay, reason)
+        raise AssertionError("unreachable")
+
+    def get(self, url: str, **kwargs) -> httpx.Response:
+        return self._send("GET", url, stream=False, **kwargs)
+
+    @contextmanager
+    def stream(self, method: str, url: str, **kwargs) -> Iterator[httpx.Response]:
+        response = self._send(method, url, stream=True, **kwargs)
+        try:
+            yield response
+        finally:
+            response.close()
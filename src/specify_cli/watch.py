@@ -0,0 +1,370 @@
+"""
+`specify watch` のためのファイル監視と増分再計算。
+
+specsルート（既定はspecs/、.specify/configで複数指定可）, .specify/memory, .specify/templates の変更を購読し、デバウンスした上で
+変更されたファイルに影響する派生物（機能インデックス、タスク進捗、エージェント
+コンテキストファイル）のみを再計算する。Linuxではinotifyを使い、利用できない
+環境ではmtime/サイズのポーリングにフォールバックする。
+"""
+
+import contextlib
+import ctypes
+import ctypes.util
+import errno
+import json
+import os
+import select
+import shutil
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+from . import profiling
+from .artifacts import ArtifactCache, ensure_cache_dir
+from .features import (
+    CACHE_DIR,
+    build_index,
+    get_current_feature,
+    iter_feature_dirs,
+    load_index,
+    resolve_feature_dir,
+    specs_dirs,
+    save_index,
+    update_index_entry,
+    write_progress,
+    write_json_atomic,
+)
+
+WATCH_DIRS = (Path("specs"), Path(".specify") / "memory", Path(".specify") / "templates")
+STATS_RELPATH = CACHE_DIR / "watch-stats.json"
+
+# すべての変更を再走査させる特別な値（inotifyキューのオーバーフロー時など）
+RESCAN = Path("<rescan>")
+
+# inotify定数 (linux/inotify.h)
+_IN_MODIFY = 0x00000002
+_IN_ATTRIB = 0x00000004
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = (_IN_MODIFY | _IN_ATTRIB | _IN_CLOSE_WRITE | _IN_MOVED_FROM | _IN_MOVED_TO
+               | _IN_CREATE | _IN_DELETE | _IN_DELETE_SELF)
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def watch_dirs(root: Path) -> tuple[Path, ...]:
+    """監視するディレクトリ（rootからの相対パス）。specs/は設定されたspecsルートに置き換える。"""
+    return tuple(p.relative_to(root) for p in specs_dirs(root)) + WATCH_DIRS[1:]
+
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1  # noqa: B018 - シンボルの存在確認
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+class InotifyBackend:
+    """ctypes経由のinotifyによる再帰的なディレクトリ監視。"""
+
+    name = "inotify"
+
+    @staticmethod
+    def available() -> bool:
+        return _load_libc() is not None
+
+    def __init__(self, root: Path, dirs: Iterable[Path]):
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self.root = root
+        self.targets = [root / d for d in dirs]
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._wd_paths: dict[int, Path] = {}
+        # 追加済みかの判定を定数時間で行うため、監視中のパスを集合でも持つ
+        self._watched: set[Path] = set()
+        # 監視対象がまだ存在しない場合に作成を検知できるよう、親も浅く監視する
+        self._add_watch(root)
+        self._add_watch(root / ".specify")
+        for target in self.targets:
+            self._add_tree(target)
+
+    def _add_watch(self, path: Path) -> None:
+        if not path.is_dir() or path in self._watched:
+            return
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+        if wd >= 0:
+            previous = self._wd_paths.get(wd)
+            if previous is not None:
+                self._watched.discard(previous)
+            self._wd_paths[wd] = path
+            self._watched.add(path)
+
+    def _add_tree(self, path: Path) -> None:
+        if not path.is_dir():
+            return
+        self._add_watch(path)
+        for dirpath, dirnames, _ in os.walk(path):
+            for d in dirnames:
+                self._add_watch(Path(dirpath) / d)
+
+    def _is_target(self, path: Path) -> bool:
+        return any(path == t or t in path.parents for t in self.targets)
+
+    def read(self, timeout: float) -> list[Path]:
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        paths: list[Path] = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & _IN_Q_OVERFLOW:
+                paths.append(RESCAN)
+                continue
+            if mask & _IN_IGNORED:
+                self._watched.discard(self._wd_paths.pop(wd, None))
+                continue
+            parent = self._wd_paths.get(wd)
+            if parent is None:
+                continue
+            path = parent / os.fsdecode(name) if name else parent
+            if mask & _IN_ISDIR and mask & (_IN_CREATE | _IN_MOVED_TO) and self._is_target(path):
+                self._add_tree(path)
+                # 監視追加前に作られたファイルを取りこぼさないよう中身も通知する
+                paths.extend(p for p in path.rglob("*") if p.is_file())
+            if self._is_target(path):
+                paths.append(path)
+        return paths
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class PollingBackend:
+    """mtime/サイズのスナップショット比較による監視（inotifyが使えない環境向け）。"""
+
+    name = "polling"
+
+    def __init__(self, root: Path, dirs: Iterable[Path], interval: float = 1.0):
+        self.root = root
+        self.targets = [root / d for d in dirs]
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> dict:
+        snapshot = {}
+        for target in self.targets:
+            for dirpath, dirnames, filenames in os.walk(target):
+                snapshot[dirpath] = None
+                for name in filenames:
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except FileNotFoundError:
+                        continue
+                    snapshot[path] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def read(self, timeout: float) -> list[Path]:
+        time.sleep(min(timeout, self.interval))
+        current = self._scan()
+        previous = self._snapshot
+        self._snapshot = current
+        changed = [p for p, sig in current.items() if previous.get(p, 0) != sig]
+        changed.extend(p for p in previous if p not in current)
+        return [Path(p) for p in changed]
+
+    def close(self) -> None:
+        pass
+
+
+def _default_stats() -> dict:
+    return {
+        "backend": None,
+        "started": time.time(),
+        "events": 0,
+        "batches": 0,
+        "full_rebuilds": 0,
+        "index_updates": 0,
+        "progress_updates": 0,
+        "agent_context_runs": 0,
+        "memory_refreshes": 0,
+        "seconds": 0.0,
+    }
+
+
+class Watcher:
+    """変更パスのバッチを受け取り、影響を受ける派生物のみを再計算する。"""
+
+    def __init__(self, root: Path, *, agent_context: bool = True, log: Optional[Callable[[str], None]] = None,
+                 lock=None):
+        self.root = root
+        # 状態を他スレッドと共有する場合（specify serve）に各バッチの適用を保護するロック
+        self.lock = lock or contextlib.nullcontext()
+        self.agent_context = agent_context
+        self.log = log or (lambda msg: None)
+        self.cache = ArtifactCache(root)
+        self.index = load_index(root)
+        self.stats = _default_stats()
+
+    def full_refresh(self) -> None:
+        """全機能のインデックスと進捗を作り直す。"""
+        start = time.perf_counter()
+        self.index = build_index(self.root, self.cache)
+        save_index(self.root, self.index)
+        for feature, _dir in iter_feature_dirs(self.root):
+            write_progress(self.root, feature, self.cache)
+        self.cache.prune()
+        self.cache.save()
+        self.stats["full_rebuilds"] += 1
+        self.stats["seconds"] += time.perf_counter() - start
+        self._save_stats()
+
+    def handle(self, paths: Iterable[Path]) -> dict:
+        """デバウンス済みの変更バッチを処理し、実行した再計算の概要を返す。"""
+        start = time.perf_counter()
+        paths = set(paths)
+        if RESCAN in paths:
+            self.full_refresh()
+            return {"rescan": True}
+
+        features: set[str] = set()
+        progress: set[str] = set()
+        plans: set[str] = set()
+        memory: set[Path] = set()
+        refresh_agent = False
+        roots = specs_dirs(self.root)
+        memory_dir = self.root / ".specify" / "memory"
+        templates_dir = self.root / ".specify" / "templates"
+
+        for path in paths:
+            path = path if path.is_absolute() else self.root / path
+            specs = next((d for d in roots if d in path.parents), None)
+            if specs is not None:
+                rel = path.relative_to(specs).parts
+                features.add(rel[0])
+                if len(rel) == 2 and rel[1] == "tasks.md":
+                    progress.add(rel[0])
+                elif len(rel) == 2 and rel[1] == "plan.md":
+                    plans.add(rel[0])
+            elif memory_dir in path.parents:
+                memory.add(path)
+            elif templates_dir in path.parents and path.name == "agent-file-template.md":
+                refresh_agent = True
+
+        summary = {"features": sorted(features), "progress": sorted(progress), "agent_context": False}
+        if features:
+            for feature in features:
+                update_index_entry(self.index, self.root, feature, self.cache)
+            save_index(self.root, self.index)
+            self.stats["index_updates"] += len(features)
+        for feature in progress:
+            write_progress(self.root, feature, self.cache)
+            self.stats["progress_updates"] += 1
+        for path in memory:
+            if path.suffix == ".md" and path.is_file():
+                self.cache.get(path)
+            else:
+                self.cache.invalidate(path)
+            self.stats["memory_refreshes"] += 1
+
+        current = get_current_feature(self.root)
+        if self.agent_context and (refresh_agent or current in plans):
+            summary["agent_context"] = self._update_agent_context(current)
+        self.cache.save()
+
+        self.stats["batches"] += 1
+        self.stats["seconds"] += time.perf_counter() - start
+        self._save_stats()
+        return summary
+
+    def _update_agent_context(self, feature: str) -> bool:
+        """インストール済みのupdate-agent-contextスクリプトを現在の機能に対して実行。"""
+        scripts = self.root / ".specify" / "scripts"
+        bash_script = scripts / "bash" / "update-agent-context.sh"
+        ps_script = scripts / "powershell" / "update-agent-context.ps1"
+        if bash_script.is_file() and shutil.which("bash"):
+            cmd = ["bash", str(bash_script)]
+        elif ps_script.is_file() and (shutil.which("pwsh") or shutil.which("powershell")):
+            cmd = [shutil.which("pwsh") or shutil.which("powershell"), "-NoProfile", "-File", str(ps_script)]
+        else:
+            return False
+        if not (resolve_feature_dir(self.root, feature) / "plan.md").is_file():
+            return False
+        env = dict(os.environ, SPECIFY_FEATURE=feature)
+        result = profiling.run(cmd, cwd=self.root, env=env, capture_output=True, text=True)
+        self.stats["agent_context_runs"] += 1
+        if result.returncode != 0:
+            self.log(f"update-agent-context failed ({result.returncode}): {result.stderr.strip()}")
+            return False
+        return True
+
+    def _save_stats(self) -> None:
+        try:
+            ensure_cache_dir(self.root)
+            write_json_atomic(self.root / STATS_RELPATH, self.stats)
+        except OSError:
+            pass
+
+    def run(self, backend, *, debounce: float = 0.3, should_stop: Callable[[], bool] = lambda: False,
+            on_batch: Optional[Callable[[dict], None]] = None) -> None:
+        """イベントを読み続け、debounce秒間静かになったらバッチとして処理する。"""
+        self.stats["backend"] = backend.name
+        pending: set[Path] = set()
+        last_event = 0.0
+        while not should_stop():
+            timeout = debounce if pending else 1.0
+            events = backend.read(timeout)
+            if events:
+                self.stats["events"] += len(events)
+                pending.update(events)
+                last_event = time.monotonic()
+                continue
+            if pending and time.monotonic() - last_event >= debounce:
+                batch, pending = pending, set()
+                with self.lock:
+                    summary = self.handle(batch)
+                if on_batch:
+                    on_batch(summary)
+
+
+def make_backend(root: Path, *, poll: bool = False, interval: float = 1.0):
+    """inotifyが使える場合はInotifyBackend、それ以外はPollingBackendを返す。"""
+    if not poll and InotifyBackend.available():
+        try:
+            return InotifyBackend(root, watch_dirs(root))
+        except OSError:
+            pass
+    return PollingBackend(root, watch_dirs(root), interval=interval)
+
+
+def read_stats(root: Path) -> dict:
+    try:
+        return json.loads((root / STATS_RELPATH).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}